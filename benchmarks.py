@@ -0,0 +1,892 @@
+#!/usr/bin/env python3
+
+import argparse
+import gc
+import inspect
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier, Lock
+
+from problem_1 import LRU_Cache, Compact_LRU_Cache, Sharded_LRU_Cache, Shared_LRU_Cache, POLICIES, make_cache
+from problem_2 import find_files, iter_files, iter_files_parallel, Find_Files_Cache, Pattern_Matcher
+from problem_3 import huffman_encoding, huffman_decoding
+
+
+def measure_bytes_per_entry(cache_class, entries):
+    """
+    Measures the memory the cache allocates per entry, excluding the keys and values themselves.
+
+    :param cache_class: The cache class to measure.
+    :param entries: Number of entries to fill the cache with.
+    :return: float - bytes per entry
+    """
+    # Build the keys and values up front so only the cache's own allocations are traced.
+    keys = [str(i) for i in range(1, entries + 1)]
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    cache = cache_class(entries)
+    for key in keys:
+        cache.set(key, key)
+
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return (after - before) / entries
+
+
+class Unslotted_CacheNode:
+    """Reference for the memory benchmark: the original node, whose attributes live in a per-node __dict__."""
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+        self.next = None
+        self.prev = None
+
+
+class Unslotted_LRU_Cache:
+    """Reference for the memory benchmark: the original LRU_Cache, a dict of unslotted nodes in a linked list."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.hashtable = dict()
+        self.head = Unslotted_CacheNode(0, 0)
+        self.tail = Unslotted_CacheNode(0, 0)
+        self.head.next = self.tail
+        self.tail.prev = self.head
+
+    def get(self, key):
+        node = self.hashtable.get(key)
+        if node is None:
+            return -1
+        self._remove(node)
+        self._add(node)
+        return node.value
+
+    def set(self, key, value):
+        node = self.hashtable.get(key)
+        if node is not None:
+            node.value = value
+            self._remove(node)
+        else:
+            node = self.hashtable[key] = Unslotted_CacheNode(key, value)
+        self._add(node)
+
+        if len(self.hashtable) > self.capacity:
+            lru = self.tail.prev
+            self._remove(lru)
+            del self.hashtable[lru.key]
+
+    def _remove(self, node):
+        node.prev.next = node.next
+        node.next.prev = node.prev
+
+    def _add(self, node):
+        node.prev = self.head
+        node.next = self.head.next
+        self.head.next.prev = node
+        self.head.next = node
+
+
+def benchmark_lru_memory(entries=100000):
+    """Compares the bytes per entry of the original unslotted, the node-backed, and the array-backed LRU caches."""
+    print('Bytes per entry for {} entries:'.format(entries))
+    for cache_class in (Unslotted_LRU_Cache, LRU_Cache, Compact_LRU_Cache):
+        print('  {:<20} {:>8.1f}'.format(cache_class.__name__, measure_bytes_per_entry(cache_class, entries)))
+
+
+class Locked_LRU_Cache:
+    """Baseline for the thread benchmark: one LRU_Cache behind one global lock."""
+
+    def __init__(self, capacity):
+        self.cache = LRU_Cache(capacity)
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            return self.cache.get(key)
+
+    def set(self, key, value):
+        with self.lock:
+            return self.cache.set(key, value)
+
+
+def measure_threaded_throughput(cache, threads, ops_per_thread, keyspace):
+    """
+    Runs a read-through get/set workload from a thread pool against the cache.
+
+    :return: float - operations per second across all threads
+    """
+    def worker(seed):
+        rand = random.Random(seed)
+        keys = [rand.randint(1, keyspace) for _ in range(ops_per_thread)]
+        start.wait()
+        for key in keys:
+            if cache.get(key) == -1:
+                cache.set(key, key)
+
+    # Workers build their keys first and then wait here so that only the cache operations are timed.
+    start = Barrier(threads + 1)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(worker, seed) for seed in range(threads)]
+        start.wait()
+        begin = time.perf_counter()
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - begin
+
+    return threads * ops_per_thread / elapsed
+
+
+def benchmark_lru_threads(ops_per_thread=50000, keyspace=20000, capacity=10000, shards=16):
+    """Compares the throughput of a globally locked LRU_Cache and Sharded_LRU_Cache as the thread count grows."""
+    print('Ops/sec with a keyspace of {} and capacity of {}:'.format(keyspace, capacity))
+    print('  {:>7} {:>14} {:>14}'.format('threads', 'global lock', 'sharded'))
+    for threads in (1, 2, 4, 8, 16):
+        locked = measure_threaded_throughput(Locked_LRU_Cache(capacity), threads, ops_per_thread, keyspace)
+        sharded = measure_threaded_throughput(Sharded_LRU_Cache(capacity, shards), threads, ops_per_thread, keyspace)
+        print('  {:>7} {:>14,.0f} {:>14,.0f}'.format(threads, locked, sharded))
+
+
+def measure_get_throughput(cache, keys, rounds, tick):
+    """
+    Times batches of gets, advancing the cache's clock and sweeping the expired entries between the batches.
+
+    :return: float - gets per second, counting only the time spent in get
+    """
+    elapsed = 0
+    for _ in range(rounds):
+        cache.clock.now += tick
+        cache.expire()
+
+        begin = time.perf_counter()
+        for key in keys:
+            cache.get(key)
+        elapsed += time.perf_counter() - begin
+
+    return rounds * len(keys) / elapsed
+
+
+def benchmark_lru_ttl(entries=100000, lookups=20000, rounds=25):
+    """Compares get throughput without ttls, with unexpiring ttls, and while the timer wheel sweeps entries."""
+
+    class Clock:
+        now = 0.0
+
+        def __call__(self):
+            return self.now
+
+    rand = random.Random(0)
+    keys = [rand.randint(1, entries) for _ in range(lookups)]
+
+    scenarios = (
+        ('no ttl', None),
+        ('ttl, none expire', lambda key: 10 ** 6),
+        ('ttl, sweeping', lambda key: 1 + key % (rounds * 2)),
+    )
+
+    print('Gets/sec over {} entries:'.format(entries))
+    for name, ttl in scenarios:
+        cache = LRU_Cache(entries, clock=Clock())
+        for key in range(1, entries + 1):
+            cache.set(key, key, ttl=None if ttl is None else ttl(key))
+
+        gets = measure_get_throughput(cache, keys, rounds, tick=1)
+        print('  {:<18} {:>12,.0f}   ({} entries left)'.format(name, gets, len(cache.hashtable)))
+
+
+def zipf_keys(length, keyspace, skew, seed=0):
+    """
+    Yields keys from 1 to keyspace drawn from a Zipfian distribution with the given skew.
+
+    Keys are drawn by inverting the continuous approximation of the Zipfian CDF, which takes O(1) memory for any
+    keyspace rather than a table of cumulative weights.
+    """
+    rand = random.Random(seed)
+    if skew == 1:
+        return (int(keyspace ** rand.random()) for _ in range(length))
+
+    exponent = 1 - skew
+    scale = keyspace ** exponent - 1
+    return (min(int((scale * rand.random() + 1) ** (1 / exponent)), keyspace) for _ in range(length))
+
+
+def zipf_trace(length, keyspace, skew, seed=0):
+    """Generates a trace of keys from 1 to keyspace drawn from a Zipfian distribution with the given skew."""
+    return list(zipf_keys(length, keyspace, skew, seed))
+
+
+def uniform_keys(length, keyspace, seed=0):
+    """Yields keys from 1 to keyspace drawn uniformly."""
+    rand = random.Random(seed)
+    return (rand.randint(1, keyspace) for _ in range(length))
+
+
+def uniform_trace(length, keyspace, seed=0):
+    """Generates a trace of keys from 1 to keyspace drawn uniformly."""
+    return list(uniform_keys(length, keyspace, seed))
+
+
+def loop_keys(length, loop):
+    """Yields keys that loop over 1 to loop, the worst case for LRU when loop > capacity."""
+    return (i % loop + 1 for i in range(length))
+
+
+def loop_trace(length, loop):
+    """Generates a trace that loops over the keys from 1 to loop, the worst case for LRU when loop > capacity."""
+    return list(loop_keys(length, loop))
+
+
+def scan_trace(length, start):
+    """Generates a trace that scans one-off keys, starting at the given key."""
+    return list(range(start, start + length))
+
+
+def replay(cache, trace):
+    """
+    Replays the trace against the cache as a read-through: each miss is followed by a set.
+
+    :return: tuple - hit ratio, operations per second
+    """
+    hits = 0
+    begin = time.perf_counter()
+    for key in trace:
+        if cache.get(key) == -1:
+            cache.set(key, key)
+        else:
+            hits += 1
+    elapsed = time.perf_counter() - begin
+
+    return hits / len(trace), len(trace) / elapsed
+
+
+def benchmark_policies(capacity=1000, keyspace=100000, length=200000):
+    """Compares the hit ratios and ops/sec of the eviction policies on Zipfian traces, with and without scans."""
+    zipf = zipf_trace(length, keyspace, skew=0.9)
+
+    # Interrupt the Zipfian trace with a one-off scan ten times the capacity every 20k accesses.
+    scanned = []
+    for i in range(0, length, 20000):
+        scanned.extend(zipf[i:i + 20000])
+        scanned.extend(scan_trace(capacity * 10, keyspace + 1 + i * capacity))
+
+    traces = (('zipf 0.9', zipf), ('zipf 0.9 + scans', scanned))
+
+    print('Hit ratio and ops/sec at a capacity of {}:'.format(capacity))
+    print('  {:<12}'.format('policy') + ''.join('{:>28}'.format(name) for name, _ in traces))
+    for policy in POLICIES:
+        row = '  {:<12}'.format(policy)
+        for _, trace in traces:
+            hit_ratio, ops = replay(make_cache(policy, capacity), trace)
+            row += '{:>14.2%}{:>14,.0f}'.format(hit_ratio, ops)
+        print(row)
+
+
+def benchmark_lru_stats(capacity=10000, keyspace=20000, length=500000):
+    """Compares the read-through throughput of LRU_Cache with stats disabled, enabled, and with an eviction hook."""
+    trace = zipf_trace(length, keyspace, skew=0.9)
+
+    def evicted(key, value):
+        pass
+
+    def with_stats():
+        cache = LRU_Cache(capacity)
+        cache.enable_stats()
+        return cache
+
+    scenarios = (
+        ('stats disabled', lambda: LRU_Cache(capacity)),
+        ('stats enabled', with_stats),
+        ('on_evict hook', lambda: LRU_Cache(capacity, on_evict=evicted)),
+    )
+
+    print('Read-through ops/sec at a capacity of {}:'.format(capacity))
+    for name, build in scenarios:
+        cache = build()
+
+        # Take the best of 3 runs to smooth out noise.
+        ops = max(replay(cache, trace)[1] for _ in range(3))
+        print('  {:<16} {:>12,.0f}'.format(name, ops))
+
+
+def replay_in_worker(cache, capacity, seed, length, keyspace, results):
+    """Worker process for the shared memory benchmark. Without a shared cache, it builds its own."""
+    own_cache = cache is None
+    if own_cache:
+        cache = LRU_Cache(capacity)
+
+    trace = zipf_trace(length, keyspace, skew=0.9, seed=seed)
+    results.put(replay(cache, trace))
+
+    if not own_cache:
+        cache.close()
+
+
+def benchmark_lru_processes(capacity=10000, keyspace=100000, length=100000):
+    """Compares per-process LRU_Caches with one Shared_LRU_Cache as the number of worker processes grows."""
+    context = multiprocessing.get_context()
+
+    print('Hit ratio and ops/sec per worker at a capacity of {}:'.format(capacity))
+    print('  {:>9} {:>24} {:>24}'.format('processes', 'per-process caches', 'shared cache'))
+    for processes in (1, 2, 4, 8):
+        row = '  {:>9}'.format(processes)
+        for shared in (False, True):
+            cache = Shared_LRU_Cache(capacity, lock=context.Lock()) if shared else None
+            results = context.Queue()
+            workers = [
+                context.Process(target=replay_in_worker, args=(cache, capacity, seed, length, keyspace, results))
+                for seed in range(processes)
+            ]
+            for worker in workers:
+                worker.start()
+            measured = [results.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+            if cache is not None:
+                cache.close()
+
+            hit_ratio = sum(hit_ratio for hit_ratio, _ in measured) / processes
+            ops = sum(ops for _, ops in measured) / processes
+            row += '{:>12.2%}{:>12,.0f}'.format(hit_ratio, ops)
+        print(row)
+
+
+# Operations of a trace. Read-through gets the key and sets it on a miss.
+READ_THROUGH, READ, WRITE = 0, 1, 2
+
+
+def mixed_ops(length, read_ratio, seed=0):
+    """Generates the operations of a trace with the given ratio of reads to writes."""
+    rand = random.Random(seed)
+    return bytearray(READ if rand.random() < read_ratio else WRITE for _ in range(length))
+
+
+def generate_traces(capacity, length):
+    """
+    Yields the standard traces for a capacity, one at a time. Each trace is a (name, keys, ops) tuple; ops None is
+    all read-through.
+
+    The keys are packed into an array('q') of 8 bytes each rather than a list of int objects, and each trace is only
+    built once the previous one is consumed, so a trace of 10**7 keys takes 80 MB.
+    """
+    keyspace = 10 * capacity
+    yield 'uniform', array('q', uniform_keys(length, keyspace)), None
+    for skew in (0.6, 0.8, 0.99, 1.2):
+        yield 'zipf {}'.format(skew), array('q', zipf_keys(length, keyspace, skew)), None
+    yield 'loop 1.5x', array('q', loop_keys(length, capacity + capacity // 2)), None
+
+    keys = array('q', zipf_keys(length, keyspace, 0.99, seed=1))
+    for read_ratio in (0.99, 0.95, 0.5):
+        name = 'zipf 0.99 {:.0f}/{:.0f} r/w'.format(read_ratio * 100, (1 - read_ratio) * 100)
+        yield name, keys, mixed_ops(length, read_ratio)
+
+
+def read_trace(path):
+    """
+    Reads a trace file into a (name, keys, ops) tuple.
+
+    Each line holds a key, optionally preceded by `r` (read) or `w` (write); a bare key is a read-through. Keys
+    that look like integers are read as integers.
+    """
+    keys = []
+    ops = bytearray()
+    codes = {'r': READ, 'w': WRITE}
+    with open(path) as trace_file:
+        for line in trace_file:
+            fields = line.split()
+            if not fields:
+                continue
+            op, key = (codes[fields[0]], fields[1]) if len(fields) > 1 else (READ_THROUGH, fields[0])
+            keys.append(int(key) if key.lstrip('-').isdigit() else key)
+            ops.append(op)
+
+    return os.path.basename(path), keys, ops
+
+
+def replay_ops(cache, keys, ops, sample_every=64):
+    """
+    Replays a trace, timing every Nth operation.
+
+    :return: tuple - hits, lookups, elapsed seconds, list of the sampled latencies in nanoseconds
+    """
+    hits = 0
+    lookups = 0
+    latencies = []
+    clock = time.perf_counter_ns
+    if ops is None:
+        ops = bytes(len(keys))
+
+    begin = time.perf_counter()
+    for i, (key, op) in enumerate(zip(keys, ops)):
+        sampled = i % sample_every == 0
+        if sampled:
+            start = clock()
+
+        if op == WRITE:
+            cache.set(key, key)
+        else:
+            lookups += 1
+            if cache.get(key) != -1:
+                hits += 1
+            elif op == READ_THROUGH:
+                cache.set(key, key)
+
+        if sampled:
+            latencies.append(clock() - start)
+    elapsed = time.perf_counter() - begin
+
+    return hits, lookups, elapsed, latencies
+
+
+def measure_peak_memory(policy, capacity, keys, ops):
+    """Replays the trace on a fresh cache with tracemalloc on and returns the peak bytes traced."""
+    gc.collect()
+    tracemalloc.start()
+    replay_ops(make_cache(policy, capacity), keys, ops)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+# Longest default trace. At large capacities 10 times the capacity would not fit in memory, so the traces are capped
+# at 3 times a 10**7 capacity, enough to fill the cache and then replay twice as many accesses against it.
+MAX_TRACE_LENGTH = 3 * 10 ** 7
+
+
+def benchmark_lru_traces(capacities=(10 ** 3, 10 ** 4, 10 ** 5), traces=(), policy='lru', length=None):
+    """
+    Replays the standard traces, and any trace files, against the cache at each capacity.
+
+    Reports ops/sec, hit ratio, peak memory, and p99 latency, and returns the results for the JSON report.
+    The trace length defaults to 10 times the capacity, at least 200k and at most MAX_TRACE_LENGTH. Traces are
+    generated and replayed one at a time, which keeps capacities up to 10**7 within a few GB, most of it the cache.
+    """
+    results = []
+
+    print('{:<22} {:>10} {:>14} {:>10} {:>14} {:>10}'.format(
+        'trace', 'capacity', 'ops/sec', 'hit ratio', 'peak memory', 'p99 (ns)'))
+    for capacity in capacities:
+        trace_length = length or min(max(10 * capacity, 200000), MAX_TRACE_LENGTH)
+        file_traces = (read_trace(path) for path in traces)
+        for name, keys, ops in itertools.chain(generate_traces(capacity, trace_length), file_traces):
+            hits, lookups, elapsed, latencies = replay_ops(make_cache(policy, capacity), keys, ops)
+            latencies.sort()
+            result = {
+                'trace': name,
+                'policy': policy,
+                'capacity': capacity,
+                'operations': len(keys),
+                'ops_per_sec': len(keys) / elapsed,
+                'hit_ratio': hits / lookups if lookups else 0.0,
+                'peak_memory_bytes': measure_peak_memory(policy, capacity, keys, ops),
+                'p99_latency_ns': latencies[int(0.99 * (len(latencies) - 1))],
+            }
+            results.append(result)
+            print('{trace:<22} {capacity:>10} {ops_per_sec:>14,.0f} {hit_ratio:>10.2%} {peak_memory_bytes:>14,} '
+                  '{p99_latency_ns:>10,}'.format(**result))
+
+    return results
+
+
+def benchmark_clock(capacities=(10 ** 4,), length=500000):
+    """Compares the hit ratio and ops/sec of exact LRU and CLOCK on the same standard traces."""
+    results = []
+
+    print('{:<22} {:>10} {:>12} {:>12} {:>14} {:>14}'.format(
+        'trace', 'capacity', 'lru hits', 'clock hits', 'lru ops/sec', 'clock ops/sec'))
+    for capacity in capacities:
+        for name, keys, ops in generate_traces(capacity, length):
+            result = {'trace': name, 'capacity': capacity}
+            for policy in ('lru', 'clock'):
+                hits, lookups, elapsed, _ = replay_ops(make_cache(policy, capacity), keys, ops)
+                result[policy + '_hit_ratio'] = hits / lookups if lookups else 0.0
+                result[policy + '_ops_per_sec'] = len(keys) / elapsed
+            results.append(result)
+            print('{trace:<22} {capacity:>10} {lru_hit_ratio:>12.2%} {clock_hit_ratio:>12.2%} '
+                  '{lru_ops_per_sec:>14,.0f} {clock_ops_per_sec:>14,.0f}'.format(**result))
+
+    return results
+
+
+def make_tree(root, depth, fanout, files, suffixes=('.c', '.h', '.py', '.txt')):
+    """
+    Builds a synthetic tree with fanout subdirectories per directory, down to the given depth.
+
+    :param root: The existing directory to build the tree in.
+    :param depth: Number of directory levels beneath the root.
+    :param fanout: Number of subdirectories in each directory above the bottom level.
+    :param files: Number of files in each directory, cycling through the suffixes.
+    :param suffixes: The file name suffixes.
+    :return: tuple - the number of directories and files created, including the root
+    """
+    directories = 0
+    level = [root]
+    for current in range(depth + 1):
+        next_level = []
+        for path in level:
+            directories += 1
+            for i in range(files):
+                open(os.path.join(path, 'file{}{}'.format(i, suffixes[i % len(suffixes)])), 'w').close()
+            if current < depth:
+                for i in range(fanout):
+                    subdirectory = os.path.join(path, 'dir{}'.format(i))
+                    os.mkdir(subdirectory)
+                    next_level.append(subdirectory)
+        level = next_level
+
+    return directories, directories * files
+
+
+TREE_SHAPES = {
+    'bushy': {'depth': 4, 'fanout': 6, 'files': 10},
+    'chain': {'depth': 500, 'fanout': 1, 'files': 2},
+    'deep': {'depth': 10, 'fanout': 2, 'files': 10},
+    'flat': {'depth': 0, 'fanout': 0, 'files': 100000},
+    'million': {'depth': 2, 'fanout': 100, 'files': 100},
+    'wide': {'depth': 1, 'fanout': 2000, 'files': 10},
+}
+
+# Building the million file tree takes minutes, so it only runs when named with --tree.
+DEFAULT_TREES = ('bushy', 'chain', 'deep', 'flat', 'wide')
+
+
+def best_time(walk, rounds):
+    """Returns the best wall time of a few rounds of the walk, once the directories are in the page cache."""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in walk():
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_find_parallel(trees=('bushy', 'deep', 'wide'), workers=(1, 2, 4, 8, 16), rounds=3):
+    """Compares the wall time of the serial walk and the parallel walk with a growing number of threads."""
+    results = []
+
+    print('{:<8} {:>8} {:>8} {:>10} {:>12} {:>10}'.format('tree', 'files', 'workers', 'mode', 'seconds', 'speedup'))
+    for shape in trees:
+        with tempfile.TemporaryDirectory() as root:
+            directories, files = make_tree(root, **TREE_SHAPES[shape])
+
+            serial = best_time(lambda: iter_files('.c', root), rounds)
+            runs = [('serial', 1, serial)]
+            for count in workers:
+                for ordered in (True, False):
+                    mode = 'ordered' if ordered else 'unordered'
+                    runs.append((mode, count, best_time(lambda: iter_files_parallel('.c', root, count, ordered),
+                                                        rounds)))
+
+            for mode, count, seconds in runs:
+                results.append({'tree': shape, 'directories': directories, 'files': files, 'workers': count,
+                                'mode': mode, 'seconds': seconds, 'speedup': serial / seconds})
+                print('{:<8} {:>8} {:>8} {:>10} {:>12.4f} {:>9.2f}x'.format(
+                    shape, files, count, mode, seconds, serial / seconds))
+
+    return results
+
+
+def listdir_find_files(suffix, path):
+    """Baseline for the tree benchmark: the original recursive os.listdir walk with a stat per entry."""
+    files = []
+    for entry in os.listdir(path):
+        fullpath = os.path.join(path, entry)
+        if os.path.isdir(fullpath):
+            files.extend(listdir_find_files(suffix, fullpath))
+
+        elif os.path.isfile(fullpath) and entry.endswith(suffix):
+            files.append(fullpath)
+
+    return files
+
+
+def walk_find_files(suffix, path):
+    """Baseline for the tree benchmark: the standard library's os.walk."""
+    return [os.path.join(directory, name) for directory, _, names in os.walk(path) for name in names
+            if name.endswith(suffix)]
+
+
+class Counted_Entry:
+    """Wraps an os.DirEntry to count the system calls its methods make."""
+
+    __slots__ = ('entry', 'counts', 'stated')
+
+    def __init__(self, entry, counts):
+        self.entry = entry
+        self.counts = counts
+        self.stated = False
+
+    @property
+    def name(self):
+        return self.entry.name
+
+    @property
+    def path(self):
+        return self.entry.path
+
+    def is_dir(self, follow_symlinks=True):
+        self._count_follow(follow_symlinks)
+        return self.entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_file(self, follow_symlinks=True):
+        self._count_follow(follow_symlinks)
+        return self.entry.is_file(follow_symlinks=follow_symlinks)
+
+    def stat(self, follow_symlinks=True):
+        # The result is cached on the entry, so only the first call makes a system call.
+        if not self.stated:
+            self.stated = True
+            self.counts['stat'] += 1
+        return self.entry.stat(follow_symlinks=follow_symlinks)
+
+    def _count_follow(self, follow_symlinks):
+        """The type of an entry comes with the directory read, except that following a symlink needs a stat."""
+        if follow_symlinks and not self.stated and self.entry.is_symlink():
+            self.stated = True
+            self.counts['stat'] += 1
+
+
+class Counted_Scandir:
+    """Wraps an os.scandir iterator to count the directory read and wrap its entries."""
+
+    def __init__(self, iterator, counts):
+        self.iterator = iterator
+        self.counts = counts
+        counts['scandir'] += 1
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return Counted_Entry(next(self.iterator), self.counts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.iterator.close()
+
+
+def count_syscalls(walk):
+    """
+    Counts the filesystem system calls the walk makes, by wrapping the os functions that make them.
+
+    Reading a directory costs at least 3 calls (open, getdents, close) and a stat costs 1.  The calls made inside C
+    code, such as a getdents per 32 KB of entries, are not seen, so the count is a lower bound.
+
+    :param walk: Function that walks the tree.
+    :return: int - the estimated number of system calls
+    """
+    counts = {'scandir': 0, 'listdir': 0, 'stat': 0}
+    scandir, listdir, stat, lstat = os.scandir, os.listdir, os.stat, os.lstat
+
+    def counted(name, function):
+        def call(*args, **kwargs):
+            counts[name] += 1
+            return function(*args, **kwargs)
+        return call
+
+    os.scandir = lambda *args: Counted_Scandir(scandir(*args), counts)
+    os.listdir = counted('listdir', listdir)
+    os.stat = counted('stat', stat)
+    os.lstat = counted('stat', lstat)
+    try:
+        walk()
+    finally:
+        os.scandir, os.listdir, os.stat, os.lstat = scandir, listdir, stat, lstat
+
+    return 3 * (counts['scandir'] + counts['listdir']) + counts['stat']
+
+
+def measure_walk_memory(walk):
+    """Returns the peak bytes Python allocates during the walk."""
+    gc.collect()
+    tracemalloc.start()
+    walk()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def benchmark_find_trees(trees=DEFAULT_TREES, rounds=3, suffix='.c'):
+    """Measures the wall time, system calls per file, and peak memory of each traversal engine on synthetic trees."""
+    results = []
+
+    print('{:<8} {:>8} {:>8} {:<12} {:>10} {:>13} {:>12}'.format(
+        'tree', 'dirs', 'files', 'engine', 'seconds', 'syscalls/file', 'peak KB'))
+    for shape in trees:
+        with tempfile.TemporaryDirectory() as root:
+            directories, files = make_tree(root, **TREE_SHAPES[shape])
+
+            cache = Find_Files_Cache(max_bytes=2 ** 40, capacity=1)
+            cache.find_files(suffix, root)
+            engines = [
+                ('listdir', lambda: listdir_find_files(suffix, root)),
+                ('os.walk', lambda: walk_find_files(suffix, root)),
+                ('find_files', lambda: find_files(suffix, root)),
+                ('nofollow', lambda: find_files(suffix, root, follow_symlinks=False)),
+                ('streaming', lambda: sum(1 for _ in iter_files(suffix, root, follow_symlinks=False))),
+                ('parallel', lambda: find_files(suffix, root, workers=4)),
+                ('cached', lambda: cache.find_files(suffix, root)),
+                ('then stat', lambda: [os.stat(path) for path in find_files(suffix, root)]),
+                ('stats', lambda: find_files(suffix, root, stats=True)),
+            ]
+
+            for engine, walk in engines:
+                # The chain is deeper than the recursive walks can go with some recursion limits.
+                if engine == 'listdir' and TREE_SHAPES[shape]['depth'] >= sys.getrecursionlimit() - 100:
+                    continue
+
+                result = {
+                    'tree': shape,
+                    'directories': directories,
+                    'files': files,
+                    'engine': engine,
+                    'seconds': best_time(lambda: [walk()], rounds),
+                    'syscalls_per_file': count_syscalls(walk) / files,
+                    'peak_bytes': measure_walk_memory(walk),
+                }
+                results.append(result)
+                print('{tree:<8} {directories:>8} {files:>8} {engine:<12} {seconds:>10.4f} '
+                      '{syscalls_per_file:>13.2f} {:>12,.0f}'.format(result['peak_bytes'] / 1024, **result))
+
+    return results
+
+
+def benchmark_find_patterns(counts=(1, 4, 16, 64, 256), names=100000):
+    """Compares the cost per file name of the pattern matcher and of checking each suffix in turn."""
+    results = []
+    rng = random.Random(0)
+    extensions = ['.ext{}'.format(i) for i in range(max(counts) * 2)]
+    file_names = ['file{}{}'.format(i, rng.choice(extensions)) for i in range(names)]
+
+    print('{:>10} {:>16} {:>16}'.format('patterns', 'trie ns/name', 'loop ns/name'))
+    for count in counts:
+        suffixes = extensions[:count - count // 4] + ['test_*{}'.format(ext) for ext in extensions[:count // 4]]
+        matcher = Pattern_Matcher(suffixes)
+
+        start = time.perf_counter()
+        for name in file_names:
+            matcher.match(name)
+        trie = time.perf_counter() - start
+
+        plain = [suffix for suffix in suffixes if '*' not in suffix]
+        start = time.perf_counter()
+        for name in file_names:
+            [suffix for suffix in plain if name.endswith(suffix)]
+        loop = time.perf_counter() - start
+
+        result = {'patterns': count, 'trie_ns_per_name': trie / names * 1e9, 'loop_ns_per_name': loop / names * 1e9}
+        results.append(result)
+        print('{patterns:>10} {trie_ns_per_name:>16.0f} {loop_ns_per_name:>16.0f}'.format(**result))
+
+    return results
+
+
+def english_text(length, seed=0):
+    """Returns text of the given length from words with a Zipfian frequency, so the codes vary in length."""
+    words = ['the', 'of', 'and', 'to', 'in', 'a', 'is', 'that', 'for', 'it', 'as', 'was', 'with', 'be', 'by', 'on',
+             'not', 'he', 'this', 'are', 'or', 'his', 'from', 'at', 'which', 'but', 'have', 'an', 'had', 'they', 'you',
+             'were', 'their', 'one', 'all', 'we', 'can', 'her', 'has', 'there', 'been', 'if', 'more', 'when', 'will',
+             'Huffman', 'coding', 'compression', 'frequency', 'tree']
+    indices = zipf_trace(length // 4 + 1, len(words), 1.0, seed)
+    return ' '.join(words[index - 1] for index in indices)[:length]
+
+
+def benchmark_huffman(lengths=(10 ** 4, 10 ** 5, 10 ** 6)):
+    """Compares the time and memory of the string and packed Huffman encodings."""
+    results = []
+
+    print('{:>9} {:<7} {:>12} {:>12} {:>12} {:>14}'.format(
+        'chars', 'form', 'encode s', 'decode s', 'output KB', 'encode peak KB'))
+    for length in lengths:
+        data = english_text(length)
+        for form, packed in (('string', False), ('packed', True)):
+            gc.collect()
+            tracemalloc.start()
+            encoded, tree = huffman_encoding(data, packed=packed)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            huffman_encoding(data, packed=packed)
+            encode = time.perf_counter() - start
+
+            start = time.perf_counter()
+            decoded = huffman_decoding(encoded, tree)
+            decode = time.perf_counter() - start
+            assert decoded == data
+
+            result = {'chars': length, 'form': form, 'encode_seconds': encode, 'decode_seconds': decode,
+                      'output_bytes': sys.getsizeof(encoded[0] if packed else encoded), 'encode_peak_bytes': peak}
+            results.append(result)
+            print('{chars:>9} {form:<7} {encode_seconds:>12.4f} {decode_seconds:>12.4f} {:>12,.1f} {:>14,.1f}'.format(
+                result['output_bytes'] / 1024, peak / 1024, **result))
+
+    return results
+
+
+BENCHMARKS = {
+    'clock': benchmark_clock,
+    'find_parallel': benchmark_find_parallel,
+    'find_patterns': benchmark_find_patterns,
+    'find_trees': benchmark_find_trees,
+    'huffman': benchmark_huffman,
+    'lru_memory': benchmark_lru_memory,
+    'lru_processes': benchmark_lru_processes,
+    'lru_threads': benchmark_lru_threads,
+    'lru_stats': benchmark_lru_stats,
+    'lru_traces': benchmark_lru_traces,
+    'lru_ttl': benchmark_lru_ttl,
+    'policies': benchmark_policies,
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs the benchmarks for the problem solutions.')
+    parser.add_argument('names', nargs='*', help='benchmarks to run (default: all): ' + ', '.join(sorted(BENCHMARKS)))
+    parser.add_argument('--json', metavar='PATH', help='write the results of the benchmarks that report them as JSON')
+    parser.add_argument('--capacity', dest='capacities', type=int, action='append', metavar='N',
+                        help='cache capacity to benchmark, repeatable')
+    parser.add_argument('--trace', dest='traces', action='append', metavar='PATH',
+                        help='trace file to replay, repeatable')
+    parser.add_argument('--tree', dest='trees', action='append', choices=sorted(TREE_SHAPES),
+                        help='synthetic tree shape to walk, repeatable')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error('unknown benchmark(s): ' + ', '.join(unknown))
+
+    # Only pass the options given on the command line, to the benchmarks that take them.
+    options = {name: value for name, value in (('capacities', args.capacities), ('traces', args.traces),
+                                                          ('trees', args.trees)) if value}
+
+    report = {'python': platform.python_version(), 'machine': platform.machine(), 'results': {}}
+    for name in args.names or sorted(BENCHMARKS):
+        benchmark = BENCHMARKS[name]
+        accepted = inspect.signature(benchmark).parameters
+        results = benchmark(**{option: value for option, value in options.items() if option in accepted})
+        if results is not None:
+            report['results'][name] = results
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(report, json_file, indent=2)
@@ -1,7 +1,32 @@
 #!/usr/bin/env python3
 
+import asyncio
+import functools
+import hashlib
+import inspect
+import math
+import mmap
+import multiprocessing
+import os
+import pickle
+import struct
+import tempfile
+import time
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+
 
 class CacheNode:
+    # Slots drop the per-node __dict__, which dominates memory for large caches.
+    __slots__ = ('key', 'value', 'next', 'prev')
+
+    # A plain node weighs 1 and never expires. These class attributes are read-only defaults; caches with a weigher
+    # or ttls use TimedCacheNode, whose slots shadow them, so plain nodes do not pay for the fields.
+    weight = 1
+    expires = None
+    timer = None
 
     def __init__(self, key, value):
         self.key = key
@@ -10,35 +35,419 @@ class CacheNode:
         self.prev = None
 
 
+class TimedCacheNode(CacheNode):
+    __slots__ = ('weight', 'expires', 'timer')
+
+    def __init__(self, key, value, weight=1):
+        super().__init__(key, value)
+        self.weight = weight
+        # Expiry time on the cache's clock (None never expires) and the timer wheel bucket holding the node.
+        self.expires = None
+        self.timer = None
+
+
+class TimerWheel:
+    """
+    Hierarchical timer wheel that finds expired nodes in amortized O(1).
+
+    Level 0 has one bucket per tick. Each higher level has buckets spanning a whole turn of the level below it.
+    As time advances, the buckets that were passed are drained: expired nodes are returned, and the rest cascade
+    down into a finer bucket.
+    """
+
+    def __init__(self, now, resolution=1.0, slots=64, levels=4):
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self.current = int(now // resolution)
+        self.wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+
+    def schedule(self, node):
+        """Adds the node to the bucket for its expiry time."""
+        tick = max(int(node.expires // self.resolution), self.current)
+        delta = tick - self.current
+
+        # Find the finest level whose turn covers the delay. Longer delays wait in the top level and cascade again.
+        span = 1
+        for level in range(self.levels):
+            if delta < span * self.slots or level == self.levels - 1:
+                break
+            span *= self.slots
+
+        bucket = self.wheels[level][(tick // span) % self.slots]
+        bucket.add(node)
+        node.timer = bucket
+
+    def cancel(self, node):
+        """Removes the node from its bucket."""
+        if node.timer is not None:
+            node.timer.discard(node)
+            node.timer = None
+
+    def advance(self, now):
+        """Moves the wheel to the given time and returns a list of the nodes that have expired."""
+        previous = self.current
+        current = int(now // self.resolution)
+        if current <= previous:
+            return []
+        self.current = current
+
+        expired = []
+        span = 1
+        for wheel in self.wheels:
+            previous_ticks = previous // span
+            delta = current // span - previous_ticks
+
+            # When this level did not turn, neither did the levels above it.
+            if delta == 0:
+                break
+
+            # Drain every bucket passed since the last advance, at most one full turn.
+            start = previous_ticks % self.slots
+            for i in range(start, start + min(delta, self.slots - 1) + 1):
+                index = i % self.slots
+                bucket = wheel[index]
+                wheel[index] = set()
+                for node in bucket:
+                    node.timer = None
+                    if node.expires <= now:
+                        expired.append(node)
+                    else:
+                        self.schedule(node)
+
+            span *= self.slots
+
+        return expired
+
+
+class LatencyHistogram:
+    """Histogram of latencies in power-of-2 nanosecond buckets."""
+
+    def __init__(self):
+        self.buckets = [0] * 64
+        self.count = 0
+        self.total = 0
+
+    def record(self, seconds):
+        """Adds the given latency, in seconds, to its bucket."""
+        nanoseconds = int(seconds * 1e9)
+        self.buckets[min(nanoseconds.bit_length(), 63)] += 1
+        self.count += 1
+        self.total += nanoseconds
+
+    def percentile(self, percent):
+        """Returns the upper bound, in nanoseconds, of the bucket holding the given percentile (0-100)."""
+        if self.count == 0:
+            return 0
+
+        rank = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return 1 << bucket
+
+    def mean(self):
+        """Returns the mean latency in nanoseconds."""
+        return self.total / self.count if self.count else 0
+
+
+class CacheStats:
+    """Counters and sampled latency histograms of an LRU_Cache with stats enabled."""
+
+    def __init__(self, sample_every):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+
+        # Only every Nth get and set is timed, which keeps the clock calls off most operations.
+        self.sample_every = sample_every
+        self.gets_until_sample = sample_every
+        self.sets_until_sample = sample_every
+        self.get_latency = LatencyHistogram()
+        self.set_latency = LatencyHistogram()
+
+
+class Segment:
+    """One preallocated, memory-mapped, append-only segment file of a DiskTier."""
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.used = 0
+        # Bytes of the records still in the index. The rest is garbage left by promotions and overwrites.
+        self.live = 0
+
+        self.file = open(path, 'w+b')
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+
+    def append(self, data):
+        """Writes the data at the end of the segment and returns its offset."""
+        offset = self.used
+        self.map[offset:offset + len(data)] = data
+        self.used += len(data)
+        return offset
+
+    def read(self, offset, length):
+        return self.map[offset:offset + length]
+
+    def close(self):
+        """Unmaps and deletes the segment file."""
+        self.map.close()
+        self.file.close()
+        os.remove(self.path)
+
+
+class DiskTier:
+    """
+    Disk-backed second tier (L2) for LRU_Cache.
+
+    Entries evicted from the cache are pickled into records appended to memory-mapped segment files, and an
+    in-memory index maps each key to its segment, offset, and length. A record is dropped from the index when the
+    entry is promoted back into the cache or set again, which leaves garbage in its segment. Sealed segments whose
+    live bytes fall below the compact_below ratio are compacted in a background thread by copying the live records
+    into the active segment. When max_bytes is given, the oldest segments are dropped to stay under it.
+    """
+    # Each record is the key's and the value's pickle lengths, followed by both pickles.
+    RECORD_HEADER = struct.Struct('<II')
+
+    def __init__(self, directory=None, segment_size=64 * 1024 * 1024, max_bytes=None, compact_below=0.5):
+        self.owns_directory = directory is None
+        self.directory = tempfile.mkdtemp(prefix='lru-l2-') if directory is None else directory
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        self.compact_below = compact_below
+
+        self.index = dict()
+        # Oldest first. The last segment is the active one that records are appended to.
+        self.segments = []
+        self.next_id = 0
+
+        self.lock = Lock()
+        self.compactor = ThreadPoolExecutor(max_workers=1)
+        self.compacting = set()
+
+    def __len__(self):
+        return len(self.index)
+
+    def put(self, key, value):
+        """Stores the entry, replacing any older record for the key. Returns False if the record is too large."""
+        key_data = pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+        value_data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        data = self.RECORD_HEADER.pack(len(key_data), len(value_data)) + key_data + value_data
+        if len(data) > self.segment_size:
+            return False
+
+        with self.lock:
+            self._discard(key)
+            self._append(key, data)
+        return True
+
+    def pop(self, key):
+        """Removes the entry and returns a (found, value) tuple."""
+        with self.lock:
+            entry = self.index.pop(key, None)
+            if entry is None:
+                return False, None
+
+            segment, offset, length = entry
+            data = segment.read(offset, length)
+            segment.live -= length
+            self._maybe_compact(segment)
+
+        key_length, _ = self.RECORD_HEADER.unpack_from(data)
+        return True, pickle.loads(data[self.RECORD_HEADER.size + key_length:])
+
+    def discard(self, key):
+        """Removes the entry, if stored."""
+        with self.lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        entry = self.index.pop(key, None)
+        if entry is not None:
+            segment, _, length = entry
+            segment.live -= length
+            self._maybe_compact(segment)
+
+    def _append(self, key, data):
+        """Appends the record to the active segment, rolling to a new segment when it is full."""
+        segment = self.segments[-1] if self.segments else None
+        if segment is None or segment.used + len(data) > segment.size:
+            segment = self._roll()
+
+        offset = segment.append(data)
+        segment.live += len(data)
+        self.index[key] = (segment, offset, len(data))
+
+    def _roll(self):
+        """Seals the active segment and starts a new one, dropping the oldest segments when over max_bytes."""
+        if self.segments:
+            sealed = self.segments[-1]
+            self.segments.append(self._new_segment())
+            self._maybe_compact(sealed)
+        else:
+            self.segments.append(self._new_segment())
+
+        if self.max_bytes is not None:
+            while len(self.segments) > 1 and len(self.segments) * self.segment_size > self.max_bytes:
+                self._drop(self.segments[0])
+
+        return self.segments[-1]
+
+    def _new_segment(self):
+        path = os.path.join(self.directory, 'segment-{}.dat'.format(self.next_id))
+        self.next_id += 1
+        return Segment(path, self.segment_size)
+
+    def _records(self, segment):
+        """Yields the key, offset, and length of each record in the segment."""
+        offset = 0
+        header_size = self.RECORD_HEADER.size
+        while offset < segment.used:
+            key_length, value_length = self.RECORD_HEADER.unpack_from(segment.map, offset)
+            key = pickle.loads(segment.read(offset + header_size, key_length))
+            length = header_size + key_length + value_length
+            yield key, offset, length
+            offset += length
+
+    def _is_indexed(self, key, segment, offset):
+        """Checks if the index still points the key at the given record."""
+        entry = self.index.get(key)
+        return entry is not None and entry[0] is segment and entry[1] == offset
+
+    def _drop(self, segment):
+        """Deletes the segment and the index entries of its live records."""
+        for key, offset, _ in self._records(segment):
+            if self._is_indexed(key, segment, offset):
+                del self.index[key]
+
+        self.segments.remove(segment)
+        segment.close()
+
+    def _maybe_compact(self, segment):
+        """Schedules a background compaction of a sealed segment that is mostly garbage."""
+        if segment is self.segments[-1] or segment in self.compacting or segment not in self.segments:
+            return
+
+        if segment.live < self.compact_below * segment.used:
+            self.compacting.add(segment)
+            self.compactor.submit(self._compact, segment)
+
+    def _compact(self, segment):
+        """Copies the segment's live records into the active segment and then deletes it. Runs in the background."""
+        with self.lock:
+            if segment not in self.segments:
+                self.compacting.discard(segment)
+                return
+            records = list(self._records(segment))
+
+        # Copy one record at a time, so that gets and sets are not blocked for the whole segment.
+        for key, offset, length in records:
+            with self.lock:
+                if segment not in self.segments:
+                    break
+                if self._is_indexed(key, segment, offset):
+                    data = segment.read(offset, length)
+                    segment.live -= length
+                    self._append(key, data)
+
+        with self.lock:
+            if segment in self.segments:
+                self.segments.remove(segment)
+                segment.close()
+            self.compacting.discard(segment)
+
+    def clear(self):
+        """Deletes every entry and segment."""
+        with self.lock:
+            for segment in self.segments:
+                segment.close()
+            self.segments = []
+            self.index.clear()
+
+    def close(self):
+        """Waits for any compaction, deletes the segments, and removes the directory if the tier created it."""
+        self.compactor.shutdown(wait=True)
+        self.clear()
+        if self.owns_directory:
+            os.rmdir(self.directory)
+
+
 class LRU_Cache:
+    # A snapshot file is the magic bytes followed by one record per entry, MRU first. Each record is the lengths of
+    # the pickled key and value and the remaining ttl (NaN for none), followed by both pickles.
+    SNAPSHOT_MAGIC = b'LRU\x01'
+    SNAPSHOT_RECORD = struct.Struct('<IId')
 
-    def __init__(self, capacity):
+    def __init__(self, capacity, weigher=None, max_weight=None, default_ttl=None, clock=time.monotonic,
+                 on_evict=None, l2=None):
+        """
+        :param capacity: Maximum number of entries.
+        :param weigher: Optional callable, weigher(key, value), returning the weight of an entry, e.g. its size in
+                        bytes. Without one, each entry weighs 1.
+        :param max_weight: Optional maximum total weight of the cached entries.
+        :param default_ttl: Optional time-to-live, in seconds, for entries set without their own ttl.
+        :param clock: Callable returning the current time in seconds.
+        :param on_evict: Optional callback, on_evict(key, value), called for each entry removed by LRU pressure, the
+                         weight budget, or expiry.
+        :param l2: Optional DiskTier. Entries removed by LRU pressure or the weight budget spill into it, and a get
+                   that misses falls through to it and promotes the entry back into the cache.
+        """
         self.capacity = capacity
+        self.weigher = weigher
+        self.max_weight = max_weight
+        self.total_weight = 0
+        self.default_ttl = default_ttl
+        self.clock = clock
         self.hashtable = dict()
 
+        # The timer wheel is only built once an entry has a time-to-live.
+        self.timers = None
+
+        self.on_evict = on_evict
+        self.stats = None
+        self.l2 = l2
+
         # Buffered dummy head and tail.
         self.head = CacheNode(0, 0)
         self.tail = CacheNode(0, 0)
         self.head.next = self.tail
         self.tail.prev = self.head
 
+    def __len__(self):
+        return len(self.hashtable)
+
     def get(self, key):
         """If cached, moves the node to the front (MRU) position in the linked list and then returns the value.
                 Else, returns -1."""
         if self.capacity == 0:
             return -1
 
-        # Return -1 if a falsey is given for the key or the key is not in the cache.
-        if not bool(key) or key not in self.hashtable:
+        # Return -1 if a falsey is given for the key.
+        if not bool(key):
             return -1
 
+        # On a miss, fall through to the L2 tier. Else, return -1.
+        if key not in self.hashtable:
+            return -1 if self.l2 is None else self._promote(key)
+
         node = self.hashtable[key]
+
+        # Expired entries are removed lazily, the first time they are looked up.
+        if node.expires is not None and node.expires <= self.clock():
+            self._evict(node)
+            return -1
+
         self._move_to_front(node)
         return node.value
 
-    def set(self, key, value):
+    def set(self, key, value, ttl=None):
         """If the key exists, changes the node's value and moves the node to the front (MRU) position in the
-        linked list. Else, creates a new node and adds it into the cache."""
+        linked list. Else, creates a new node and adds it into the cache. The entry expires after the given ttl
+        (in seconds), falling back to the cache's default_ttl."""
         if self.capacity == 0:
             return -1
 
@@ -46,19 +455,163 @@ class LRU_Cache:
         if not bool(key):
             return -1
 
-        if key in self.hashtable:
-            node = self.hashtable[key]
+        if ttl is None:
+            ttl = self.default_ttl
+
+        # Reclaim the entries that expired since the last set.
+        if self.timers is not None:
+            self.expire()
+
+        if self._put(key, value, ttl) is None:
+            return -1
+        self._shrink()
+
+    def get_many(self, keys):
+        """
+        Looks up all of the given keys in one pass, moving each hit to the front (MRU) position.
+
+        :param keys: Iterable of keys.
+        :return: tuple - dict of the hits' keys and values, list of the missed keys
+        """
+        hits = dict()
+        misses = []
+
+        if self.capacity == 0:
+            misses.extend(keys)
+            return hits, misses
+
+        hashtable = self.hashtable
+        now = None
+
+        for key in keys:
+            # Falsey keys are never cached.
+            node = hashtable.get(key) if bool(key) else None
+            if node is None:
+                misses.append(key)
+                continue
+
+            if node.expires is not None:
+                # Read the clock once for the whole batch.
+                if now is None:
+                    now = self.clock()
+                if node.expires <= now:
+                    self._evict(node)
+                    misses.append(key)
+                    continue
+
+            # Only relink the node if it is not already in the MRU position.
+            if node is not self.head.next:
+                self._remove(node)
+                self._add(node)
+
+            hits[key] = node.value
+
+        # Fall through to the L2 tier for the misses, evicting once for the whole batch.
+        if self.l2 is not None and misses:
+            l1_misses, misses = misses, []
+            for key in l1_misses:
+                # A key repeated in the batch was already promoted by its first miss.
+                if bool(key) and key in hits:
+                    continue
+                found, value = self.l2.pop(key) if bool(key) else (False, None)
+                if found:
+                    self._put(key, value, None)
+                    hits[key] = value
+                else:
+                    misses.append(key)
+            self._shrink()
+
+        return hits, misses
+
+    def set_many(self, items, ttl=None):
+        """
+        Caches all of the given items in one pass, evicting LRU nodes once at the end of the batch.
+
+        :param items: dict or iterable of (key, value) pairs. Items with a falsey key are skipped.
+        :param ttl: Optional time-to-live, in seconds, for every item, falling back to the cache's default_ttl.
+        """
+        if self.capacity == 0:
+            return -1
+
+        if ttl is None:
+            ttl = self.default_ttl
+
+        if self.timers is not None:
+            self.expire()
+
+        if isinstance(items, dict):
+            items = items.items()
+
+        for key, value in items:
+            if bool(key):
+                self._put(key, value, ttl)
+
+        self._shrink()
+
+    def _put(self, key, value, ttl):
+        """Stores the key and value in a new or existing node, moves it to the front (MRU) position and returns it.
+        Returns None, without storing it, for an entry heavier than the whole weight budget."""
+        weight = 1 if self.weigher is None else self.weigher(key, value)
+
+        # Making room for an entry that can never fit would evict every other entry first. The entry is rejected
+        # instead, and the key's old value, now stale, is dropped.
+        if self.max_weight is not None and weight > self.max_weight:
+            if key in self.hashtable:
+                self._evict(self.hashtable[key])
+            if self.l2 is not None:
+                self.l2.discard(key)
+            return None
+
+        # Only entries with a weight or a ttl need a TimedCacheNode.
+        plain = ttl is None and self.weigher is None
+
+        node = self.hashtable.get(key)
+        if node is not None and (plain or type(node) is TimedCacheNode):
             node.value = value
+            if self.weigher is not None:
+                self.total_weight += weight - node.weight
+                node.weight = weight
             self._move_to_front(node)
         else:
-            node = CacheNode(key, value)
+            if node is not None:
+                # A plain node has no slot for the ttl, so it is replaced by a timed one.
+                self._remove(node)
+                self.total_weight -= node.weight
+            elif self.l2 is not None:
+                # The new value makes any copy spilled to the L2 tier stale.
+                self.l2.discard(key)
+
+            node = CacheNode(key, value) if plain else TimedCacheNode(key, value, weight)
             self._add(node)
             self.hashtable[key] = node
+            self.total_weight += weight
 
-        # If the cache is overcapacity, remove the last node.
-        if len(self.hashtable) > self.capacity:
+        if node.timer is not None:
+            self.timers.cancel(node)
+
+        if ttl is None:
+            if node.expires is not None:
+                node.expires = None
+        else:
+            now = self.clock()
+            if self.timers is None:
+                self.timers = TimerWheel(now)
+            node.expires = now + ttl
+            self.timers.schedule(node)
+
+        return node
+
+    def _shrink(self):
+        """Removes LRU nodes until the cache is back within its capacity and weight budget."""
+        # If the cache is overcapacity, remove the last nodes. A negative capacity empties it.
+        while len(self.hashtable) > self.capacity and self.hashtable:
             self._remove_lru()
 
+        # If the cache is over its weight budget, remove as many LRU nodes as needed to get back under it.
+        if self.max_weight is not None:
+            while self.total_weight > self.max_weight and self.hashtable:
+                self._remove_lru()
+
     def _move_to_front(self, node):
         """Move the given node to the front (MRU) position in the linked list."""
         # Bail out if the node is already in position.
@@ -77,10 +630,59 @@ class LRU_Cache:
         next.prev = prev
 
     def _remove_lru(self):
-        """Removes the LRU node (previous to the tail) from the linked list."""
+        """Removes the LRU node (previous to the tail) from the linked list, spilling it to the L2 tier if any."""
         node = self.tail.prev
+        self._evict(node)
+
+        # Entries with a ttl are not spilled, as the L2 tier does not track expiry.
+        if self.l2 is not None and node.expires is None:
+            self.l2.put(node.key, node.value)
+
+    def _promote(self, key):
+        """Moves the entry from the L2 tier back into the cache and returns its value. Else, returns -1."""
+        found, value = self.l2.pop(key)
+        if not found:
+            return -1
+
+        self._put(key, value, None)
+        self._shrink()
+        return value
+
+    def _evict(self, node):
+        """Removes the given node from the linked list, the hashtable, and the timer wheel."""
         self._remove(node)
         del self.hashtable[node.key]
+        self.total_weight -= node.weight
+
+        if node.timer is not None:
+            self.timers.cancel(node)
+
+        if self.on_evict is not None:
+            self.on_evict(node.key, node.value)
+
+    def discard(self, key):
+        """Removes the key's entry, if cached, from the cache and the L2 tier. on_evict is not called."""
+        # Falsey keys are never cached, and some of them, e.g. [] or {}, cannot be hashed.
+        if not bool(key):
+            return
+
+        node = self.hashtable.pop(key, None)
+        if node is not None:
+            self._remove(node)
+            self.total_weight -= node.weight
+            if node.timer is not None:
+                self.timers.cancel(node)
+
+        if self.l2 is not None:
+            self.l2.discard(key)
+
+    def expire(self):
+        """Removes every expired entry from the cache."""
+        if self.timers is None:
+            return
+
+        for node in self.timers.advance(self.clock()):
+            self._evict(node)
 
     def _add(self, node):
         """Adds a node the front (MRU) position in the linked list), i.e. after the head."""
@@ -90,11 +692,1266 @@ class LRU_Cache:
         self.head.next.prev = node
         self.head.next = node
 
+    def dump(self, path):
+        """
+        Writes the entries to a snapshot file in recency order, from head.next down to tail.prev.
+
+        Entries are written one at a time, so a dump does not build a copy of the cache in memory. The file is
+        written beside the path and then renamed over it, so a reader never sees a partial snapshot.
+
+        :param path: Path of the snapshot file.
+        :return: int - number of entries written
+        """
+        now = self.clock() if self.timers is not None else None
+        count = 0
+
+        with open(path + '.tmp', 'wb') as snapshot:
+            snapshot.write(self.SNAPSHOT_MAGIC)
+
+            node = self.head.next
+            while node is not self.tail:
+                ttl = math.nan if node.expires is None else node.expires - now
+
+                # Skip the expired entries. NaN compares False, so entries without a ttl are kept.
+                if not ttl <= 0:
+                    key_data = pickle.dumps(node.key, pickle.HIGHEST_PROTOCOL)
+                    value_data = pickle.dumps(node.value, pickle.HIGHEST_PROTOCOL)
+                    snapshot.write(self.SNAPSHOT_RECORD.pack(len(key_data), len(value_data), ttl))
+                    snapshot.write(key_data)
+                    snapshot.write(value_data)
+                    count += 1
+
+                node = node.next
+
+        os.replace(path + '.tmp', path)
+        return count
+
+    def load(self, path):
+        """
+        Replaces the entries with those of a snapshot file written by dump().
+
+        The hashtable and the linked list are rebuilt in one O(n) pass that appends each node after the last one,
+        rather than n calls to set(). Records are read one at a time. When the snapshot holds more than the capacity
+        or the weight budget allows, the LRU end of it is skipped.
+
+        :param path: Path of the snapshot file.
+        :return: int - number of entries loaded
+        """
+        self.clear()
+        if self.capacity == 0:
+            return 0
+
+        now = self.clock()
+        record = self.SNAPSHOT_RECORD
+        last = self.head
+
+        try:
+            with open(path, 'rb') as snapshot:
+                if snapshot.read(len(self.SNAPSHOT_MAGIC)) != self.SNAPSHOT_MAGIC:
+                    raise ValueError('Not an LRU_Cache snapshot: {}'.format(path))
+
+                while len(self.hashtable) < self.capacity:
+                    header = snapshot.read(record.size)
+                    if not header:
+                        break
+                    if len(header) < record.size:
+                        raise ValueError('Truncated LRU_Cache snapshot: {}'.format(path))
+
+                    key_length, value_length, ttl = record.unpack(header)
+                    data = snapshot.read(key_length + value_length)
+                    if len(data) < key_length + value_length:
+                        raise ValueError('Truncated LRU_Cache snapshot: {}'.format(path))
+
+                    key = pickle.loads(data[:key_length])
+                    value = pickle.loads(data[key_length:])
+                    if key in self.hashtable:
+                        continue
+
+                    weight = 1 if self.weigher is None else self.weigher(key, value)
+                    if self.max_weight is not None and self.total_weight + weight > self.max_weight:
+                        break
+
+                    # Append the node after the last one, so that the list keeps the snapshot's recency order.
+                    if math.isnan(ttl) and self.weigher is None:
+                        node = CacheNode(key, value)
+                    else:
+                        node = TimedCacheNode(key, value, weight)
+                    node.prev = last
+                    last.next = node
+                    last = node
+                    self.hashtable[key] = node
+                    self.total_weight += weight
+
+                    if not math.isnan(ttl):
+                        if self.timers is None:
+                            self.timers = TimerWheel(now)
+                        node.expires = now + ttl
+                        self.timers.schedule(node)
+        except BaseException:
+            # The list is only closed off after the last record, so a failed load must not leave it half linked.
+            self.clear()
+            raise
+
+        last.next = self.tail
+        self.tail.prev = last
+        return len(self.hashtable)
+
+    def enable_stats(self, sample_every=100):
+        """
+        Opts in to hit, miss, set, and eviction counters, plus latency histograms sampled every Nth get and set.
+
+        The instrumented methods shadow the plain ones on this instance only, so a cache without stats runs the
+        plain methods and pays nothing.
+        """
+        self.disable_stats()
+        stats = self.stats = CacheStats(sample_every)
+        plain_get, plain_set, plain_get_many, plain_set_many, plain_evict = (
+            self.get, self.set, self.get_many, self.set_many, self._evict)
+
+        def instrumented_get(key):
+            stats.gets_until_sample -= 1
+            if stats.gets_until_sample:
+                value = plain_get(key)
+            else:
+                stats.gets_until_sample = sample_every
+                start = time.perf_counter()
+                value = plain_get(key)
+                stats.get_latency.record(time.perf_counter() - start)
+
+            # After a get, the key is only cached if it was a hit, as misses and expired entries are not.
+            if bool(key) and key in self.hashtable:
+                stats.hits += 1
+            else:
+                stats.misses += 1
+            return value
+
+        def instrumented_set(key, value, ttl=None):
+            stats.sets_until_sample -= 1
+            if stats.sets_until_sample:
+                result = plain_set(key, value, ttl)
+            else:
+                stats.sets_until_sample = sample_every
+                start = time.perf_counter()
+                result = plain_set(key, value, ttl)
+                stats.set_latency.record(time.perf_counter() - start)
+
+            if result is None:
+                stats.sets += 1
+            return result
+
+        def instrumented_get_many(keys):
+            hits, misses = plain_get_many(keys)
+            stats.hits += len(hits)
+            stats.misses += len(misses)
+            return hits, misses
+
+        def instrumented_set_many(items, ttl=None):
+            items = list(items.items() if isinstance(items, dict) else items)
+            result = plain_set_many(items, ttl)
+            if result is None:
+                stats.sets += sum(1 for key, _ in items if bool(key))
+            return result
+
+        def instrumented_evict(node):
+            stats.evictions += 1
+            plain_evict(node)
+
+        self.get = functools.wraps(plain_get)(instrumented_get)
+        self.set = functools.wraps(plain_set)(instrumented_set)
+        self.get_many = functools.wraps(plain_get_many)(instrumented_get_many)
+        self.set_many = functools.wraps(plain_set_many)(instrumented_set_many)
+        self._evict = instrumented_evict
+
+    def disable_stats(self):
+        """Removes the instrumented methods, restoring the plain ones, and discards the stats."""
+        for name in ('get', 'set', 'get_many', 'set_many', '_evict'):
+            self.__dict__.pop(name, None)
+        self.stats = None
+
+    def get_stats(self):
+        """Returns a dictionary snapshot of the stats, with latencies in nanoseconds, or None if not enabled."""
+        stats = self.stats
+        if stats is None:
+            return None
+
+        lookups = stats.hits + stats.misses
+        snapshot = {
+            'hits': stats.hits,
+            'misses': stats.misses,
+            'hit_ratio': stats.hits / lookups if lookups else 0.0,
+            'sets': stats.sets,
+            'evictions': stats.evictions,
+            'size': len(self.hashtable),
+            'total_weight': self.total_weight,
+        }
+        for name, histogram in (('get', stats.get_latency), ('set', stats.set_latency)):
+            snapshot[name + '_latency'] = {
+                'samples': histogram.count,
+                'mean': histogram.mean(),
+                'p50': histogram.percentile(50),
+                'p99': histogram.percentile(99),
+            }
+        return snapshot
+
     def clear(self):
         """Empties the cache."""
         self.hashtable.clear()
+        self.total_weight = 0
+        self.timers = None
+        if self.l2 is not None:
+            self.l2.clear()
         self.head = CacheNode(0, 0)
         self.tail = CacheNode(0, 0)
+        self.head.next = self.tail
+        self.tail.prev = self.head
+
+
+class Compact_LRU_Cache:
+    """
+    LRU Cache whose recency list lives in parallel preallocated arrays instead of node objects.
+
+    Each entry occupies a slot index. The prev and next arrays hold the slot indices of the neighbors, and the keys
+    and values lists hold the entry itself. Unused slots are threaded together through the next array as a free
+    list. Slot 0 is the dummy head and slot 1 is the dummy tail.
+    """
+    HEAD = 0
+    TAIL = 1
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.hashtable = dict()
+        self._allocate()
+
+    def get(self, key):
+        """If cached, moves the slot to the front (MRU) position in the recency list and then returns the value.
+                Else, returns -1."""
+        if self.capacity <= 0:
+            return -1
+
+        # Return -1 if a falsey is given for the key or the key is not in the cache.
+        if not bool(key) or key not in self.hashtable:
+            return -1
+
+        slot = self.hashtable[key]
+        self._move_to_front(slot)
+        return self.values[slot]
+
+    def set(self, key, value):
+        """If the key exists, changes the slot's value and moves the slot to the front (MRU) position in the
+        recency list. Else, stores the entry in a free slot, evicting the LRU slot when none is free."""
+        # A capacity of 0, or a negative one, leaves no slot to store an entry in.
+        if self.capacity <= 0:
+            return -1
+
+        # Return -1 if a falsey is given for the key.
+        if not bool(key):
+            return -1
+
+        if key in self.hashtable:
+            slot = self.hashtable[key]
+            self.values[slot] = value
+            self._move_to_front(slot)
+            return
+
+        # When the cache is full, the LRU slot is recycled for the new entry.
+        if self.free == -1:
+            self._remove_lru()
+
+        slot = self.free
+        self.free = self.next[slot]
+        self.keys[slot] = key
+        self.values[slot] = value
+        self._add(slot)
+        self.hashtable[key] = slot
+
+    def _move_to_front(self, slot):
+        """Move the given slot to the front (MRU) position in the recency list."""
+        # Bail out if the slot is already in position.
+        if slot == self.next[self.HEAD]:
+            return
+
+        self._remove(slot)
+        self._add(slot)
+
+    def _remove(self, slot):
+        """Unlinks the given slot from the recency list."""
+        prev = self.prev[slot]
+        next = self.next[slot]
+
+        self.next[prev] = next
+        self.prev[next] = prev
+
+    def _remove_lru(self):
+        """Removes the LRU slot (previous to the tail) and returns it to the free list."""
+        slot = self.prev[self.TAIL]
+        self._remove(slot)
+        del self.hashtable[self.keys[slot]]
+
+        # Release the references so the key and value can be garbage collected.
+        self.keys[slot] = None
+        self.values[slot] = None
+
+        self.next[slot] = self.free
+        self.free = slot
+
+    def _add(self, slot):
+        """Adds a slot to the front (MRU) position in the recency list, i.e. after the head."""
+        first = self.next[self.HEAD]
+        self.prev[slot] = self.HEAD
+        self.next[slot] = first
+
+        self.prev[first] = slot
+        self.next[self.HEAD] = slot
+
+    def _allocate(self):
+        """Preallocates the slot arrays, links the dummy head to the dummy tail, and chains the rest as free."""
+        size = max(self.capacity, 0) + 2
+
+        self.keys = [None] * size
+        self.values = [None] * size
+
+        # 32-bit indices halve the link overhead for any cache that fits in memory.
+        typecode = 'i' if size < 2 ** 31 else 'q'
+        self.prev = array(typecode, [0]) * size
+
+        # Each slot points to the next one, which links the head to the tail and chains the free list in one pass.
+        self.next = array(typecode, range(1, size + 1))
+        self.next[self.TAIL] = -1
+        self.next[size - 1] = -1
+        self.prev[self.TAIL] = self.HEAD
+
+        self.free = 2 if size > 2 else -1
+
+    def clear(self):
+        """Empties the cache."""
+        self.hashtable.clear()
+        self._allocate()
+
+
+class Sharded_LRU_Cache:
+    """
+    Thread-safe LRU Cache that hashes each key to one of N independent LRU_Cache segments.
+
+    Each segment has its own lock, so threads working on keys in different segments do not contend. Recency is
+    tracked per segment, which means the evicted entry is the LRU entry of its segment rather than of the whole cache.
+    """
+
+    def __init__(self, capacity, shards=16):
+        self.capacity = capacity
+        # No more segments than entries, else some segments get capacity 0 and the keys hashed there are never cached.
+        self.shards = max(1, min(shards, capacity))
+
+        # Spread the capacity across the segments, giving the remainder to the first segments.
+        per_shard, remainder = divmod(max(capacity, 0), self.shards)
+        self.segments = [LRU_Cache(per_shard + (1 if i < remainder else 0)) for i in range(self.shards)]
+        self.locks = [Lock() for _ in range(self.shards)]
+
+    def get(self, key):
+        """Returns the cached value from the key's segment. Else, returns -1."""
+        index = self._shard(key)
+        if index is None:
+            return -1
+
+        with self.locks[index]:
+            return self.segments[index].get(key)
+
+    def set(self, key, value):
+        """Caches the key and value in the key's segment."""
+        index = self._shard(key)
+        if index is None:
+            return -1
+
+        with self.locks[index]:
+            return self.segments[index].set(key, value)
+
+    def _shard(self, key):
+        """Returns the index of the segment that owns the given key, or None when a falsey is given for the key."""
+        # Falsey keys are never cached, and some of them, e.g. [] or {}, cannot be hashed.
+        if not bool(key):
+            return None
+
+        return hash(key) % self.shards
+
+    def __len__(self):
+        return sum(len(segment.hashtable) for segment in self.segments)
+
+    def clear(self):
+        """Empties the cache."""
+        for index, segment in enumerate(self.segments):
+            with self.locks[index]:
+                segment.clear()
+
+
+class Shared_LRU_Cache:
+    """
+    LRU Cache whose hashtable and recency list live in one multiprocessing.shared_memory block, so that the worker
+    processes on a host share one cache.
+
+    Entries are pickled into fixed-size slots. The hashtable is an open-addressing (linear probing) table of slot
+    indices, keyed by a blake2b hash of the pickled key, which, unlike hash(), is the same in every process. The
+    recency list is a pair of prev/next slot index arrays, with the dummy head and tail after the last slot, and
+    unused slots are chained through the next array as a free list. A process-safe lock guards every operation.
+
+    To share the cache, pass it to the worker processes as a Process argument; they attach to the same block.
+
+    Keys are matched by their pickles rather than by ==. Floats and bools equal to an int are pickled as that int,
+    so 1, 1.0, and True are one key, as in an LRU_Cache. Other keys must pickle the same whenever they are equal,
+    e.g. str, bytes, int, or tuples of them; equal keys that pickle differently, such as (1,) and (1.0,), are
+    different entries.
+    """
+    SLOT_HEADER = struct.Struct('<II')
+    EMPTY = -1
+
+    # Fields of the int64 header at the start of the block.
+    CAPACITY, SLOT_SIZE, FREE, COUNT = range(4)
+    HEADER_FIELDS = 4
+
+    def __init__(self, capacity, slot_size=256, name=None, lock=None):
+        """
+        :param capacity: Maximum number of entries.
+        :param slot_size: Bytes per slot, which bounds the size of an entry's pickled key and value.
+        :param name: Optional name of the shared memory block to create.
+        :param lock: Optional multiprocessing lock. Defaults to a new one.
+        """
+        self.capacity = max(capacity, 0)
+        self.slot_size = slot_size
+        self.lock = multiprocessing.Lock() if lock is None else lock
+        # Forked children inherit this object as is, so ownership is tied to the creating process's id.
+        self.owner_pid = os.getpid()
+
+        self.shm = SharedMemory(name=name, create=True, size=self._block_size(self.capacity, slot_size))
+        self._map()
+
+        header = self.header
+        header[self.CAPACITY] = self.capacity
+        header[self.SLOT_SIZE] = slot_size
+        self._reset()
+
+    def __getstate__(self):
+        return self.shm.name, self.lock
+
+    def __setstate__(self, state):
+        """Attaches to the shared memory block of the cache that was passed to this process."""
+        name, self.lock = state
+        self.owner_pid = None
+        self.shm = SharedMemory(name=name)
+
+        header = self.shm.buf[:8 * self.HEADER_FIELDS].cast('q')
+        self.capacity = header[self.CAPACITY]
+        self.slot_size = header[self.SLOT_SIZE]
+        header.release()
+        self._map()
+
+    @classmethod
+    def _table_size(cls, capacity):
+        """Returns the number of hashtable buckets: a power of 2 of at least twice the capacity."""
+        size = 8
+        while size < 2 * capacity:
+            size *= 2
+        return size
+
+    @classmethod
+    def _block_size(cls, capacity, slot_size):
+        links = 2 * (capacity + 2)
+        return 8 * (cls.HEADER_FIELDS + links + capacity + cls._table_size(capacity)) + capacity * slot_size
+
+    def _map(self):
+        """Creates the int64 views of the header, links, hashes, and hashtable over the shared block."""
+        capacity = self.capacity
+        buf = self.shm.buf
+        self.head = capacity
+        self.tail = capacity + 1
+        self.mask = self._table_size(capacity) - 1
+
+        offset = 0
+        views = []
+        for length in (self.HEADER_FIELDS, capacity + 2, capacity + 2, capacity, self.mask + 1):
+            views.append(buf[offset:offset + 8 * length].cast('q'))
+            offset += 8 * length
+        self.header, self.prev, self.next, self.hashes, self.table = views
+        self.data = buf[offset:offset + capacity * self.slot_size]
+
+    def _reset(self):
+        """Empties the hashtable, links the dummy head to the dummy tail, and chains every slot as free."""
+        for i in range(self.mask + 1):
+            self.table[i] = self.EMPTY
+        for slot in range(self.capacity):
+            self.next[slot] = slot + 1
+        if self.capacity:
+            self.next[self.capacity - 1] = self.EMPTY
+
+        self.next[self.head] = self.tail
+        self.prev[self.tail] = self.head
+        self.header[self.FREE] = 0 if self.capacity else self.EMPTY
+        self.header[self.COUNT] = 0
+
+    def __len__(self):
+        return self.header[self.COUNT]
+
+    def get(self, key):
+        """If cached, moves the slot to the front (MRU) position in the recency list and then returns the value.
+                Else, returns -1."""
+        if self.capacity == 0:
+            return -1
+
+        # Return -1 if a falsey is given for the key.
+        if not bool(key):
+            return -1
+
+        key_data = self._pickle_key(key)
+        h = self._hash(key_data)
+
+        with self.lock:
+            slot, _ = self._find(key_data, h)
+            if slot == self.EMPTY:
+                return -1
+
+            self._move_to_front(slot)
+            start = slot * self.slot_size
+            key_length, value_length = self.SLOT_HEADER.unpack_from(self.data, start)
+            start += self.SLOT_HEADER.size + key_length
+            value_data = bytes(self.data[start:start + value_length])
+
+        return pickle.loads(value_data)
+
+    def set(self, key, value):
+        """If the key exists, changes the slot's value and moves the slot to the front (MRU) position in the
+        recency list. Else, stores the entry in a free slot, evicting the LRU slot when none is free. Returns -1
+        if the pickled key and value do not fit in a slot."""
+        if self.capacity == 0:
+            return -1
+
+        # Return -1 if a falsey is given for the key.
+        if not bool(key):
+            return -1
+
+        key_data = self._pickle_key(key)
+        value_data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if self.SLOT_HEADER.size + len(key_data) + len(value_data) > self.slot_size:
+            return -1
+
+        h = self._hash(key_data)
+
+        with self.lock:
+            slot, bucket = self._find(key_data, h)
+            if slot != self.EMPTY:
+                self._write(slot, key_data, value_data)
+                self._move_to_front(slot)
+                return
+
+            # When the cache is full, the LRU slot is recycled for the new entry.
+            if self.header[self.FREE] == self.EMPTY:
+                self._remove_lru()
+                _, bucket = self._find(key_data, h)
+
+            slot = self.header[self.FREE]
+            self.header[self.FREE] = self.next[slot]
+            self._write(slot, key_data, value_data)
+            self.hashes[slot] = h
+            self.table[bucket] = slot
+            self._add(slot)
+            self.header[self.COUNT] += 1
+
+    @staticmethod
+    def _pickle_key(key):
+        """Pickles the key, turning a float or bool equal to an int into that int first."""
+        if type(key) in (float, bool) and math.isfinite(key) and key == int(key):
+            key = int(key)
+        return pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _hash(key_data):
+        """Returns a non-negative 63-bit hash of the pickled key that is the same in every process."""
+        return int.from_bytes(hashlib.blake2b(key_data, digest_size=8).digest(), 'little') >> 1
+
+    def _find(self, key_data, h):
+        """Returns the key's slot and bucket. Else, returns EMPTY and the empty bucket where it would go."""
+        bucket = h & self.mask
+        while True:
+            slot = self.table[bucket]
+            if slot == self.EMPTY or (self.hashes[slot] == h and self._key_data(slot) == key_data):
+                return slot, bucket
+            bucket = (bucket + 1) & self.mask
+
+    def _key_data(self, slot):
+        start = slot * self.slot_size
+        key_length, _ = self.SLOT_HEADER.unpack_from(self.data, start)
+        start += self.SLOT_HEADER.size
+        return self.data[start:start + key_length]
+
+    def _write(self, slot, key_data, value_data):
+        """Writes the pickled key and value into the slot."""
+        start = slot * self.slot_size
+        self.SLOT_HEADER.pack_into(self.data, start, len(key_data), len(value_data))
+        start += self.SLOT_HEADER.size
+        record = key_data + value_data
+        self.data[start:start + len(record)] = record
+
+    def _delete_bucket(self, bucket):
+        """Empties the bucket, shifting back later entries of the probe run so that no lookup stops early."""
+        mask = self.mask
+        hole = bucket
+        while True:
+            bucket = (bucket + 1) & mask
+            slot = self.table[bucket]
+            if slot == self.EMPTY:
+                break
+
+            # Move the entry into the hole unless its home bucket lies cyclically after the hole.
+            home = self.hashes[slot] & mask
+            if (bucket - home) & mask >= (bucket - hole) & mask:
+                self.table[hole] = slot
+                hole = bucket
+
+        self.table[hole] = self.EMPTY
+
+    def _move_to_front(self, slot):
+        """Move the given slot to the front (MRU) position in the recency list."""
+        # Bail out if the slot is already in position.
+        if slot == self.next[self.head]:
+            return
+
+        self._remove(slot)
+        self._add(slot)
+
+    def _remove(self, slot):
+        """Unlinks the given slot from the recency list."""
+        prev = self.prev[slot]
+        next = self.next[slot]
+
+        self.next[prev] = next
+        self.prev[next] = prev
+
+    def _remove_lru(self):
+        """Removes the LRU slot (previous to the tail) and returns it to the free list."""
+        slot = self.prev[self.tail]
+        self._remove(slot)
+
+        _, bucket = self._find(bytes(self._key_data(slot)), self.hashes[slot])
+        self._delete_bucket(bucket)
+
+        self.next[slot] = self.header[self.FREE]
+        self.header[self.FREE] = slot
+        self.header[self.COUNT] -= 1
+
+    def _add(self, slot):
+        """Adds a slot to the front (MRU) position in the recency list, i.e. after the head."""
+        first = self.next[self.head]
+        self.prev[slot] = self.head
+        self.next[slot] = first
+
+        self.prev[first] = slot
+        self.next[self.head] = slot
+
+    def clear(self):
+        """Empties the cache for every process."""
+        with self.lock:
+            self._reset()
+
+    def close(self):
+        """Detaches this process from the shared block. The creating process also destroys the block."""
+        for view in (self.header, self.prev, self.next, self.hashes, self.table, self.data):
+            view.release()
+        self.shm.close()
+        if self.owner_pid == os.getpid():
+            self.shm.unlink()
+
+
+class CacheList:
+    """
+    Doubly linked list of CacheNodes between a dummy head and tail, where the head side is the MRU position.
+
+    Used as the queues of the eviction policies below.
+    """
+
+    def __init__(self):
+        self.head = CacheNode(0, 0)
+        self.tail = CacheNode(0, 0)
+        self.head.next = self.tail
+        self.tail.prev = self.head
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, node):
+        """Adds the node to the front (MRU) position, i.e. after the head."""
+        node.prev = self.head
+        node.next = self.head.next
+
+        self.head.next.prev = node
+        self.head.next = node
+        self.size += 1
+
+    def remove(self, node):
+        """Removes the given node from the list."""
+        node.prev.next = node.next
+        node.next.prev = node.prev
+        self.size -= 1
+
+    def move_to_front(self, node):
+        """Moves the given node to the front (MRU) position."""
+        # Bail out if the node is already in position.
+        if node is self.head.next:
+            return
+
+        self.remove(node)
+        self.add(node)
+
+    def lru(self):
+        """Returns the LRU node (previous to the tail) without removing it. The list must not be empty."""
+        return self.tail.prev
+
+    def pop_lru(self):
+        """Removes and returns the LRU node (previous to the tail). The list must not be empty."""
+        node = self.tail.prev
+        self.remove(node)
+        return node
+
+
+class Cache_Policy:
+    """
+    Base class for the eviction policies, which share the LRU_Cache get/set API.
+
+    The base class handles the 0 capacity and falsey key guards. Subclasses implement `_lookup(key)`, returning the
+    value or -1, `_store(key, value)`, `_reset()`, which (re)builds their empty queues, and `__len__`.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._reset()
+
+    def get(self, key):
+        """Returns the cached value. Else, returns -1."""
+        if self.capacity == 0:
+            return -1
+
+        # Return -1 if a falsey is given for the key.
+        if not bool(key):
+            return -1
+
+        return self._lookup(key)
+
+    def set(self, key, value):
+        """Caches the key and value, evicting per the policy when the cache is full."""
+        if self.capacity == 0:
+            return -1
+
+        # Return -1 if a falsey is given for the key.
+        if not bool(key):
+            return -1
+
+        self._store(key, value)
+
+    def clear(self):
+        """Empties the cache."""
+        self._reset()
+
+
+class TwoQ_Cache(Cache_Policy):
+    """
+    2Q eviction policy (Johnson and Shasha).
+
+    New keys enter a small FIFO queue (A1in). Keys pushed out of it are remembered without their values in a ghost
+    FIFO queue (A1out), and only a key that is set again while remembered is admitted into the main LRU queue (Am).
+    A one-off scan therefore passes through A1in without flushing the hot entries in Am.
+    """
+
+    def __init__(self, capacity, in_ratio=0.25, out_ratio=0.5):
+        self.in_capacity = max(1, int(capacity * in_ratio))
+        self.out_capacity = max(1, int(capacity * out_ratio))
+        super().__init__(capacity)
+
+    def __len__(self):
+        return len(self.a1in_table) + len(self.am_table)
+
+    def _reset(self):
+        self.a1in, self.a1in_table = CacheList(), dict()
+        self.a1out, self.a1out_table = CacheList(), dict()
+        self.am, self.am_table = CacheList(), dict()
+
+    def _lookup(self, key):
+        if key in self.am_table:
+            node = self.am_table[key]
+            self.am.move_to_front(node)
+            return node.value
+
+        # A1in is a FIFO queue, so a hit does not move the node.
+        if key in self.a1in_table:
+            return self.a1in_table[key].value
+
+        return -1
+
+    def _store(self, key, value):
+        if key in self.am_table:
+            node = self.am_table[key]
+            node.value = value
+            self.am.move_to_front(node)
+            return
+
+        if key in self.a1in_table:
+            self.a1in_table[key].value = value
+            return
+
+        self._reclaim()
+        node = CacheNode(key, value)
+
+        # A key seen again while remembered in A1out is hot, so it goes into the main queue.
+        if key in self.a1out_table:
+            self.a1out.remove(self.a1out_table.pop(key))
+            self.am.add(node)
+            self.am_table[key] = node
+        else:
+            self.a1in.add(node)
+            self.a1in_table[key] = node
+
+    def _reclaim(self):
+        """Frees a slot when the cache is full, preferring A1in while it is over its share."""
+        if len(self) < self.capacity:
+            return
+
+        if len(self.a1in) > self.in_capacity or len(self.am) == 0:
+            node = self.a1in.pop_lru()
+            del self.a1in_table[node.key]
+
+            # Remember the key, but not the value, in A1out.
+            node.value = None
+            self.a1out.add(node)
+            self.a1out_table[node.key] = node
+            if len(self.a1out) > self.out_capacity:
+                del self.a1out_table[self.a1out.pop_lru().key]
+        else:
+            del self.am_table[self.am.pop_lru().key]
+
+
+class ARC_Cache(Cache_Policy):
+    """
+    Adaptive Replacement Cache eviction policy (Megiddo and Modha).
+
+    T1 holds entries seen once recently and T2 entries seen at least twice. B1 and B2 are ghost lists that remember
+    the keys recently evicted from T1 and T2. A set that hits a ghost list shifts the target size p of T1 toward the
+    list that would have kept the entry, so the cache adapts between recency and frequency. Scans only churn T1.
+    """
+
+    def __len__(self):
+        return len(self.t1_table) + len(self.t2_table)
+
+    def _reset(self):
+        self.p = 0
+        self.t1, self.t1_table = CacheList(), dict()
+        self.t2, self.t2_table = CacheList(), dict()
+        self.b1, self.b1_table = CacheList(), dict()
+        self.b2, self.b2_table = CacheList(), dict()
+
+    def _lookup(self, key):
+        node = self._promote(key)
+        return -1 if node is None else node.value
+
+    def _store(self, key, value):
+        node = self._promote(key)
+        if node is not None:
+            node.value = value
+            return
+
+        capacity = self.capacity
+
+        if key in self.b1_table:
+            # Recency would have kept this entry, so grow T1's target.
+            self.p = min(capacity, self.p + max(len(self.b2) // len(self.b1), 1))
+            self.b1.remove(self.b1_table.pop(key))
+            self._replace(False)
+            self._add(self.t2, self.t2_table, CacheNode(key, value))
+            return
+
+        if key in self.b2_table:
+            # Frequency would have kept this entry, so shrink T1's target.
+            self.p = max(0, self.p - max(len(self.b1) // len(self.b2), 1))
+            self.b2.remove(self.b2_table.pop(key))
+            self._replace(True)
+            self._add(self.t2, self.t2_table, CacheNode(key, value))
+            return
+
+        if len(self.t1) + len(self.b1) >= capacity:
+            if len(self.t1) < capacity:
+                del self.b1_table[self.b1.pop_lru().key]
+                self._replace(False)
+            else:
+                del self.t1_table[self.t1.pop_lru().key]
+        else:
+            total = len(self.t1) + len(self.t2) + len(self.b1) + len(self.b2)
+            if total >= capacity:
+                if total >= 2 * capacity:
+                    del self.b2_table[self.b2.pop_lru().key]
+                self._replace(False)
+
+        self._add(self.t1, self.t1_table, CacheNode(key, value))
+
+    def _promote(self, key):
+        """On a hit, moves the node to the front (MRU) position of T2 and returns it. Else, returns None."""
+        if key in self.t2_table:
+            node = self.t2_table[key]
+            self.t2.move_to_front(node)
+            return node
+
+        if key in self.t1_table:
+            node = self.t1_table.pop(key)
+            self.t1.remove(node)
+            self._add(self.t2, self.t2_table, node)
+            return node
+
+        return None
+
+    def _replace(self, in_b2):
+        """Evicts the LRU entry of T1 or T2, depending on T1's target size, into its ghost list."""
+        # Only make room when the cache is full.
+        if len(self) < self.capacity:
+            return
+
+        t1_size = len(self.t1)
+        if t1_size and (t1_size > self.p or (in_b2 and t1_size == self.p) or len(self.t2) == 0):
+            node = self.t1.pop_lru()
+            del self.t1_table[node.key]
+            node.value = None
+            self._add(self.b1, self.b1_table, node)
+        else:
+            node = self.t2.pop_lru()
+            del self.t2_table[node.key]
+            node.value = None
+            self._add(self.b2, self.b2_table, node)
+
+    @staticmethod
+    def _add(queue, table, node):
+        """Adds the node to the front (MRU) position of the given queue and its table."""
+        queue.add(node)
+        table[node.key] = node
+
+
+class CountMinSketch:
+    """
+    Count-min sketch of key frequencies, used by W-TinyLFU as its admission filter.
+
+    Each of the 4 rows is a bytearray of counters capped at 15, and a key's frequency is the minimum of its counters.
+    After a sample of 10 increments per counter, every counter is halved so that old popularity fades.
+    """
+    # Odd 64-bit multipliers, one per row, to spread the key's hash over different counters.
+    SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+    MAX_COUNT = 15
+
+    # Translation table that halves a counter, so that aging a row is a single bytes.translate() call.
+    HALVE = bytes(count >> 1 for count in range(256))
+
+    def __init__(self, capacity):
+        width = 16
+        while width < capacity:
+            width *= 2
+
+        self.mask = width - 1
+        self.sample_size = 10 * width
+        self.additions = 0
+        self.rows = [bytearray(width) for _ in self.SEEDS]
+
+    def increment(self, key):
+        """Counts one occurrence of the key."""
+        h = hash(key)
+        mask = self.mask
+        for row, seed in zip(self.rows, self.SEEDS):
+            index = (h * seed >> 32) & mask
+            if row[index] < self.MAX_COUNT:
+                row[index] += 1
+
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+
+    def frequency(self, key):
+        """Returns the estimated frequency of the key."""
+        h = hash(key)
+        mask = self.mask
+        return min(row[(h * seed >> 32) & mask] for row, seed in zip(self.rows, self.SEEDS))
+
+    def _age(self):
+        """Halves every counter."""
+        self.rows = [row.translate(self.HALVE) for row in self.rows]
+        self.additions //= 2
+
+
+class WTinyLFU_Cache(Cache_Policy):
+    """
+    Window TinyLFU eviction policy (Einziger, Friedman, and Manes).
+
+    New entries go into a small LRU window. When the window overflows, its LRU entry becomes a candidate for the
+    main cache, a segmented LRU of a probation and a protected queue. The candidate is only admitted if the
+    count-min sketch estimates it to be more frequent than the main cache's victim, so one-off scans are rejected.
+    """
+
+    def __init__(self, capacity, window_ratio=0.01, protected_ratio=0.8):
+        self.window_capacity = max(1, int(capacity * window_ratio)) if capacity > 0 else 0
+        self.main_capacity = max(capacity - self.window_capacity, 0)
+        self.protected_capacity = int(self.main_capacity * protected_ratio)
+        super().__init__(capacity)
+
+    def __len__(self):
+        return len(self.window_table) + len(self.probation_table) + len(self.protected_table)
+
+    def _reset(self):
+        self.window, self.window_table = CacheList(), dict()
+        self.probation, self.probation_table = CacheList(), dict()
+        self.protected, self.protected_table = CacheList(), dict()
+        self.sketch = CountMinSketch(max(self.capacity, 1))
+
+    def _lookup(self, key):
+        self.sketch.increment(key)
+        node = self._hit(key)
+        return -1 if node is None else node.value
+
+    def _store(self, key, value):
+        node = self._hit(key)
+        if node is not None:
+            node.value = value
+            return
+
+        self.sketch.increment(key)
+        node = CacheNode(key, value)
+        self.window.add(node)
+        self.window_table[key] = node
+
+        if len(self.window) > self.window_capacity:
+            candidate = self.window.pop_lru()
+            del self.window_table[candidate.key]
+            self._admit(candidate)
+
+    def _hit(self, key):
+        """On a hit, moves the node per its queue and returns it. Else, returns None."""
+        if key in self.window_table:
+            node = self.window_table[key]
+            self.window.move_to_front(node)
+            return node
+
+        if key in self.protected_table:
+            node = self.protected_table[key]
+            self.protected.move_to_front(node)
+            return node
+
+        if key in self.probation_table:
+            # A second hit promotes the node to the protected queue, demoting the protected LRU when it is full.
+            node = self.probation_table.pop(key)
+            self.probation.remove(node)
+            self.protected.add(node)
+            self.protected_table[key] = node
+
+            if len(self.protected) > self.protected_capacity:
+                demoted = self.protected.pop_lru()
+                del self.protected_table[demoted.key]
+                self.probation.add(demoted)
+                self.probation_table[demoted.key] = demoted
+            return node
+
+        return None
+
+    def _admit(self, candidate):
+        """Moves the window's candidate into probation if there is room or it beats the main cache's victim."""
+        if len(self.probation) + len(self.protected) < self.main_capacity:
+            self.probation.add(candidate)
+            self.probation_table[candidate.key] = candidate
+            return
+
+        if self.main_capacity == 0:
+            return
+
+        if len(self.probation):
+            queue, table = self.probation, self.probation_table
+        else:
+            queue, table = self.protected, self.protected_table
+
+        victim = queue.lru()
+        if self.sketch.frequency(candidate.key) <= self.sketch.frequency(victim.key):
+            return
+
+        queue.remove(victim)
+        del table[victim.key]
+        self.probation.add(candidate)
+        self.probation_table[candidate.key] = candidate
+
+
+class Clock_Cache(Cache_Policy):
+    """
+    CLOCK eviction policy, an approximation of LRU for read-heavy workloads.
+
+    Entries sit in a circular array of slots. A hit only sets the slot's reference bit, so it does no relinking at
+    all. To evict, the clock hand sweeps the slots, clearing set reference bits, and takes the first slot whose bit
+    is already clear, i.e. one that was not hit since the hand last passed it.
+    """
+
+    def __len__(self):
+        return len(self.hashtable)
+
+    def _reset(self):
+        size = max(self.capacity, 0)
+        self.hashtable = dict()
+        self.keys = [None] * size
+        self.values = [None] * size
+        self.referenced = bytearray(size)
+        self.hand = 0
+
+    def _lookup(self, key):
+        slot = self.hashtable.get(key)
+        if slot is None:
+            return -1
+
+        self.referenced[slot] = 1
+        return self.values[slot]
+
+    def _store(self, key, value):
+        slot = self.hashtable.get(key)
+        if slot is not None:
+            self.values[slot] = value
+            self.referenced[slot] = 1
+            return
+
+        # Fill the free slots first, then recycle the victim of a sweep.
+        if len(self.hashtable) < self.capacity:
+            slot = len(self.hashtable)
+        else:
+            slot = self._sweep()
+            del self.hashtable[self.keys[slot]]
+
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.hashtable[key] = slot
+
+    def _sweep(self):
+        """Advances the hand past the referenced slots, clearing their bits, and returns the victim slot."""
+        referenced = self.referenced
+        hand = self.hand
+        while referenced[hand]:
+            referenced[hand] = 0
+            hand = (hand + 1) % self.capacity
+
+        # The new entry takes the victim's slot, and the hand moves on so that it survives a full turn.
+        self.hand = (hand + 1) % self.capacity
+        return hand
+
+
+POLICIES = {
+    'lru': LRU_Cache,
+    'clock': Clock_Cache,
+    '2q': TwoQ_Cache,
+    'arc': ARC_Cache,
+    'w-tinylfu': WTinyLFU_Cache,
+}
+
+
+def make_cache(policy, capacity, **options):
+    """
+    Builds a cache with the named eviction policy, so that the policy can be chosen by configuration.
+
+    :param policy: One of the POLICIES names: 'lru', 'clock', '2q', 'arc', or 'w-tinylfu'.
+    :param capacity: Maximum number of entries.
+    :param options: Extra keyword arguments for the policy's class.
+    :return: the cache
+    """
+    if policy not in POLICIES:
+        raise ValueError('Unknown eviction policy: {}. Expected one of: {}.'.format(policy, ', '.join(POLICIES)))
+
+    return POLICIES[policy](capacity, **options)
+
+
+def memoize(capacity=128, ttl=None):
+    """
+    Decorator that memoizes a function in an LRU_Cache keyed by its arguments.
+
+    Only one computation per key is in flight at a time. Concurrent callers that miss on the same key wait for it
+    and get the same result, or the same exception, which is not cached. Works for threaded callers and for
+    `async def` coroutine functions.
+
+    :param capacity: Maximum number of cached results.
+    :param ttl: Optional time-to-live, in seconds, for each cached result.
+    :return: decorator. The wrapped function exposes its `cache` and a `cache_clear()` function.
+    """
+    def decorator(func):
+        cache = LRU_Cache(capacity, default_ttl=ttl)
+        lock = Lock()
+        in_flight = dict()
+
+        def lookup(key):
+            """Returns a (hit, value) tuple. get_many() is used because a cached value could be -1."""
+            hits, _ = cache.get_many((key,))
+            return key in hits, hits.get(key)
+
+        if inspect.iscoroutinefunction(func):
+
+            def finish(key, task):
+                """Caches the task's result once it is done. Runs before the waiters resume."""
+                with lock:
+                    del in_flight[key]
+                    if not task.cancelled() and task.exception() is None:
+                        cache.set(key, task.result())
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = _make_key(args, kwargs)
+                with lock:
+                    hit, value = lookup(key)
+                    if hit:
+                        return value
+
+                    task = in_flight.get(key)
+                    if task is None:
+                        task = asyncio.ensure_future(func(*args, **kwargs))
+                        task.add_done_callback(functools.partial(finish, key))
+                        in_flight[key] = task
+
+                # Shield the shared task so that one cancelled waiter does not cancel it for the others.
+                return await asyncio.shield(task)
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = _make_key(args, kwargs)
+                with lock:
+                    hit, value = lookup(key)
+                    if hit:
+                        return value
+
+                    future = in_flight.get(key)
+                    is_leader = future is None
+                    if is_leader:
+                        future = Future()
+                        in_flight[key] = future
+
+                if not is_leader:
+                    return future.result()
+
+                # The leader computes outside the lock, so that other keys are not blocked.
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException as error:
+                    with lock:
+                        del in_flight[key]
+                    future.set_exception(error)
+                    raise
+
+                with lock:
+                    cache.set(key, result)
+                    del in_flight[key]
+                future.set_result(result)
+                return result
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+
+        wrapper.cache = cache
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
+
+
+def _make_key(args, kwargs):
+    """Builds the cache key for a call. Wrapping the arguments keeps the key truthy, even for a call without any."""
+    return args, tuple(sorted(kwargs.items()))
 
 
 if __name__ == '__main__':
@@ -1,9 +1,28 @@
 #!/usr/bin/env python3
 
+import asyncio
+import bisect
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import json
+import mmap
 import os
+import queue
+import re
+import select
+import struct
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Condition, Lock, Thread
 
+from problem_1 import LRU_Cache
 
-def find_files(suffix, path):
+
+def find_files(suffix, path, workers=1, exclude=(), max_depth=None, follow_symlinks=True, stats=False, min_size=None,
+               max_size=None, modified_since=None):
     """
     Find all files beneath path with file name suffix.
 
@@ -15,31 +34,1114 @@ def find_files(suffix, path):
     Args:
       suffix(str): suffix if the file name to be found
       path(str): path of the file system
+      workers(int): number of threads reading directories concurrently
+      exclude(iterable): glob patterns of the directory names to skip, with their subtrees, or a single pattern
+      max_depth(int): number of subdirectory levels to descend into, or None for no limit
+      follow_symlinks(bool): whether to descend into symbolic links to directories
+      stats(bool): whether to return a FileRecord of each file's stat metadata instead of its path
+      min_size(int): smallest file size in bytes to find, or None
+      max_size(int): largest file size in bytes to find, or None
+      modified_since(float): earliest modification time, in seconds since the epoch, to find, or None
 
     Returns:
-       a list of paths
+       a list of paths, or of FileRecords
+    """
+    if workers > 1:
+        if exclude or max_depth is not None or not follow_symlinks or stats or min_size is not None \
+                or max_size is not None or modified_since is not None:
+            raise ValueError('The pruning, stats, and stat filter options need workers=1.')
+        return list(iter_files_parallel(suffix, path, workers, ordered=True))
+
+    return list(iter_files(suffix, path, exclude, max_depth, follow_symlinks, stats, min_size, max_size,
+                           modified_since))
+
+
+# Lightweight record of a found file's stat metadata, collected during the walk.
+FileRecord = namedtuple('FileRecord', ('path', 'size', 'mtime', 'inode'))
+
+
+def iter_files(suffix, path, exclude=(), max_depth=None, follow_symlinks=True, stats=False, min_size=None,
+               max_size=None, modified_since=None):
+    """
+    Lazily find all files beneath path with file name suffix, yielding each as it is found.
+
+    Walks the tree iteratively with a stack of directories, so the depth is not limited by the recursion limit,
+    and uses the type information cached on each `os.DirEntry` instead of a `stat` per entry.
+
+    Excluded, too deep, and already visited directories are pruned before they are read.  When following symbolic
+    links, each directory's (st_dev, st_ino) is recorded, so a link back to an ancestor cannot loop forever.
+
+    The stat metadata and filters cost one `stat` per file that matches the suffix, which is cached on its
+    `os.DirEntry` (and free on Windows), so the files filtered out are never collected.
+
+    Args:
+      suffix(str): suffix if the file name to be found
+      path(str): path of the file system
+      exclude(iterable): glob patterns of the directory names to skip, with their subtrees, or a single pattern
+      max_depth(int): number of subdirectory levels to descend into, or None for no limit
+      follow_symlinks(bool): whether to descend into symbolic links to directories
+      stats(bool): whether to yield a FileRecord of each file's stat metadata instead of its path
+      min_size(int): smallest file size in bytes to find, or None
+      max_size(int): largest file size in bytes to find, or None
+      modified_since(float): earliest modification time, in seconds since the epoch, to find, or None
+
+    Yields:
+       each path, or FileRecord, that ends with the suffix
     """
     # Bail out if no path is given.
     if not bool(path):
-        return []
+        return
 
     # If a falsey is given for the suffix, set it to None to simplify the file suffix conditional check.
     if not bool(suffix):
         suffix = None
 
-    def _find_files(path, files):
-        """Recursively walk through the filesystem to find all files that end with the given suffix."""
-        for entry in os.listdir(path):
-            fullpath = os.path.join(path, entry)
-            if os.path.isdir(fullpath):
-                files = _find_files(fullpath, files)
+    excluded = _compile_globs(exclude)
+    stat_needed = stats or min_size is not None or max_size is not None or modified_since is not None
+    visited = Visited_Directories(path) if follow_symlinks else None
+
+    directories = [(path, 0)]
+    while directories:
+        directory, depth = directories.pop()
+        subdirectories = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=follow_symlinks):
+                    if excluded is not None and excluded(entry.name):
+                        continue
+                    if max_depth is not None and depth >= max_depth:
+                        continue
+                    if visited is not None and not visited.first_visit(entry.stat()):
+                        continue
+                    subdirectories.append((entry.path, depth + 1))
+
+                elif entry.is_file() and (suffix is None or entry.name.endswith(suffix)):
+                    if not stat_needed:
+                        yield entry.path
+                        continue
+
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        # The file was removed since the directory was read.
+                        continue
+                    if min_size is not None and stat.st_size < min_size:
+                        continue
+                    if max_size is not None and stat.st_size > max_size:
+                        continue
+                    if modified_since is not None and stat.st_mtime < modified_since:
+                        continue
+
+                    if stats:
+                        yield FileRecord(entry.path, stat.st_size, stat.st_mtime, stat.st_ino)
+                    else:
+                        yield entry.path
+
+        # Push in reverse so the subdirectories are walked in their listing order.
+        directories.extend(reversed(subdirectories))
+
+
+def _compile_globs(patterns):
+    """Combines the glob patterns into one regex match function, or returns None when there are none."""
+    # A lone string is one pattern, rather than an iterable of one-character patterns.
+    patterns = [patterns] if isinstance(patterns, str) else list(patterns)
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(pattern) for pattern in patterns)).match
+
+
+class Visited_Directories:
+    """
+    Thread-safe set of the (st_dev, st_ino) of the directories a walk has entered.
+
+    Walks that follow symbolic links check each subdirectory here before reading it, so a link back to an ancestor
+    cannot loop forever, and a directory reached through two paths is only walked once.
+    """
+
+    def __init__(self, root=None):
+        """
+        Initializes the set.
+
+        :param root: The directory the walk starts from, recorded as visited, or None.
+        """
+        self.lock = Lock()
+        self.seen = set()
+        if root is not None:
+            self.first_visit(os.stat(root))
+
+    def first_visit(self, stat):
+        """
+        Records the directory.
+
+        :param stat: The directory's stat result.
+        :return: bool - True the first time the directory is seen, False after that
+        """
+        key = (stat.st_dev, stat.st_ino)
+        with self.lock:
+            if key in self.seen:
+                return False
+            self.seen.add(key)
+            return True
+
+
+def iter_files_parallel(suffix, path, workers=4, ordered=False):
+    """
+    Find all files beneath path with file name suffix, reading directories on a pool of threads.
+
+    Ordered mode yields the files in the same order as `iter_files()`.  Unordered mode yields each directory's files
+    as soon as it has been read, which keeps the consumer busy but makes the order depend on the thread timing.
+
+    Args:
+      suffix(str): suffix if the file name to be found
+      path(str): path of the file system
+      workers(int): number of threads reading directories concurrently
+      ordered(bool): whether to yield the files in the serial walk order
+
+    Yields:
+       each path that ends with the suffix
+    """
+    # Bail out if no path is given.
+    if not bool(path):
+        return
+
+    # If a falsey is given for the suffix, set it to None to simplify the file suffix conditional check.
+    if not bool(suffix):
+        suffix = None
+
+    walker = Parallel_Walker(suffix, workers, ordered, Visited_Directories(path))
+    try:
+        root = walker.submit(0, path)
+        if ordered:
+            # Walk the futures depth first, in listing order, waiting on each directory in turn.
+            directories = [root]
+            while directories:
+                files, subdirectories = directories.pop().result()
+                yield from files
+                directories.extend(reversed(subdirectories))
+        else:
+            # Each read directory replaces itself with its subdirectories; the walk is done when none are left.
+            pending = 1
+            while pending:
+                files, subdirectories = walker.done.get().result()
+                pending += len(subdirectories) - 1
+                yield from files
+    finally:
+        walker.stop()
+
+
+class Parallel_Walker:
+    """
+    Pool of threads that read directories from work-stealing deques.
+
+    Each thread pushes the subdirectories it finds onto its own deque and pops its newest work first, which walks
+    its part of the tree depth first.  An idle thread steals the oldest work, nearest the root, from another deque.
+    """
+
+    def __init__(self, suffix, workers, ordered=True, visited=None):
+        """
+        Starts the threads.
+
+        :param suffix: The file name suffix to match, or None to match all files.
+        :param workers: Number of threads.
+        :param ordered: When False, each read directory's future is also put on the `done` queue.
+        :param visited: The Visited_Directories shared by the threads, which skip the directories already seen.
+        """
+        self.suffix = suffix
+        self.visited = visited
+        self.deques = [deque() for _ in range(workers)]
+        self.ready = Condition()
+        self.idle = 0
+        self.stopped = False
+        self.done = None if ordered else queue.SimpleQueue()
+        self.threads = [Thread(target=self._work, args=(index,), daemon=True) for index in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, index, path):
+        """
+        Queues the directory on the given thread's deque.
+
+        :param index: Index of the thread whose deque to push onto.
+        :param path: The directory to read.
+        :return: Future - resolves to a tuple of the matching files and the futures of the subdirectories
+        """
+        future = Future()
+        self._push(index, [(path, future)])
+        return future
+
+    def stop(self):
+        """Stops the threads once they finish the directories they are reading."""
+        with self.ready:
+            self.stopped = True
+            self.ready.notify_all()
+        for thread in self.threads:
+            thread.join()
+
+    def _work(self, index):
+        """Reads directories from this thread's deque, or stolen from the others, until stopped."""
+        own = self.deques[index]
+        while not self.stopped:
+            try:
+                job = own.pop()
+            except IndexError:
+                job = self._steal(index)
+
+            if job is None:
+                with self.ready:
+                    self.idle += 1
+                    if not self.stopped and not any(self.deques):
+                        self.ready.wait()
+                    self.idle -= 1
+                continue
+
+            path, future = job
+            jobs = None
+            try:
+                files, subdirectories = _read_directory(path, self.suffix, self.visited)
+            except OSError as error:
+                future.set_exception(error)
+            else:
+                jobs = [(subdirectory, Future()) for subdirectory in subdirectories]
+                future.set_result((files, [child for _, child in jobs]))
+
+            # Report the directory before queueing its subdirectories, so the unordered walk counts them first.
+            if self.done is not None:
+                self.done.put(future)
+            if jobs:
+                self._push(index, jobs)
+
+    def _push(self, index, jobs):
+        """Appends the (path, future) jobs to the given thread's deque and wakes idle threads to steal them."""
+        self.deques[index].extend(jobs)
+
+        # A waiting thread counts itself idle before it checks the deques, so skipping the lock here is safe.
+        if self.idle:
+            with self.ready:
+                self.ready.notify(len(jobs))
+
+    def _steal(self, index):
+        """Takes the oldest directory from another thread's deque, or returns None when all are empty."""
+        for offset in range(1, len(self.deques)):
+            try:
+                return self.deques[(index + offset) % len(self.deques)].popleft()
+            except IndexError:
+                pass
+        return None
+
+
+async def afind_files(suffix, path, workers=4, executor=None):
+    """
+    Find all files beneath path with file name suffix, reading directories in an executor off the event loop.
+
+    At most `workers` directory reads are in flight, and new reads only start while the consumer is pulling results,
+    so a slow consumer holds back the walk.  Closing the generator or cancelling its task cancels the pending reads.
+
+    Args:
+      suffix(str): suffix if the file name to be found
+      path(str): path of the file system
+      workers(int): maximum number of directory reads in flight
+      executor(Executor): executor to read in, or None for a private thread pool of `workers` threads
+
+    Yields:
+       each path that ends with the suffix, in the order the directories are read
+    """
+    # Bail out if no path is given.
+    if not bool(path):
+        return
+
+    # If a falsey is given for the suffix, set it to None to simplify the file suffix conditional check.
+    if not bool(suffix):
+        suffix = None
+
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    directories = [path]
+    reads = set()
+    try:
+        # The first read records the root, which saves a separate stat on the executor.
+        visited = Visited_Directories()
+        while directories or reads:
+            while directories and len(reads) < workers:
+                reads.add(loop.run_in_executor(executor, _read_directory, directories.pop(), suffix, visited))
+
+            done, reads = await asyncio.wait(reads, return_when=asyncio.FIRST_COMPLETED)
+            for read in done:
+                files, subdirectories = read.result()
+                directories.extend(reversed(subdirectories))
+                for file in files:
+                    yield file
+    finally:
+        for read in reads:
+            read.cancel()
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _read_directory(path, suffix, visited=None):
+    """
+    Reads one directory, returning the matching files and the subdirectories, each in listing order.
+
+    The subdirectories already in the visited set, if given, are left out. An empty set first records the directory
+    itself as the root of the walk.
+    """
+    if visited is not None and not visited.seen:
+        visited.first_visit(os.stat(path))
+    files = []
+    subdirectories = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if visited is None or visited.first_visit(entry.stat()):
+                    subdirectories.append(entry.path)
+
+            elif entry.is_file() and (suffix is None or entry.name.endswith(suffix)):
+                files.append(entry.path)
+
+    return files, subdirectories
+
+
+def find_files_multi(patterns, path):
+    """
+    Find all files beneath path matching any of the patterns, in a single walk, grouped by pattern.
+
+    A pattern without glob wildcards is a file name suffix, as in `find_files()`, and a falsey pattern matches all
+    files.  A pattern with wildcards is a glob that must match the whole file name, e.g. `test_*.py`.
+
+    Args:
+      patterns(iterable): the suffixes and glob patterns
+      path(str): path of the file system
+
+    Returns:
+       a dictionary of each pattern to the list of paths it matches
+    """
+    matcher = Pattern_Matcher(patterns)
+    found = {pattern: [] for pattern in matcher.patterns}
+
+    # Bail out if no path or pattern is given.
+    if not bool(path) or not found:
+        return found
+
+    visited = Visited_Directories(path)
+    directories = [path]
+    while directories:
+        subdirectories = []
+        with os.scandir(directories.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if visited.first_visit(entry.stat()):
+                        subdirectories.append(entry.path)
+
+                elif entry.is_file():
+                    for pattern in matcher.match(entry.name):
+                        found[pattern].append(entry.path)
+
+        # Push in reverse so the subdirectories are walked in their listing order.
+        directories.extend(reversed(subdirectories))
+
+    return found
+
+
+class Pattern_Matcher:
+    """
+    Matches a file name against many suffixes and glob patterns at once.
+
+    The suffixes, including globs of the form `*<suffix>`, are stored reversed in a trie, so a name is matched by
+    walking its characters backwards from the end until the trie runs out, whatever the number of suffixes.  The
+    remaining globs are combined into one regex that rules out most names in a single match.
+    """
+
+    WILDCARDS = re.compile(r'[*?[]')
+
+    def __init__(self, patterns):
+        """
+        Compiles the patterns.
+
+        :param patterns: The suffixes and glob patterns.
+        """
+        self.patterns = list(dict.fromkeys(patterns))
+        self.trie = {}
+        globs = []
+        for pattern in self.patterns:
+            suffix = self._as_suffix(pattern)
+            if suffix is None:
+                globs.append(pattern)
+                continue
+
+            # The None key of a trie node holds the patterns whose reversed suffix ends at that node.
+            node = self.trie
+            for char in reversed(suffix):
+                node = node.setdefault(char, {})
+            node.setdefault(None, []).append(pattern)
+
+        self.globs = [(pattern, re.compile(fnmatch.translate(pattern)).match) for pattern in globs]
+        self.any_glob = _compile_globs(globs)
+
+    def match(self, name):
+        """
+        Finds the patterns that match the file name.
+
+        :param name: The file name.
+        :return: list - the matching patterns
+        """
+        matched = []
+        node = self.trie
+        if None in node:
+            matched.extend(node[None])
+        for char in reversed(name):
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node:
+                matched.extend(node[None])
+
+        if self.any_glob is not None and self.any_glob(name):
+            matched.extend(pattern for pattern, match in self.globs if match(name))
+
+        return matched
+
+    def _as_suffix(self, pattern):
+        """Returns the suffix the pattern matches, or None when it is a glob that needs a regex."""
+        if not bool(pattern):
+            return ''
+        if self.WILDCARDS.search(pattern) is None:
+            return pattern
+        if pattern[0] == '*' and self.WILDCARDS.search(pattern, 1) is None:
+            return pattern[1:]
+        return None
+
+
+# A directory modified this close to its listing may change again within the same mtime tick, so it is re-listed.
+RACY_NS = 10 ** 9
+
+
+def _refresh_listings(root, stored):
+    """
+    Walks the tree beneath root, re-listing only the directories whose mtime differs from the stored listing.
+
+    :param root: The directory to walk.
+    :param stored: Dictionary of each directory path to its (mtime, file names, subdirectory names) listing.
+    :return: tuple - the dictionary of the current listings, the number of directories listed
+    """
+    directories = {}
+    listed = 0
+
+    # Directories reached again through a symbolic link cycle or alias are left out of the listings.
+    visited = Visited_Directories()
+    pending = [root]
+    while pending:
+        path = pending.pop()
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if not visited.first_visit(stat):
+            continue
+
+        mtime = stat.st_mtime_ns
+        entry = stored.get(path)
+        if entry is not None and entry[0] == mtime:
+            _, files, subdirectories = entry
+        else:
+            try:
+                files, subdirectories = _list_names(path)
+            except OSError:
+                continue
+            listed += 1
+            if time.time_ns() - mtime < RACY_NS:
+                mtime = None
+
+        directories[path] = (mtime, files, subdirectories)
+        pending.extend(os.path.join(path, name) for name in reversed(subdirectories))
+
+    return directories, listed
+
+
+def _list_names(path):
+    """Lists one directory, returning the file and subdirectory names."""
+    files = []
+    subdirectories = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                subdirectories.append(entry.name)
+
+            elif entry.is_file():
+                files.append(entry.name)
+
+    return files, subdirectories
+
+
+class File_Index:
+    """
+    On-disk index of the files beneath a root, refreshed incrementally by directory mtime.
+
+    Adding, removing, or renaming an entry changes its directory's mtime, so a refresh only lists the directories
+    whose mtime changed and reuses the stored listing of the rest, at the cost of one `stat` per directory.
+    """
+
+    # Version 2 stores the index as JSON; version 1 was a pickle, which could run code from a tampered file.
+    VERSION = 2
+
+    def __init__(self, root, index_path):
+        """
+        Loads the index, building it from scratch when the file is missing, corrupt, or for another root.
+
+        :param root: The directory to index.
+        :param index_path: The file to keep the index in.
+        """
+        self.root = root
+        self.index_path = index_path
+        self.directories = {}
+        self.suffixes = None
+
+        loaded = self._load()
+        if loaded is None:
+            self.refresh()
+        else:
+            self.directories = loaded
+
+    def refresh(self):
+        """
+        Re-lists the directories whose mtime changed and saves the index.
+
+        :return: int - the number of directories listed
+        """
+        directories, listed = _refresh_listings(self.root, self.directories)
+        self.directories = directories
+        self.suffixes = None
+        self._save()
+        return listed
+
+    def find_files(self, suffix):
+        """
+        Finds the indexed files with the file name suffix, as of the last refresh.
+
+        :param suffix: The file name suffix, or a falsey to find all files.
+        :return: list - the sorted paths
+        """
+        if self.suffixes is None:
+            # Sorting the reversed paths groups the files by suffix, so a suffix is a binary search for its range.
+            self.suffixes = sorted(os.path.join(path, name)[::-1]
+                                   for path, (_, files, _) in self.directories.items() for name in files)
+
+        if not bool(suffix):
+            return sorted(reversed_path[::-1] for reversed_path in self.suffixes)
+
+        # A suffix that spans a directory separator cannot match a file name.
+        if os.sep in suffix:
+            return []
+
+        prefix = suffix[::-1]
+        start = bisect.bisect_left(self.suffixes, prefix)
+        end = bisect.bisect_left(self.suffixes, prefix + '\U0010ffff', start)
+        return sorted(reversed_path[::-1] for reversed_path in self.suffixes[start:end])
+
+    def _load(self):
+        """Loads the stored directories, or returns None when the index cannot be used."""
+        try:
+            with open(self.index_path, 'rb') as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            # The file is missing, unreadable, or not JSON.
+            return None
+
+        if not isinstance(index, dict) or index.get('version') != self.VERSION or index.get('root') != self.root:
+            return None
+        if not isinstance(index.get('directories'), dict):
+            return None
+
+        # JSON turns the (mtime, files, subdirectories) tuples into lists; check each one before trusting it.
+        directories = {}
+        for path, listing in index['directories'].items():
+            if not isinstance(listing, list) or len(listing) != 3:
+                return None
+            mtime, files, subdirectories = listing
+            if mtime is not None and type(mtime) is not int:
+                return None
+            if not all(isinstance(names, list) and all(isinstance(name, str) for name in names)
+                       for names in (files, subdirectories)):
+                return None
+            directories[path] = (mtime, files, subdirectories)
+
+        return directories
+
+    def _save(self):
+        """Writes the index to a temporary file and renames it into place, so a crash never leaves it half-written."""
+        temporary = self.index_path + '.tmp'
+        # Names that are not valid UTF-8 decode to lone surrogates, which the default ASCII output escapes losslessly.
+        with open(temporary, 'w', encoding='ascii') as index_file:
+            json.dump({'version': self.VERSION, 'root': self.root, 'directories': self.directories}, index_file)
+        os.replace(temporary, self.index_path)
+
+
+class Find_Files_Cache:
+    """
+    In-process cache of `find_files()` results, validated against directory mtimes.
+
+    The listings of each walked tree are kept in an `LRU_Cache` keyed by the normalized path, and weighed by their
+    estimated size against a memory budget.  A query stats each directory of the tree, re-lists the ones whose mtime
+    changed, and only filters the listings again when one did.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, capacity=1024):
+        """
+        Initializes the cache.
+
+        :param max_bytes: Estimated memory budget for the listings and results.
+        :param capacity: Maximum number of trees to keep.
+        """
+        self.cache = LRU_Cache(capacity, weigher=self._weigh, max_weight=max_bytes, on_evict=self._forget)
+
+        # The cached roots, so that invalidate() can find the trees a path belongs to.
+        self.roots = set()
+
+    def find_files(self, suffix, path):
+        """
+        Find all files beneath path with file name suffix, like `find_files()`, reusing the unchanged listings.
+
+        :param suffix: The file name suffix, or a falsey to find all files.
+        :param path: Path of the file system.
+        :return: list - the paths, spelled with the given path
+        """
+        # Bail out if no path is given.
+        if not bool(path):
+            return []
+
+        # If a falsey is given for the suffix, set it to None to simplify the file suffix conditional check.
+        if not bool(suffix):
+            suffix = None
+
+        root = os.path.abspath(path)
+        entry = self.cache.get(root)
+        if entry == -1:
+            entry = ({}, {})
+
+        listings, listed = _refresh_listings(root, entry[0])
+        if root not in listings:
+            # The root is gone or no longer a directory, so the cached tree is stale. Listing it again raises the
+            # error find_files() would.
+            self.cache.discard(root)
+            self.roots.discard(root)
+            with os.scandir(root):
+                return []
+
+        results = entry[1] if listed == 0 else {}
+
+        key = (suffix, path)
+        if key not in results:
+            results[key] = self._filter(listings, root, suffix, path)
+        elif listed == 0:
+            return list(results[key])
+
+        # Store the changed listings or new result, which also weighs the entry again.
+        if self.cache.set(root, (listings, results)) != -1:
+            self.roots.add(root)
+        return list(results[key])
+
+    def invalidate(self, path=None):
+        """
+        Drops the cached listings of the path and the directories beneath it, or of every tree when no path is given.
+
+        :param path: The directory whose listings to drop, or None to drop them all.
+        """
+        if path is None:
+            self.cache.clear()
+            self.roots.clear()
+            return
+
+        path = os.path.abspath(path)
+        for root in [root for root in self.roots if _is_within(path, root) or _is_within(root, path)]:
+            entry = self.cache.get(root)
+            if entry == -1:
+                continue
+
+            # Setting the trimmed listings again weighs the entry again. The results are stale, so they go too.
+            listings = {directory: listing for directory, listing in entry[0].items()
+                        if not _is_within(directory, path)}
+            self.cache.set(root, (listings, {}))
+
+    def _forget(self, root, entry):
+        """Forgets a root once the LRU_Cache evicts its tree."""
+        self.roots.discard(root)
+
+    def _filter(self, listings, root, suffix, path):
+        """Collects the files matching the suffix from the listings, in walk order and spelled with the given path."""
+        found = []
+        pending = [(root, path)]
+        while pending:
+            directory, spelled = pending.pop()
+            if directory not in listings:
+                continue
+
+            _, files, subdirectories = listings[directory]
+            for name in files:
+                if suffix is None or name.endswith(suffix):
+                    found.append(os.path.join(spelled, name))
+
+            pending.extend((os.path.join(directory, name), os.path.join(spelled, name))
+                           for name in reversed(subdirectories))
+
+        return found
+
+    @staticmethod
+    def _weigh(root, entry):
+        """Estimates the bytes held by the entry's strings, lists, and tuples."""
+        listings, results = entry
+        weight = len(root) + 100
+        for directory, (_, files, subdirectories) in listings.items():
+            weight += len(directory) + 200
+            for name in files:
+                weight += len(name) + 60
+            for name in subdirectories:
+                weight += len(name) + 60
+        for found in results.values():
+            weight += 100
+            for file in found:
+                weight += len(file) + 60
+
+        return weight
+
+
+def _is_within(path, directory):
+    """Returns whether the absolute path is the directory or beneath it."""
+    return path == directory or path.startswith(os.path.join(directory, ''))
+
+
+# Like git, a file with a NUL byte in its first 8000 bytes is taken to be binary.
+SNIFF_BYTES = 8000
+
+
+def search_files(suffix, path, pattern, literal=False, workers=4):
+    """
+    Find the lines matching a pattern in all files beneath path with file name suffix.
+
+    Each file is memory-mapped and searched in place on a bounded pool of threads, and binary files are skipped.
+    The results stream back in the order the files are found, while at most 2 * workers files are in flight.
+
+    Args:
+      suffix(str): suffix if the file name to be found
+      path(str): path of the file system
+      pattern(bytes): regex to search for, or the bytes to find when literal
+      literal(bool): whether the pattern is plain bytes rather than a regex
+      workers(int): number of threads searching files concurrently
+
+    Yields:
+       a (path, line number, line) tuple for each matching line, with the line as bytes without its newline
+    """
+    if isinstance(pattern, str):
+        pattern = pattern.encode()
+
+    if literal:
+        def search(buffer, position):
+            return buffer.find(pattern, position)
+    else:
+        # The results are per line, so ^ and $ anchor at each line rather than at the ends of the file.
+        regex = re.compile(pattern, re.MULTILINE)
+
+        def search(buffer, position):
+            match = regex.search(buffer, position)
+            return -1 if match is None else match.start()
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for file in iter_files(suffix, path):
+            pending.append(executor.submit(_search_file, file, search))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _search_file(path, search):
+    """Searches one memory-mapped file, returning the (path, line number, line) of each line with a match."""
+    found = []
+    try:
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            # An empty file cannot be mapped, and has no lines to match.
+            if size == 0:
+                return found
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                if buffer.find(b'\0', 0, SNIFF_BYTES) != -1:
+                    return found
+
+                line_number = 1
+                counted = 0
+                position = 0
+                # A match at the end of a file that ends with a newline is past the last line, e.g. for ^ or $.
+                ends_with_newline = buffer[size - 1] == ord('\n')
+                while position < size:
+                    start = search(buffer, position)
+                    if start < 0 or start == size and ends_with_newline:
+                        break
+
+                    line_start = buffer.rfind(b'\n', 0, start) + 1
+                    line_end = buffer.find(b'\n', start)
+                    if line_end < 0:
+                        line_end = size
+
+                    # Count the newlines since the last match, so the file is only counted through once.
+                    line_number += buffer[counted:line_start].count(b'\n')
+                    counted = line_start
+                    found.append((path, line_number, buffer[line_start:line_end]))
+
+                    # Resume on the next line, so a line with many matches is reported once.
+                    position = line_end + 1
+    except OSError:
+        # Like grep, skip the files that cannot be read and carry on.
+        pass
+
+    return found
+
+
+def watch_files(suffix, path):
+    """
+    Find all files beneath path with file name suffix, then keep watching the tree for files being added or removed.
+
+    Args:
+      suffix(str): suffix if the file name to be found
+      path(str): path of the file system
+
+    Yields:
+       an ('add', path) event for each file found by the initial walk, then an ('add', path) or ('remove', path)
+       event as each matching file appears or disappears, until the generator is closed
+    """
+    # Bail out if no path is given.
+    if not bool(path):
+        return
+
+    with File_Watcher(suffix, path) as watcher:
+        while True:
+            yield from watcher.read_events()
+
+
+class File_Watcher:
+    """
+    Watches a tree for files with a suffix being added or removed, using Linux inotify through ctypes.
+
+    The initial walk adds a watch to every directory before listing it, so no file created during the walk is
+    missed, and each new subdirectory is watched and walked as it appears.  Symbolic links are not followed.
+    """
+
+    EVENT = struct.Struct('iIII')
+
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_DONT_FOLLOW = 0x02000000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = os.O_CLOEXEC
+
+    MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR | IN_DONT_FOLLOW
+
+    libc = None
+
+    def __init__(self, suffix, path):
+        """
+        Starts watching, walking the tree to find the existing files.
+
+        :param suffix: The file name suffix to match, or a falsey to match all files.
+        :param path: The directory to watch.
+        """
+        self.suffix = suffix if bool(suffix) else None
+        self.root = path
+        self.libc = self._load_libc()
+
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            self._raise_errno()
+
+        self.directories = {}
+        self.watches = {}
+        self.files = set()
+        try:
+            self.pending = self._watch_tree(path)
+        except BaseException:
+            self.close()
+            raise
+
+    def read_events(self, timeout=None):
+        """
+        Waits for the next batch of events.
+
+        :param timeout: Seconds to wait for an event, or None to wait until one arrives.
+        :return: list - the (event, path) tuples, where the event is 'add' or 'remove', empty when the timeout passed
+        """
+        if self.pending:
+            events, self.pending = self.pending, []
+            return events
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                return []
+
+            events = []
+            for wd, mask, name in self._read():
+                events.extend(self._handle(wd, mask, name))
+
+            # Events for other files, or duplicates of what the walk found, leave nothing to report, so keep waiting.
+            if events:
+                return events
+
+    def close(self):
+        """Stops watching and releases the inotify instance."""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _watch_tree(self, path):
+        """Watches the directory and its subdirectories, returning the add events of the matching files found."""
+        events = []
+        directories = [path]
+        while directories:
+            directory = directories.pop()
+
+            # Watch before listing, so a file created in between is seen by either the listing or the watch.
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+            if wd < 0:
+                # A subdirectory removed, or replaced by a file, before it could be watched is skipped; anything else,
+                # like running out of watches (ENOSPC) or an unwatchable root, would leave the tree silently unwatched.
+                if directory == self.root or ctypes.get_errno() not in (errno.ENOENT, errno.ENOTDIR):
+                    self._raise_errno()
+                continue
+            self.directories[wd] = directory
+            self.watches[directory] = wd
+
+            subdirectories = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.path)
+
+                        elif entry.is_file() and self._matches(entry.name) and entry.path not in self.files:
+                            self.files.add(entry.path)
+                            events.append(('add', entry.path))
+            except OSError:
+                continue
+
+            directories.extend(reversed(subdirectories))
+
+        return events
+
+    def _unwatch_tree(self, path):
+        """Stops watching the directory and its subdirectories, returning the remove events of their files."""
+        prefix = path + os.sep
+        for directory in [directory for directory in self.watches if directory == path or directory.startswith(prefix)]:
+            wd = self.watches.pop(directory)
+            del self.directories[wd]
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+        removed = sorted(file for file in self.files if file.startswith(prefix))
+        self.files.difference_update(removed)
+        return [('remove', file) for file in removed]
+
+    def _rescan(self):
+        """Walks the whole tree again after the kernel dropped events, returning the differences as events."""
+        known = self.files
+        self.files = set()
+        self._watch_tree(self.root)
+        return [('remove', file) for file in sorted(known - self.files)] + \
+            [('add', file) for file in sorted(self.files - known)]
+
+    def _handle(self, wd, mask, name):
+        """Turns one inotify event into add and remove events."""
+        if mask & self.IN_Q_OVERFLOW:
+            return self._rescan()
+
+        if mask & self.IN_IGNORED:
+            # The watch went away with its directory; the parent's event reports the files.
+            directory = self.directories.pop(wd, None)
+            if directory is not None and self.watches.get(directory) == wd:
+                del self.watches[directory]
+            return []
+
+        directory = self.directories.get(wd)
+        if directory is None:
+            return []
+        path = os.path.join(directory, name)
+
+        if mask & self.IN_ISDIR:
+            if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                return self._watch_tree(path)
+            return self._unwatch_tree(path)
+
+        if not self._matches(name):
+            return []
+
+        if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+            # Like the walk, only count regular files, or links to them. A link to a directory comes without IN_ISDIR.
+            if path in self.files or not os.path.isfile(path):
+                return []
+            self.files.add(path)
+            return [('add', path)]
+
+        if path not in self.files:
+            return []
+        self.files.discard(path)
+        return [('remove', path)]
+
+    def _matches(self, name):
+        """Checks whether the file name ends with the suffix."""
+        return self.suffix is None or name.endswith(self.suffix)
+
+    def _read(self):
+        """Reads the queued inotify events, yielding the watch descriptor, mask, and file name of each."""
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = self.EVENT.unpack_from(buffer, offset)
+                offset += self.EVENT.size
+                name = os.fsdecode(buffer[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                yield wd, mask, name
+
+    @classmethod
+    def _load_libc(cls):
+        """Loads the C library's inotify functions, raising an OSError where they are not available."""
+        if cls.libc is None:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            if not hasattr(libc, 'inotify_init1'):
+                raise OSError(errno.ENOSYS, 'inotify is only available on Linux')
 
-            elif os.path.isfile(fullpath) and (suffix is None or entry.endswith(suffix)):
-                files.append(fullpath)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+            cls.libc = libc
 
-        return files
+        return cls.libc
 
-    return _find_files(path, [])
+    def _raise_errno(self):
+        """Raises an OSError for the errno the last C library call set."""
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
 
 
 if __name__ == '__main__':
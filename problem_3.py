@@ -4,15 +4,16 @@ import sys
 from queue import PriorityQueue
 
 
-def huffman_encoding(data):
+def huffman_encoding(data, packed=False):
     """
     Encodes the given string data using the Huffman Coding algorithm.
 
     :param data: String to be encoded.
-    :return: tuple - encoded data, Huffman Tree
+    :param packed: When True, packs the encoded bits into bytes instead of a string of '0' and '1' characters.
+    :return: tuple - encoded data, Huffman Tree; the packed encoded data is a tuple of the bytes and the bit length
     """
     if not bool(data):
-        return '', None
+        return ((b'', 0) if packed else ''), None
 
     # Step 1: Map the frequencies.
     frequencies = map_frequency(data)
@@ -24,22 +25,58 @@ def huffman_encoding(data):
     code_mappings = map_codes(tree, '', dict())
 
     # Step 4: Encode the original data using the code mappings from the Huffman Tree.
-    encoding = ''
+    if packed:
+        return pack_codes(data, code_mappings), tree
+
+    return ''.join(code_mappings[char] for char in data), tree
+
+
+def pack_codes(data, code_mappings):
+    """
+    Packs the code of each character into bytes, most significant bit first, through an integer bit accumulator.
+
+    :param data: String to be encoded.
+    :param code_mappings: Dictionary of each character to its code of 1s and 0s.
+    :return: tuple - the bytes, the number of bits used, with the last byte padded with 0s
+    """
+    codes = {char: (int(code, 2), len(code)) for char, code in code_mappings.items() if char is not None}
+
+    packed = bytearray()
+    accumulator = 0
+    pending = 0
+    bit_length = 0
     for char in data:
-        encoding += code_mappings[char]
+        value, length = codes[char]
+        accumulator = (accumulator << length) | value
+        pending += length
 
-    return encoding, tree
+        # Flush 8 bytes at a time, keeping only the bits not yet written in the accumulator.
+        if pending >= 64:
+            pending -= 64
+            packed += (accumulator >> pending).to_bytes(8, 'big')
+            bit_length += 64
+            accumulator &= (1 << pending) - 1
+
+    bit_length += pending
+    if pending:
+        padded = (pending + 7) // 8
+        packed += (accumulator << (padded * 8 - pending)).to_bytes(padded, 'big')
+
+    return bytes(packed), bit_length
 
 
 def huffman_decoding(data, tree):
     """
     Decode the given encoded (compressed) data using the given Huffman Tree.
 
-    :param data: the encoded data to be decoded.
+    :param data: the encoded data to be decoded, as a string or as the packed tuple of bytes and bit length.
     :param tree: the Huffman Tree used to encode the original, uncompressed data
     :return: string - the decoded data string
     """
-    decoded = ''
+    if isinstance(data, tuple):
+        return unpack_codes(data[0], data[1], tree)
+
+    decoded = []
     node = tree
 
     for bit in data:
@@ -56,10 +93,64 @@ def huffman_decoding(data, tree):
 
         # If leaf, capture the char and rewind to the root.
         if node.left_child is None and node.right_child is None:
-            decoded += node.char
+            decoded.append(node.char)
+            node = tree
+
+    return ''.join(decoded)
+
+
+def unpack_codes(packed, bit_length, tree):
+    """
+    Decodes packed bytes a byte at a time, using a table of where each byte leads from each node of the tree.
+
+    :param packed: The packed bytes.
+    :param bit_length: The number of bits used in the packed bytes.
+    :param tree: the Huffman Tree used to encode the original, uncompressed data
+    :return: string - the decoded data string
+    """
+    decoded = []
+    node = tree
+
+    # Each (node, byte) step is walked once, then looked up, so the bits of a repeating pattern are not re-walked.
+    steps = dict()
+    whole_bytes = bit_length // 8
+    for byte in memoryview(packed)[:whole_bytes]:
+        step = steps.get((node, byte))
+        if step is None:
+            step = steps[(node, byte)] = walk_bits(tree, node, byte, 8)
+        chars, node = step
+        decoded.append(chars)
+
+    remainder = bit_length % 8
+    if remainder:
+        chars, node = walk_bits(tree, node, packed[whole_bytes] >> (8 - remainder), remainder)
+        decoded.append(chars)
+
+    return ''.join(decoded)
+
+
+def walk_bits(tree, node, bits, count):
+    """
+    Walks the tree from the given node along the given bits, most significant first.
+
+    :param tree: Root of the Huffman Tree.
+    :param node: The HuffmanNode to start from.
+    :param bits: Integer holding the bits.
+    :param count: Number of bits to walk.
+    :return: tuple - the decoded characters, the HuffmanNode the walk ends on
+    """
+    chars = []
+    for shift in range(count - 1, -1, -1):
+        child = node.right_child if (bits >> shift) & 1 else node.left_child
+        if type(child) is HuffmanNode:
+            node = child
+
+        # If leaf, capture the char and rewind to the root.
+        if node.left_child is None and node.right_child is None:
+            chars.append(node.char)
             node = tree
 
-    return decoded
+    return ''.join(chars), node
 
 
 class HuffmanNode:
@@ -1,7 +1,15 @@
 #!/usr/bin/env python3
 
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
 import unittest
-from problem_1 import LRU_Cache, CacheNode
+from problem_1 import LRU_Cache, CacheNode, TimedCacheNode, Compact_LRU_Cache, Sharded_LRU_Cache, TimerWheel, \
+    memoize, TwoQ_Cache, ARC_Cache, WTinyLFU_Cache, Clock_Cache, CountMinSketch, POLICIES, make_cache, \
+    LatencyHistogram, DiskTier, Shared_LRU_Cache
 
 
 class Test_LRU_Cache(unittest.TestCase):
@@ -17,6 +25,16 @@ class Test_LRU_Cache(unittest.TestCase):
         self.assertEqual(-1, cache.set(1, 1))
         self.assertEqual(0, len(cache.hashtable))
 
+    def test_should_stay_empty_when_negative_capacity(self):
+        """
+        LRU_Cache::set(), set_many(), and get() should not cache anything when the cache's capacity is negative.
+        """
+        cache = LRU_Cache(-1)
+        self.assertIsNone(cache.set(1, 1))
+        cache.set_many({2: 2, 3: 3})
+        self.assertEqual(-1, cache.get(1))
+        self.assertEqual(0, len(cache.hashtable))
+
     def test_get_should_return_neg1_when_0_capacity(self):
         """
         LRU_Cache::get() should return -1 when the cache's capacity is 0.
@@ -269,6 +287,1318 @@ class Test_LRU_Cache(unittest.TestCase):
         # Clean up.
         cache.clear()
 
+    def test_clear_should_empty_the_cache(self):
+        """
+        LRU_Cache::clear() should empty the cache and leave it usable.
+        """
+        cache = LRU_Cache(2)
+        cache.set(1, 1)
+        cache.set(2, 2)
+        cache.clear()
+
+        self.assertEqual(0, len(cache.hashtable))
+        self.assertEqual(cache.tail, cache.head.next)
+        cache.set(3, 3)
+        self.assertEqual(3, cache.get(3))
+
+    def test_total_weight_should_count_entries_when_no_weigher_given(self):
+        """
+        LRU_Cache::total_weight should equal the number of entries when no weigher is given.
+        """
+        cache = LRU_Cache(3)
+        cache.set(1, 1)
+        cache.set(2, 2)
+        cache.set(2, 20)
+        self.assertEqual(2, cache.total_weight)
+
+        cache.set(3, 3)
+        cache.set(4, 4)
+        self.assertEqual(3, cache.total_weight)
+
+    def test_set_should_track_total_weight(self):
+        """
+        LRU_Cache::set() should add the weigher's weight to the total and adjust it when a value is overwritten.
+        """
+        cache = LRU_Cache(10, weigher=lambda key, value: len(value), max_weight=100)
+        cache.set('a', 'x' * 10)
+        cache.set('b', 'x' * 20)
+        self.assertEqual(30, cache.total_weight)
+
+        cache.set('a', 'x' * 5)
+        self.assertEqual(25, cache.total_weight)
+        self.assertEqual(5, cache.hashtable['a'].weight)
+
+        cache.clear()
+        self.assertEqual(0, cache.total_weight)
+
+    def test_set_should_remove_lru_nodes_until_under_max_weight(self):
+        """
+        LRU_Cache::set() should remove as many LRU nodes as needed to get back under the max weight.
+        """
+        cache = LRU_Cache(10, weigher=lambda key, value: len(value), max_weight=100)
+        cache.set('a', 'x' * 30)
+        cache.set('b', 'x' * 30)
+        cache.set('c', 'x' * 30)
+        cache.get('a')
+
+        # 'b' and 'c' are the LRU nodes and must both go to fit 70 more.
+        cache.set('d', 'x' * 70)
+        self.assertEqual(['a', 'd'], sorted(cache.hashtable.keys()))
+        self.assertEqual(100, cache.total_weight)
+
+    def test_discard_should_remove_the_entry(self):
+        """
+        LRU_Cache::discard() should remove the entry and its weight without calling on_evict.
+        """
+        evicted = []
+        cache = LRU_Cache(5, weigher=lambda key, value: len(value), on_evict=lambda key, value: evicted.append(key))
+        cache.set('a', 'xx')
+        cache.set('b', 'xxx')
+        cache.discard('a')
+        cache.discard('missing')
+        cache.discard([])
+
+        self.assertEqual(-1, cache.get('a'))
+        self.assertEqual(['b'], list(cache.hashtable))
+        self.assertEqual(3, cache.total_weight)
+        self.assertEqual([], evicted)
+
+    def test_set_should_reject_entry_heavier_than_max_weight(self):
+        """
+        LRU_Cache::set() should return -1 for an entry heavier than the max weight, without evicting the others.
+        """
+        cache = LRU_Cache(10, weigher=lambda key, value: len(value), max_weight=10)
+        cache.set('a', 'x' * 5)
+        cache.set('b', 'x' * 3)
+        self.assertEqual(-1, cache.set('c', 'x' * 11))
+
+        self.assertEqual(['a', 'b'], sorted(cache.hashtable.keys()))
+        self.assertEqual(8, cache.total_weight)
+        self.assertEqual(-1, cache.get('c'))
+
+        # The key's old value is stale once an oversized one is set, so it is dropped.
+        self.assertEqual(-1, cache.set('a', 'x' * 11))
+        self.assertEqual(['b'], sorted(cache.hashtable.keys()))
+        self.assertEqual(3, cache.total_weight)
+        self.assertEqual(-1, cache.get('a'))
+
+    def test_should_only_use_timed_nodes_for_weights_and_ttls(self):
+        """
+        LRU_Cache should keep plain entries in slim CacheNodes, and use TimedCacheNodes for a weigher or a ttl.
+        """
+        clock = FakeClock()
+        cache = LRU_Cache(5, clock=clock)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertIs(CacheNode, type(cache.hashtable['a']))
+
+        # Setting a ttl on a plain entry swaps its node in place, keeping it in the MRU position.
+        cache.set('a', 3, ttl=10)
+        self.assertIs(TimedCacheNode, type(cache.hashtable['a']))
+        self.assertIs(cache.hashtable['a'], cache.head.next)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(2, cache.total_weight)
+        clock.now = 10
+        self.assertEqual(-1, cache.get('a'))
+        self.assertEqual(2, cache.get('b'))
+
+        weighted = LRU_Cache(5, weigher=lambda key, value: len(value))
+        weighted.set('a', 'xyz')
+        self.assertIs(TimedCacheNode, type(weighted.hashtable['a']))
+        self.assertEqual(3, weighted.total_weight)
+
+    def test_get_should_return_neg1_when_expired(self):
+        """
+        LRU_Cache::get() should return -1 and remove the entry once its ttl has elapsed.
+        """
+        clock = FakeClock()
+        cache = LRU_Cache(5, clock=clock)
+        cache.set('udacity', 1, ttl=10)
+        cache.set('python', 2)
+
+        clock.now = 9.5
+        self.assertEqual(1, cache.get('udacity'))
+
+        clock.now = 10
+        self.assertEqual(-1, cache.get('udacity'))
+        self.assertFalse('udacity' in cache.hashtable)
+        self.assertEqual(2, cache.get('python'))
+
+    def test_set_should_use_default_ttl(self):
+        """
+        LRU_Cache::set() should fall back to the default ttl, and a per-entry ttl should override it.
+        """
+        clock = FakeClock()
+        cache = LRU_Cache(5, default_ttl=5, clock=clock)
+        cache.set('udacity', 1)
+        cache.set('python', 2, ttl=20)
+
+        clock.now = 6
+        self.assertEqual(-1, cache.get('udacity'))
+        self.assertEqual(2, cache.get('python'))
+
+    def test_set_should_reset_the_ttl_when_overwriting(self):
+        """
+        LRU_Cache::set() should replace the previous ttl when an existing key is set again.
+        """
+        clock = FakeClock()
+        cache = LRU_Cache(5, clock=clock)
+        cache.set('udacity', 1, ttl=5)
+        cache.set('udacity', 2)
+
+        clock.now = 100
+        self.assertEqual(2, cache.get('udacity'))
+        self.assertIsNone(cache.hashtable['udacity'].timer)
+
+    def test_expire_should_remove_expired_entries_without_a_get(self):
+        """
+        LRU_Cache::expire() and set() should reclaim expired entries that are never looked up.
+        """
+        clock = FakeClock()
+        cache = LRU_Cache(1000, clock=clock)
+        for key in range(1, 101):
+            cache.set(key, key, ttl=key)
+
+        clock.now = 50.5
+        cache.expire()
+        self.assertEqual(list(range(51, 101)), sorted(cache.hashtable.keys()))
+
+        # A set sweeps too.
+        clock.now = 5000
+        cache.set('udacity', 1)
+        self.assertEqual(['udacity'], list(cache.hashtable.keys()))
+        self.assertEqual(1, cache.total_weight)
+
+    def test_evicting_should_cancel_the_timer(self):
+        """
+        LRU_Cache::set() should remove an evicted node from the timer wheel.
+        """
+        clock = FakeClock()
+        cache = LRU_Cache(1, clock=clock)
+        cache.set('udacity', 1, ttl=5)
+        node = cache.hashtable['udacity']
+        cache.set('python', 2)
+
+        self.assertIsNone(node.timer)
+        self.assertEqual(0, sum(len(bucket) for wheel in cache.timers.wheels for bucket in wheel))
+
+    def test_get_many_should_return_hits_and_misses(self):
+        """
+        LRU_Cache::get_many() should return the hits' values and the missed keys separately.
+        """
+        cache = LRU_Cache(5)
+        for key in (1, 2, 3, 4):
+            cache.set(key, key * 10)
+
+        hits, misses = cache.get_many([2, 9, 4, None, '', 1])
+        self.assertDictEqual({2: 20, 4: 40, 1: 10}, hits)
+        self.assertListEqual([9, None, ''], misses)
+
+        # The hits are moved to the front in lookup order.
+        node = cache.head.next
+        self.assertListEqual([1, 4, 2, 3], [node.key, node.next.key, node.next.next.key, cache.tail.prev.key])
+
+    def test_get_many_should_miss_when_0_capacity_or_expired(self):
+        """
+        LRU_Cache::get_many() should miss every key when the capacity is 0 and miss expired entries.
+        """
+        self.assertEqual(({}, [1, 2]), LRU_Cache(0).get_many([1, 2]))
+
+        clock = FakeClock()
+        cache = LRU_Cache(5, clock=clock)
+        cache.set(1, 1, ttl=5)
+        cache.set(2, 2)
+        clock.now = 5
+
+        self.assertEqual(({2: 2}, [1]), cache.get_many([1, 2]))
+        self.assertFalse(1 in cache.hashtable)
+
+    def test_set_many_should_cache_all_items(self):
+        """
+        LRU_Cache::set_many() should cache every item, skipping falsey keys.
+        """
+        cache = LRU_Cache(5)
+        cache.set('udacity', 1)
+        cache.set_many({'python': 2, '': 3, 'udacity': 10})
+        cache.set_many([(100, 'hello world'), (None, 'skipped')])
+
+        self.assertListEqual([100, 'python', 'udacity'], sorted(cache.hashtable.keys(), key=str))
+        self.assertEqual(10, cache.get('udacity'))
+        self.assertEqual(3, cache.total_weight)
+        self.assertEqual(-1, LRU_Cache(0).set_many({1: 1}))
+
+    def test_set_many_should_evict_once_at_the_end(self):
+        """
+        LRU_Cache::set_many() should leave the same entries as calling set() for each item.
+        """
+        cache = LRU_Cache(4)
+        expected = LRU_Cache(4)
+        for key in (1, 2, 3):
+            cache.set(key, key)
+            expected.set(key, key)
+        cache.get(1)
+        expected.get(1)
+
+        items = [(4, 4), (5, 5), (2, 20), (6, 6)]
+        cache.set_many(items)
+        for key, value in items:
+            expected.set(key, value)
+
+        self.assertListEqual(sorted(expected.hashtable.keys()), sorted(cache.hashtable.keys()))
+        self.assertEqual(4, len(cache.hashtable))
+        self.assertEqual(expected.tail.prev.key, cache.tail.prev.key)
+
+    def test_set_many_should_apply_the_ttl(self):
+        """
+        LRU_Cache::set_many() should apply the given ttl to every item.
+        """
+        clock = FakeClock()
+        cache = LRU_Cache(5, clock=clock)
+        cache.set_many({1: 1, 2: 2}, ttl=5)
+
+        clock.now = 5
+        self.assertEqual(({}, [1, 2]), cache.get_many([1, 2]))
+
+    def test_on_evict_should_be_called_for_each_removed_entry(self):
+        """
+        LRU_Cache::on_evict should be called with the key and value of each entry removed by LRU pressure or expiry.
+        """
+        clock = FakeClock()
+        evicted = []
+        cache = LRU_Cache(2, clock=clock, on_evict=lambda key, value: evicted.append((key, value)))
+        cache.set('udacity', 1)
+        cache.set('python', 2, ttl=5)
+        cache.set(100, 'hello world')
+        self.assertEqual([('udacity', 1)], evicted)
+
+        clock.now = 5
+        cache.expire()
+        self.assertEqual([('udacity', 1), ('python', 2)], evicted)
+
+    def test_stats_should_be_disabled_by_default(self):
+        """
+        LRU_Cache should not have stats or instrumented methods unless they are enabled.
+        """
+        cache = LRU_Cache(2)
+        self.assertIsNone(cache.stats)
+        self.assertIsNone(cache.get_stats())
+        self.assertFalse('get' in cache.__dict__)
+
+    def test_enable_stats_should_count_operations(self):
+        """
+        LRU_Cache::enable_stats() should count the hits, misses, sets, and evictions.
+        """
+        cache = LRU_Cache(2)
+        cache.enable_stats(sample_every=2)
+        cache.set('udacity', 1)
+        cache.set('python', 2)
+        cache.set(100, 'hello world')
+        cache.set('', 3)
+        self.assertEqual(-1, cache.get('udacity'))
+        self.assertEqual(2, cache.get('python'))
+        cache.get(None)
+        cache.get_many(['python', 100, 'missing'])
+        cache.set_many({200: 'algorithms', '': 4})
+
+        stats = cache.get_stats()
+        self.assertEqual(3, stats['hits'])
+        self.assertEqual(3, stats['misses'])
+        self.assertEqual(0.5, stats['hit_ratio'])
+        self.assertEqual(4, stats['sets'])
+        self.assertEqual(2, stats['evictions'])
+        self.assertEqual(2, stats['size'])
+        self.assertEqual(1, stats['get_latency']['samples'])
+        self.assertEqual(2, stats['set_latency']['samples'])
+
+    def test_disable_stats_should_restore_the_plain_methods(self):
+        """
+        LRU_Cache::disable_stats() should restore the plain methods and discard the stats.
+        """
+        cache = LRU_Cache(2)
+        cache.enable_stats()
+        cache.enable_stats()
+        cache.set('udacity', 1)
+        self.assertEqual(1, cache.get_stats()['sets'])
+
+        cache.disable_stats()
+        self.assertIsNone(cache.stats)
+        self.assertFalse('get' in cache.__dict__)
+        self.assertEqual(1, cache.get('udacity'))
+
+    def test_dump_and_load_should_round_trip_in_recency_order(self):
+        """
+        LRU_Cache::dump() and load() should restore the entries and their recency order.
+        """
+        cache = LRU_Cache(5)
+        for key, value in (('udacity', 1), ('python', [2, 3]), (100, 'hello world'), (200, {'a': 'b'})):
+            cache.set(key, value)
+        cache.get('python')
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.snapshot')
+            self.assertEqual(4, cache.dump(path))
+            self.assertEqual(['cache.snapshot'], os.listdir(directory))
+
+            loaded = LRU_Cache(5)
+            loaded.set('stale', 0)
+            self.assertEqual(4, loaded.load(path))
+
+        self.assertEqual(self._get_order(cache), self._get_order(loaded))
+        self.assertEqual(['python', 200, 100, 'udacity'], self._get_order(loaded))
+        self.assertEqual([2, 3], loaded.get('python'))
+        self.assertEqual(-1, loaded.get('stale'))
+        self.assertEqual(loaded.hashtable['udacity'], loaded.tail.prev)
+        self.assertEqual(4, loaded.total_weight)
+
+    def test_load_should_keep_the_mru_entries_that_fit(self):
+        """
+        LRU_Cache::load() should skip the LRU end of a snapshot larger than the capacity or weight budget.
+        """
+        cache = LRU_Cache(10)
+        for key in range(1, 11):
+            cache.set(key, 'x' * key)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.snapshot')
+            cache.dump(path)
+
+            smaller = LRU_Cache(3)
+            self.assertEqual(3, smaller.load(path))
+            self.assertEqual([10, 9, 8], self._get_order(smaller))
+
+            lighter = LRU_Cache(10, weigher=lambda key, value: len(value), max_weight=20)
+            self.assertEqual(2, lighter.load(path))
+            self.assertEqual([10, 9], self._get_order(lighter))
+
+    def test_dump_and_load_should_keep_the_remaining_ttl(self):
+        """
+        LRU_Cache::dump() should write the remaining ttl, skipping expired entries, and load() should restore it.
+        """
+        clock = FakeClock()
+        cache = LRU_Cache(5, clock=clock)
+        cache.set('udacity', 1, ttl=10)
+        cache.set('python', 2, ttl=100)
+        cache.set(100, 'hello world')
+        clock.now = 50
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.snapshot')
+            self.assertEqual(2, cache.dump(path))
+
+            other_clock = FakeClock()
+            other_clock.now = 1000
+            loaded = LRU_Cache(5, clock=other_clock)
+            loaded.load(path)
+
+        self.assertEqual([100, 'python'], self._get_order(loaded))
+        self.assertEqual(1050, loaded.hashtable['python'].expires)
+        other_clock.now = 1050
+        self.assertEqual(-1, loaded.get('python'))
+        self.assertEqual('hello world', loaded.get(100))
+
+    def test_load_should_raise_when_not_a_snapshot(self):
+        """
+        LRU_Cache::load() should raise a ValueError when the file is not a snapshot.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'not.snapshot')
+            with open(path, 'wb') as not_snapshot:
+                not_snapshot.write(b'hello world')
+
+            self.assertRaises(ValueError, LRU_Cache(5).load, path)
+
+    def test_load_should_leave_a_usable_empty_cache_when_truncated(self):
+        """
+        LRU_Cache::load() should raise a ValueError for a truncated snapshot and leave the cache empty but usable.
+        """
+        cache = LRU_Cache(5)
+        for key in ('udacity', 'python', 'hello'):
+            cache.set(key, key * 10)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.snapshot')
+            cache.dump(path)
+            with open(path, 'rb') as snapshot:
+                data = snapshot.read()
+
+            # Cut inside the first record's header, and inside the last record's value, after two entries are linked.
+            for length in (len(LRU_Cache.SNAPSHOT_MAGIC) + 5, len(data) - 3):
+                with open(path, 'wb') as snapshot:
+                    snapshot.write(data[:length])
+
+                loaded = LRU_Cache(5)
+                loaded.set('stale', 1)
+                self.assertRaises(ValueError, loaded.load, path)
+                self.assertEqual(0, len(loaded))
+                self.assertEqual(0, loaded.total_weight)
+
+                loaded.set('k2', 2)
+                self.assertEqual(2, loaded.get('k2'))
+                self.assertEqual(['k2'], self._get_order(loaded))
+
+    """
+    Helpers.
+    """
+
+    def _get_order(self, cache):
+        """Helper function to fetch the keys from the MRU to the LRU position."""
+        order = []
+        node = cache.head.next
+        while node is not cache.tail:
+            order.append(node.key)
+            node = node.next
+        return order
+
+
+class Test_LatencyHistogram(unittest.TestCase):
+    """
+    Test the LatencyHistogram methods.
+    """
+
+    def test_percentile_should_return_the_bucket_upper_bound(self):
+        """
+        LatencyHistogram::percentile() should return the upper bound of the bucket holding the percentile.
+        """
+        histogram = LatencyHistogram()
+        self.assertEqual(0, histogram.percentile(99))
+
+        for _ in range(99):
+            histogram.record(100e-9)
+        histogram.record(5000e-9)
+
+        self.assertEqual(128, histogram.percentile(50))
+        self.assertEqual(128, histogram.percentile(99))
+        self.assertEqual(8192, histogram.percentile(100))
+        self.assertEqual(149, int(histogram.mean()))
+
+
+class Test_TimerWheel(unittest.TestCase):
+    """
+    Test the TimerWheel methods.
+    """
+
+    def test_advance_should_return_expired_nodes_only(self):
+        """
+        TimerWheel::advance() should return the expired nodes and keep the rest scheduled.
+        """
+        wheel = TimerWheel(0)
+        nodes = []
+        for expires in (0.5, 3, 70, 5000, 400000, 20000000):
+            node = TimedCacheNode(expires, expires)
+            node.expires = expires
+            wheel.schedule(node)
+            nodes.append(node)
+
+        expired = []
+        for now in (1, 2, 3, 69, 71, 4999, 5000, 399999.5, 400001, 19999999, 20000000):
+            for node in wheel.advance(now):
+                self.assertLessEqual(node.expires, now)
+                expired.append(node.expires)
+
+        self.assertEqual([0.5, 3, 70, 5000, 400000, 20000000], expired)
+
+    def test_advance_should_handle_long_jumps(self):
+        """
+        TimerWheel::advance() should expire every node when time jumps past all of them at once.
+        """
+        wheel = TimerWheel(0)
+        for expires in range(1, 10000, 7):
+            node = TimedCacheNode(expires, expires)
+            node.expires = expires
+            wheel.schedule(node)
+
+        self.assertEqual([], wheel.advance(0.5))
+        self.assertEqual(len(range(1, 10000, 7)), len(wheel.advance(10 ** 9)))
+
+    def test_cancel_should_remove_the_node(self):
+        """
+        TimerWheel::cancel() should remove the node so that it never expires.
+        """
+        wheel = TimerWheel(0)
+        node = TimedCacheNode(1, 1)
+        node.expires = 10
+        wheel.schedule(node)
+        wheel.cancel(node)
+
+        self.assertIsNone(node.timer)
+        self.assertEqual([], wheel.advance(100))
+
+
+class FakeClock:
+    """Clock for the ttl tests that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Test_Compact_LRU_Cache(unittest.TestCase):
+    """
+    Test the Compact_LRU_Cache methods.
+    """
+
+    def test_should_return_neg1_when_0_capacity(self):
+        """
+        Compact_LRU_Cache::set() and get() should return -1 and not set the value when the capacity is 0 or less.
+        """
+        for capacity in (0, -1):
+            cache = Compact_LRU_Cache(capacity)
+            self.assertEqual(-1, cache.set(1, 1))
+            self.assertEqual(-1, cache.get(1))
+            self.assertEqual(0, len(cache.hashtable))
+
+    def test_should_return_neg1_when_falsey_key_given(self):
+        """
+        Compact_LRU_Cache::set() and get() should return -1 when a falsey key is given.
+        """
+        cache = Compact_LRU_Cache(5)
+        for key in ('', None, False, 0):
+            self.assertEqual(-1, cache.set(key, 1))
+            self.assertEqual(-1, cache.get(key))
+        self.assertEqual(0, len(cache.hashtable))
+
+    def test_set_should_cache_and_overwrite(self):
+        """
+        Compact_LRU_Cache::set() should cache new entries and overwrite existing ones.
+        """
+        cache = Compact_LRU_Cache(5)
+        cache.set('udacity', 1)
+        cache.set(100, 'hello world')
+        self.assertEqual(1, cache.get('udacity'))
+        self.assertEqual('hello world', cache.get(100))
+
+        cache.set('udacity', 10)
+        self.assertEqual(10, cache.get('udacity'))
+        self.assertEqual(2, len(cache.hashtable))
+        self.assertEqual(-1, cache.get('does_not_exist'))
+
+    def test_get_should_move_slot_to_front(self):
+        """
+        Compact_LRU_Cache::get() should move the slot to the front (MRU) position of the recency list.
+        """
+        cache = Compact_LRU_Cache(5)
+        for key in (1, 2, 3, 4):
+            cache.set(key, key)
+
+        cache.get(2)
+        self.assertEqual([2, 4, 3, 1], self._get_order(cache))
+        cache.get(1)
+        self.assertEqual([1, 2, 4, 3], self._get_order(cache))
+
+    def test_set_should_remove_lru_entry_when_overcapacity(self):
+        """
+        Compact_LRU_Cache::set() should evict the LRU entry and recycle its slot when overcapacity.
+        """
+        cache = Compact_LRU_Cache(4)
+        for key in (1, 2, 3, 4):
+            cache.set(key, key)
+        cache.get(1)
+
+        cache.set(5, 5)
+        self.assertEqual(4, len(cache.hashtable))
+        self.assertEqual(-1, cache.get(2))
+        self.assertEqual([5, 1, 4, 3], self._get_order(cache))
+
+        # The slot freed by the evicted entry is reused rather than growing the arrays.
+        self.assertEqual(6, len(cache.keys))
+        self.assertEqual(-1, cache.free)
+
+    def test_should_match_LRU_Cache(self):
+        """
+        Compact_LRU_Cache should return the same results as LRU_Cache for the same operations.
+        """
+        cache = LRU_Cache(3)
+        compact = Compact_LRU_Cache(3)
+        for i in range(200):
+            key = (i * 7) % 11 + 1
+            if i % 3:
+                self.assertEqual(cache.get(key), compact.get(key))
+            else:
+                cache.set(key, i)
+                compact.set(key, i)
+        self.assertEqual(set(cache.hashtable.keys()), set(compact.hashtable.keys()))
+
+    def test_clear_should_empty_the_cache(self):
+        """
+        Compact_LRU_Cache::clear() should empty the cache and leave it usable.
+        """
+        cache = Compact_LRU_Cache(2)
+        cache.set(1, 1)
+        cache.set(2, 2)
+        cache.clear()
+
+        self.assertEqual(0, len(cache.hashtable))
+        self.assertEqual([], self._get_order(cache))
+        cache.set(3, 3)
+        self.assertEqual(3, cache.get(3))
+
+    """
+    Helpers.
+    """
+
+    def _get_order(self, cache):
+        """Helper function to fetch the keys from the MRU to the LRU position."""
+        order = []
+        slot = cache.next[cache.HEAD]
+        while slot != cache.TAIL:
+            order.append(cache.keys[slot])
+            slot = cache.next[slot]
+        return order
+
+
+class Test_DiskTier(unittest.TestCase):
+    """
+    Test the DiskTier methods and its use as the L2 tier of LRU_Cache.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.tier = DiskTier(self.directory.name, segment_size=1024)
+
+    def tearDown(self):
+        self.tier.close()
+        self.directory.cleanup()
+
+    def test_put_and_pop_should_round_trip_entries(self):
+        """
+        DiskTier::put() should store the entry and pop() should return and remove it.
+        """
+        self.tier.put('udacity', {'python': [1, 2, 3]})
+        self.tier.put(100, 'hello world')
+        self.assertEqual(2, len(self.tier))
+
+        self.assertEqual((True, {'python': [1, 2, 3]}), self.tier.pop('udacity'))
+        self.assertEqual((False, None), self.tier.pop('udacity'))
+        self.assertEqual((True, 'hello world'), self.tier.pop(100))
+        self.assertFalse(self.tier.put('too big', 'x' * 2000))
+
+    def test_put_should_roll_segments_and_drop_the_oldest_over_max_bytes(self):
+        """
+        DiskTier::put() should start a new segment when the active one is full and drop the oldest over max_bytes.
+        """
+        tier = DiskTier(self.directory.name, segment_size=1024, max_bytes=2048)
+        for key in range(1, 41):
+            tier.put(key, 'x' * 100)
+
+        self.assertEqual(2, len(tier.segments))
+        self.assertEqual((False, None), tier.pop(1))
+        self.assertEqual((True, 'x' * 100), tier.pop(40))
+        tier.close()
+
+    def test_should_compact_mostly_garbage_segments_in_the_background(self):
+        """
+        DiskTier should copy the live records out of a sealed, mostly garbage segment and delete its file.
+        """
+        for key in range(1, 21):
+            self.tier.put(key, 'x' * 100)
+        first = self.tier.segments[0]
+
+        # Promote most of the first segment's entries, leaving garbage behind.
+        for key in range(1, 8):
+            self.tier.pop(key)
+        self.tier.compactor.submit(lambda: None).result()
+
+        self.assertFalse(first in self.tier.segments)
+        self.assertFalse(os.path.exists(first.path))
+        for key in range(8, 21):
+            self.assertEqual((True, 'x' * 100), self.tier.pop(key))
+
+    def test_lru_cache_should_spill_evicted_entries_and_promote_them(self):
+        """
+        LRU_Cache::get() should fall through to the L2 tier on a miss and promote the entry back.
+        """
+        cache = LRU_Cache(2, l2=self.tier)
+        cache.set('udacity', 1)
+        cache.set('python', 2)
+        cache.set(100, 'hello world')
+        self.assertFalse('udacity' in cache.hashtable)
+        self.assertEqual(1, len(self.tier))
+
+        self.assertEqual(1, cache.get('udacity'))
+        self.assertTrue('udacity' in cache.hashtable)
+        self.assertFalse('python' in cache.hashtable)
+        self.assertEqual(2, cache.get('python'))
+        self.assertEqual(-1, cache.get('missing'))
+
+        hits, misses = cache.get_many(['udacity', 100, 'missing'])
+        self.assertEqual({'udacity': 1, 100: 'hello world'}, hits)
+        self.assertEqual(['missing'], misses)
+
+    def test_lru_cache_get_many_should_promote_a_repeated_key_once(self):
+        """
+        LRU_Cache::get_many() should report a key repeated in the batch as one hit when it is promoted from L2.
+        """
+        cache = LRU_Cache(1, l2=self.tier)
+        cache.set('udacity', 1)
+        cache.set('python', 2)
+
+        self.assertEqual(({'udacity': 1}, ['missing', 'missing']),
+                         cache.get_many(['udacity', 'missing', 'udacity', 'missing']))
+        self.assertEqual(['udacity'], list(cache.hashtable))
+
+    def test_lru_cache_set_should_discard_stale_l2_copies(self):
+        """
+        LRU_Cache::set() should discard the L2 copy of a key that is set again, and not spill entries with a ttl.
+        """
+        cache = LRU_Cache(1, l2=self.tier)
+        cache.set('udacity', 1)
+        cache.set('python', 2, ttl=60)
+        cache.set('udacity', 10)
+        self.assertEqual(0, len(self.tier))
+        self.assertEqual(-1, cache.get('python'))
+
+        cache.set('python', 2)
+        self.assertEqual(10, cache.get('udacity'))
+
+        cache.clear()
+        self.assertEqual(0, len(self.tier))
+
+
+class Test_Sharded_LRU_Cache(unittest.TestCase):
+    """
+    Test the Sharded_LRU_Cache methods.
+    """
+
+    def test_should_split_capacity_across_segments(self):
+        """
+        Sharded_LRU_Cache should split the capacity across its segments.
+        """
+        cache = Sharded_LRU_Cache(10, shards=4)
+        self.assertEqual([3, 3, 2, 2], [segment.capacity for segment in cache.segments])
+
+        cache = Sharded_LRU_Cache(0, shards=4)
+        self.assertEqual(-1, cache.set(1, 1))
+        self.assertEqual(-1, cache.get(1))
+
+    def test_should_not_have_more_segments_than_capacity(self):
+        """
+        Sharded_LRU_Cache should use fewer segments when the capacity is below the shard count, so none is empty.
+        """
+        cache = Sharded_LRU_Cache(10)
+        self.assertEqual(10, len(cache.segments))
+        self.assertTrue(all(segment.capacity == 1 for segment in cache.segments))
+
+        for key in range(1, 11):
+            cache.set(key, key * 10)
+        self.assertEqual(10, len(cache))
+        for key in range(1, 11):
+            self.assertEqual(key * 10, cache.get(key))
+
+    def test_should_return_neg1_when_falsey_key_given(self):
+        """
+        Sharded_LRU_Cache::set() and get() should return -1 when a falsey key is given.
+        """
+        cache = Sharded_LRU_Cache(8, shards=4)
+        for key in ('', None, False, [], {}):
+            self.assertEqual(-1, cache.set(key, 1))
+            self.assertEqual(-1, cache.get(key))
+        self.assertEqual(0, len(cache))
+
+    def test_should_route_each_key_to_one_segment(self):
+        """
+        Sharded_LRU_Cache should store each key in the segment its hash maps to.
+        """
+        cache = Sharded_LRU_Cache(100, shards=4)
+        for key in range(1, 41):
+            cache.set(key, key * 10)
+
+        self.assertEqual(40, len(cache))
+        for key in range(1, 41):
+            self.assertEqual(key * 10, cache.get(key))
+            self.assertTrue(key in cache.segments[hash(key) % 4].hashtable)
+
+    def test_should_evict_lru_entry_of_the_segment(self):
+        """
+        Sharded_LRU_Cache::set() should evict the LRU entry of the key's segment when it is overcapacity.
+        """
+        cache = Sharded_LRU_Cache(4, shards=2)
+        cache.set(2, 2)
+        cache.set(4, 4)
+        cache.get(2)
+        cache.set(6, 6)
+
+        self.assertEqual(-1, cache.get(4))
+        self.assertEqual(2, cache.get(2))
+        self.assertEqual(6, cache.get(6))
+
+    def test_should_be_consistent_under_concurrent_access(self):
+        """
+        Sharded_LRU_Cache should keep every segment consistent when used from many threads.
+        """
+        cache = Sharded_LRU_Cache(64, shards=4)
+
+        def worker(offset):
+            for i in range(2000):
+                key = (i + offset) % 100 + 1
+                if cache.get(key) == -1:
+                    cache.set(key, key)
+
+        threads = [threading.Thread(target=worker, args=(n * 7,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for segment in cache.segments:
+            self.assertLessEqual(len(segment.hashtable), segment.capacity)
+
+            # Walk the linked list to check that it matches the hashtable.
+            keys = []
+            node = segment.head.next
+            while node is not segment.tail:
+                keys.append(node.key)
+                node = node.next
+            self.assertEqual(sorted(segment.hashtable.keys()), sorted(keys))
+
+    def test_clear_should_empty_every_segment(self):
+        """
+        Sharded_LRU_Cache::clear() should empty every segment and leave the cache usable.
+        """
+        cache = Sharded_LRU_Cache(8, shards=4)
+        for key in range(1, 9):
+            cache.set(key, key)
+        cache.clear()
+
+        self.assertEqual(0, len(cache))
+        cache.set(1, 1)
+        self.assertEqual(1, cache.get(1))
+
+
+def fill_shared_cache(cache, start):
+    """Worker process for the Shared_LRU_Cache tests."""
+    for key in range(start, start + 10):
+        cache.set(key, ('value', key))
+    cache.close()
+
+
+class Test_Shared_LRU_Cache(unittest.TestCase):
+    """
+    Test the Shared_LRU_Cache methods.
+    """
+
+    def test_should_return_neg1_when_0_capacity_or_falsey_key_given(self):
+        """
+        Shared_LRU_Cache::set() and get() should return -1 when the capacity is 0 or a falsey key is given.
+        """
+        cache = Shared_LRU_Cache(0)
+        self.assertEqual(-1, cache.set(1, 1))
+        self.assertEqual(-1, cache.get(1))
+        cache.close()
+
+        cache = Shared_LRU_Cache(5)
+        for key in ('', None, False, [], {}):
+            self.assertEqual(-1, cache.set(key, 1))
+            self.assertEqual(-1, cache.get(key))
+        self.assertEqual(0, len(cache))
+        cache.close()
+
+    def test_set_should_return_neg1_when_entry_does_not_fit_a_slot(self):
+        """
+        Shared_LRU_Cache::set() should return -1 and not cache an entry larger than a slot.
+        """
+        cache = Shared_LRU_Cache(5, slot_size=64)
+        self.assertEqual(-1, cache.set('udacity', 'x' * 100))
+        self.assertEqual(-1, cache.get('udacity'))
+        cache.close()
+
+    def test_should_match_equal_numeric_keys(self):
+        """
+        Shared_LRU_Cache should treat 1, 1.0, and True as one key, as LRU_Cache does.
+        """
+        cache = Shared_LRU_Cache(5)
+        cache.set(1, 'a')
+        self.assertEqual('a', cache.get(1.0))
+        self.assertEqual('a', cache.get(True))
+
+        cache.set(2.0, 'b')
+        self.assertEqual('b', cache.get(2))
+        cache.set(2.5, 'c')
+        self.assertEqual('c', cache.get(2.5))
+        cache.set(float('inf'), 'd')
+        self.assertEqual('d', cache.get(float('inf')))
+        self.assertEqual(4, len(cache))
+        cache.close()
+
+    def test_should_match_LRU_Cache(self):
+        """
+        Shared_LRU_Cache should return the same results as LRU_Cache for the same operations.
+        """
+        for capacity in (1, 3, 20):
+            expected = LRU_Cache(capacity)
+            cache = Shared_LRU_Cache(capacity)
+            for i in range(3000):
+                key = (i * 7919) % (capacity * 3) + 1
+                if i % 3:
+                    self.assertEqual(expected.get(key), cache.get(key))
+                else:
+                    expected.set(key, {'i': i})
+                    cache.set(key, {'i': i})
+                self.assertEqual(len(expected), len(cache))
+            cache.close()
+
+    def test_clear_should_empty_the_cache(self):
+        """
+        Shared_LRU_Cache::clear() should empty the cache and leave it usable.
+        """
+        cache = Shared_LRU_Cache(2)
+        cache.set('udacity', 1)
+        cache.set('python', 2)
+        cache.clear()
+
+        self.assertEqual(0, len(cache))
+        self.assertEqual(-1, cache.get('udacity'))
+        cache.set(100, 'hello world')
+        self.assertEqual('hello world', cache.get(100))
+        cache.close()
+
+    def test_should_share_entries_across_processes(self):
+        """
+        Shared_LRU_Cache should make entries set in worker processes visible to every process.
+        """
+        context = multiprocessing.get_context()
+        cache = Shared_LRU_Cache(100, lock=context.Lock())
+        workers = [context.Process(target=fill_shared_cache, args=(cache, start)) for start in (1, 11, 21)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(30, len(cache))
+        for key in range(1, 31):
+            self.assertEqual(('value', key), cache.get(key))
+        cache.close()
+
+
+class Test_Cache_Policies(unittest.TestCase):
+    """
+    Test the eviction policies that share the LRU_Cache get/set API.
+    """
+
+    def test_make_cache_should_build_each_policy(self):
+        """
+        make_cache() should build the named policy and raise a ValueError for an unknown one.
+        """
+        self.assertIsInstance(make_cache('lru', 5), LRU_Cache)
+        self.assertIsInstance(make_cache('clock', 5), Clock_Cache)
+        self.assertIsInstance(make_cache('2q', 5), TwoQ_Cache)
+        self.assertIsInstance(make_cache('arc', 5), ARC_Cache)
+        self.assertIsInstance(make_cache('w-tinylfu', 5), WTinyLFU_Cache)
+        self.assertRaises(ValueError, make_cache, 'fifo', 5)
+
+    def test_should_return_neg1_when_0_capacity_or_falsey_key_given(self):
+        """
+        Each policy should return -1 when the capacity is 0 or a falsey key is given.
+        """
+        for policy in POLICIES:
+            cache = make_cache(policy, 0)
+            self.assertEqual(-1, cache.set(1, 1))
+            self.assertEqual(-1, cache.get(1))
+
+            cache = make_cache(policy, 5)
+            for key in ('', None, False, [], {}):
+                self.assertEqual(-1, cache.set(key, 1))
+                self.assertEqual(-1, cache.get(key))
+            self.assertEqual(0, len(cache))
+
+    def test_should_get_set_and_stay_within_capacity(self):
+        """
+        Each policy should return the latest value set for a cached key and never exceed its capacity.
+        """
+        for policy in POLICIES:
+            cache = make_cache(policy, 10)
+            values = dict()
+            for i in range(1000):
+                key = (i * 37) % 23 + 1
+                if i % 2:
+                    cache.set(key, i)
+                    values[key] = i
+                else:
+                    self.assertIn(cache.get(key), (-1, values.get(key)))
+                self.assertLessEqual(len(cache), 10)
+
+            cache.set('udacity', 1)
+            self.assertEqual(1, cache.get('udacity'))
+            cache.set('udacity', 2)
+            self.assertEqual(2, cache.get('udacity'))
+
+            cache.clear()
+            self.assertEqual(0, len(cache))
+            self.assertEqual(-1, cache.get('udacity'))
+
+    def test_should_resist_a_scan(self):
+        """
+        2Q, ARC, and W-TinyLFU should keep a hot set through a one-off scan that flushes LRU.
+        """
+        hot = list(range(1, 51))
+        kept = dict()
+        for policy in POLICIES:
+            cache = make_cache(policy, 100)
+
+            # Warm up with the hot set mixed with some cold keys, so that the cache is full.
+            for i in range(10):
+                cold = list(range(10000 + i * 30, 10030 + i * 30))
+                for key in hot + cold:
+                    if cache.get(key) == -1:
+                        cache.set(key, key)
+
+            for key in range(1000, 1500):
+                if cache.get(key) == -1:
+                    cache.set(key, key)
+
+            kept[policy] = sum(1 for key in hot if cache.get(key) != -1)
+
+        self.assertEqual(0, kept['lru'])
+        self.assertGreaterEqual(kept['2q'], 45)
+        self.assertGreaterEqual(kept['arc'], 45)
+        self.assertGreaterEqual(kept['w-tinylfu'], 45)
+
+    def test_clock_should_give_referenced_entries_a_second_chance(self):
+        """
+        Clock_Cache should only set the reference bit on a hit and evict the first unreferenced slot the hand finds.
+        """
+        cache = Clock_Cache(3)
+        for key in (1, 2, 3):
+            cache.set(key, key)
+
+        self.assertEqual(1, cache.get(1))
+        self.assertEqual(bytearray([1, 0, 0]), cache.referenced)
+
+        cache.set(4, 4)
+        self.assertEqual([1, 3, 4], sorted(cache.hashtable.keys()))
+        self.assertEqual(bytearray([0, 0, 0]), cache.referenced)
+
+        cache.set(5, 5)
+        cache.set(6, 6)
+        self.assertEqual([4, 5, 6], sorted(cache.hashtable.keys()))
+
+    def test_clock_should_match_lru_hit_ratio_on_a_skewed_trace(self):
+        """
+        Clock_Cache should come within a few points of LRU_Cache's hit ratio on a skewed trace.
+        """
+        hit_ratios = dict()
+        for policy in ('lru', 'clock'):
+            cache = make_cache(policy, 50)
+            hits = 0
+            for i in range(20000):
+                key = int(1000 ** ((i * 0.6180339887) % 1)) + 1
+                if cache.get(key) == -1:
+                    cache.set(key, key)
+                else:
+                    hits += 1
+            hit_ratios[policy] = hits / 20000
+
+        self.assertAlmostEqual(hit_ratios['lru'], hit_ratios['clock'], delta=0.03)
+
+    def test_2q_should_promote_keys_remembered_in_a1out(self):
+        """
+        TwoQ_Cache should move keys pushed out of A1in to A1out and admit them into Am when set again.
+        """
+        cache = TwoQ_Cache(4)
+        for key in (1, 2, 3, 4, 5):
+            cache.set(key, key)
+
+        self.assertTrue(1 in cache.a1out_table)
+        self.assertEqual(-1, cache.get(1))
+
+        cache.set(1, 10)
+        self.assertTrue(1 in cache.am_table)
+        self.assertEqual(10, cache.get(1))
+
+    def test_arc_should_adapt_on_ghost_hits(self):
+        """
+        ARC_Cache should grow T1's target on a B1 hit and shrink it on a B2 hit.
+        """
+        cache = ARC_Cache(2)
+        cache.set(1, 1)
+        cache.get(1)
+        cache.set(2, 2)
+        cache.set(3, 3)
+        self.assertTrue(2 in cache.b1_table)
+        self.assertEqual(0, cache.p)
+
+        cache.set(2, 2)
+        self.assertEqual(1, cache.p)
+        self.assertTrue(2 in cache.t2_table)
+        self.assertTrue(1 in cache.b2_table)
+
+        cache.set(1, 1)
+        self.assertEqual(0, cache.p)
+        self.assertTrue(1 in cache.t2_table)
+
+    def test_w_tinylfu_should_reject_infrequent_candidates(self):
+        """
+        WTinyLFU_Cache should only admit a window candidate that is more frequent than the main victim.
+        """
+        cache = WTinyLFU_Cache(10)
+        for _ in range(3):
+            for key in range(1, 10):
+                if cache.get(key) == -1:
+                    cache.set(key, key)
+
+        cache.set(100, 100)
+        cache.set(101, 101)
+        self.assertEqual(-1, cache.get(100))
+        self.assertEqual(9, sum(1 for key in range(1, 10) if cache.get(key) != -1))
+
+
+class Test_CountMinSketch(unittest.TestCase):
+    """
+    Test the CountMinSketch methods.
+    """
+
+    def test_frequency_should_estimate_counts(self):
+        """
+        CountMinSketch::frequency() should never underestimate a count below the cap of 15.
+        """
+        sketch = CountMinSketch(64)
+        for key in range(1, 33):
+            for _ in range(key % 10):
+                sketch.increment(key)
+
+        for key in range(1, 33):
+            self.assertGreaterEqual(sketch.frequency(key), key % 10)
+
+        for _ in range(20):
+            sketch.increment('udacity')
+        self.assertEqual(15, sketch.frequency('udacity'))
+
+    def test_increment_should_age_the_counters(self):
+        """
+        CountMinSketch::increment() should halve every counter once the sample size is reached.
+        """
+        sketch = CountMinSketch(16)
+        for _ in range(8):
+            sketch.increment('udacity')
+        self.assertEqual(8, sketch.frequency('udacity'))
+
+        for i in range(sketch.sample_size - sketch.additions):
+            sketch.increment(('filler', i))
+
+        self.assertLessEqual(sketch.frequency('udacity'), 7)
+        self.assertEqual(sketch.sample_size // 2, sketch.additions)
+
+
+class Test_Memoize(unittest.TestCase):
+    """
+    Test the memoize() decorator.
+    """
+
+    def test_should_cache_results_by_arguments(self):
+        """
+        memoize() should compute each distinct call once and cache the result, including -1 and no-argument calls.
+        """
+        calls = []
+
+        @memoize(capacity=10)
+        def compute(*args, **kwargs):
+            calls.append((args, kwargs))
+            return -1 if not args else sum(args) + sum(kwargs.values())
+
+        self.assertEqual(-1, compute())
+        self.assertEqual(-1, compute())
+        self.assertEqual(3, compute(1, 2))
+        self.assertEqual(3, compute(1, 2))
+        self.assertEqual(6, compute(1, b=2, c=3))
+        self.assertEqual(6, compute(1, c=3, b=2))
+        self.assertEqual(3, len(calls))
+
+        compute.cache_clear()
+        compute(1, 2)
+        self.assertEqual(4, len(calls))
+
+    def test_should_run_one_computation_per_key_for_threads(self):
+        """
+        memoize() should run one computation per key while concurrent threads wait for its result.
+        """
+        calls = []
+
+        @memoize()
+        def slow(key):
+            calls.append(key)
+            time.sleep(0.05)
+            return key * 2
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow(21))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([21], calls)
+        self.assertEqual([42] * 8, results)
+
+    def test_should_share_and_not_cache_exceptions(self):
+        """
+        memoize() should raise the leader's exception in every waiter and not cache it.
+        """
+        calls = []
+
+        @memoize()
+        def fails(key):
+            calls.append(key)
+            time.sleep(0.05)
+            raise ValueError(key)
+
+        errors = []
+
+        def call():
+            try:
+                fails('udacity')
+            except ValueError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual(4, len(errors))
+        self.assertRaises(ValueError, fails, 'udacity')
+        self.assertEqual(2, len(calls))
+
+    def test_should_run_one_computation_per_key_for_coroutines(self):
+        """
+        memoize() should run one coroutine per key while concurrent awaiters wait for its result.
+        """
+        calls = []
+
+        @memoize()
+        async def slow(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return key * 2
+
+        async def run():
+            results = await asyncio.gather(*(slow(21) for _ in range(8)), slow(1))
+            results.append(await slow(21))
+            return results
+
+        self.assertEqual([42] * 8 + [2, 42], asyncio.run(run()))
+        self.assertEqual([21, 1], calls)
+
+    def test_cancelled_awaiter_should_not_cancel_the_computation(self):
+        """
+        memoize() should keep computing for the other awaiters when one of them is cancelled.
+        """
+        @memoize()
+        async def slow(key):
+            await asyncio.sleep(0.02)
+            return key
+
+        async def run():
+            first = asyncio.ensure_future(slow('udacity'))
+            second = asyncio.ensure_future(slow('udacity'))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertEqual('udacity', asyncio.run(run()))
+
 
 if __name__ == '__main__':
     unittest.main()
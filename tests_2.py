@@ -1,7 +1,18 @@
 #!/usr/bin/env python3
 
+import asyncio
+import inspect
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
 import unittest
-from problem_2 import find_files
+from concurrent.futures import ThreadPoolExecutor
+from problem_2 import FileRecord, File_Index, File_Watcher, Find_Files_Cache, Pattern_Matcher, afind_files, \
+    find_files, find_files_multi, iter_files, iter_files_parallel, search_files, watch_files
 
 
 class Test_FindFiles(unittest.TestCase):
@@ -129,5 +140,944 @@ class Test_FindFiles(unittest.TestCase):
         actual = find_files('_2.md', '.')
         self.assertListEqual(expected, actual)
 
+
+class Test_IterFiles(unittest.TestCase):
+
+    def test_should_be_a_generator(self):
+        """
+        Test iter_files() should lazily yield the files.
+        """
+        files = iter_files('.c', './fixtures/problem_2')
+        self.assertTrue(inspect.isgenerator(files))
+        self.assertTrue(next(files).endswith('.c'))
+
+    def test_should_yield_nothing_when_no_path_given(self):
+        """
+        Test iter_files() should yield nothing when no path is given.
+        """
+        self.assertListEqual([], list(iter_files('', '')))
+        self.assertListEqual([], list(iter_files('.c', None)))
+        self.assertListEqual([], list(iter_files('.c', False)))
+
+    def test_should_yield_the_same_files_as_find_files(self):
+        """
+        Test iter_files() should yield the same files as find_files().
+        """
+        for suffix in ('', 'c', '.h', 'keep', '.py'):
+            expected = sorted(find_files(suffix, './fixtures/problem_2'))
+            actual = sorted(iter_files(suffix, './fixtures/problem_2'))
+            self.assertListEqual(expected, actual)
+
+    def test_should_walk_trees_deeper_than_the_recursion_limit(self):
+        """
+        Test iter_files() should walk a tree that is deeper than the recursion limit.
+        """
+        root = tempfile.mkdtemp()
+        path = root
+        for _ in range(sys.getrecursionlimit() + 10):
+            path = os.path.join(path, 'd')
+            os.mkdir(path)
+        expected = os.path.join(path, 'deep.c')
+        open(expected, 'w').close()
+
+        try:
+            self.assertListEqual([expected], list(iter_files('.c', root)))
+            self.assertListEqual([expected], find_files('.c', root))
+        finally:
+            # shutil.rmtree() recurses, so remove the chain from the bottom up.
+            os.remove(expected)
+            while path != root:
+                os.rmdir(path)
+                path = os.path.dirname(path)
+            os.rmdir(root)
+
+
+class Test_IterFilesPruning(unittest.TestCase):
+
+    def test_exclude_should_skip_the_matching_subtrees(self):
+        """
+        Test iter_files() should not descend into the directories that match an exclude pattern.
+        """
+        self.assertListEqual([
+            './fixtures/problem_2/testdir/subdir1/a.c',
+            './fixtures/problem_2/testdir/subdir5/a.c',
+            './fixtures/problem_2/testdir/t1.c',
+        ], sorted(iter_files('.c', './fixtures/problem_2', exclude=['subdir3'])))
+
+        self.assertListEqual([
+            './fixtures/problem_2/testdir/subdir5/a.c',
+            './fixtures/problem_2/testdir/t1.c',
+        ], sorted(find_files('.c', './fixtures/problem_2', exclude=['subdir[1-3]'])))
+
+        self.assertListEqual([], find_files('.c', './fixtures/problem_2', exclude=['test*', 'other']))
+
+    def test_exclude_should_take_a_single_pattern_as_a_string(self):
+        """
+        Test iter_files() should treat an exclude string as one pattern rather than one pattern per character.
+        """
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, '.git'))
+            os.makedirs(os.path.join(root, 'g'))
+            open(os.path.join(root, '.git', 'x.c'), 'w').close()
+            open(os.path.join(root, 'g', 'y.c'), 'w').close()
+
+            self.assertListEqual([os.path.join(root, 'g', 'y.c')], list(iter_files('.c', root, exclude='.git')))
+
+    def test_max_depth_should_limit_the_levels_descended(self):
+        """
+        Test iter_files() should not descend more than max_depth levels beneath the path.
+        """
+        self.assertListEqual([], list(iter_files('.c', './fixtures/problem_2', max_depth=0)))
+        self.assertListEqual(['./fixtures/problem_2/testdir/t1.c'],
+                             list(iter_files('.c', './fixtures/problem_2', max_depth=1)))
+        self.assertListEqual([
+            './fixtures/problem_2/testdir/subdir1/a.c',
+            './fixtures/problem_2/testdir/subdir5/a.c',
+            './fixtures/problem_2/testdir/t1.c',
+        ], sorted(find_files('.c', './fixtures/problem_2', max_depth=2)))
+        self.assertListEqual(sorted(find_files('.c', './fixtures/problem_2')),
+                             sorted(find_files('.c', './fixtures/problem_2', max_depth=3)))
+
+    def test_should_not_loop_on_symlink_cycles(self):
+        """
+        Test iter_files() should visit each directory once when a symbolic link points back to an ancestor.
+        """
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, 'a', 'b'))
+            open(os.path.join(root, 'a', 'b', 'b.c'), 'w').close()
+            os.symlink(root, os.path.join(root, 'a', 'b', 'loop'))
+            os.symlink(os.path.join(root, 'a'), os.path.join(root, 'alias'))
+
+            # The alias and the directory it links to are one directory, reached by whichever is listed first.
+            files = list(iter_files('.c', root))
+            self.assertEqual(1, len(files))
+            self.assertIn(files[0], (os.path.join(root, 'a', 'b', 'b.c'), os.path.join(root, 'alias', 'b', 'b.c')))
+            self.assertListEqual([os.path.join(root, 'a', 'b', 'b.c')],
+                                 list(iter_files('.c', root, follow_symlinks=False)))
+
+    def test_follow_symlinks_should_control_descending_into_links(self):
+        """
+        Test iter_files() should only descend into symbolic links to directories when following them.
+        """
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, 'outside'))
+            os.makedirs(os.path.join(root, 'tree'))
+            open(os.path.join(root, 'outside', 'o.c'), 'w').close()
+            os.symlink(os.path.join(root, 'outside'), os.path.join(root, 'tree', 'link'))
+
+            tree = os.path.join(root, 'tree')
+            self.assertListEqual([os.path.join(tree, 'link', 'o.c')], find_files('.c', tree))
+            self.assertListEqual([], find_files('.c', tree, follow_symlinks=False))
+
+    def test_should_raise_when_pruning_with_workers(self):
+        """
+        Test find_files() should raise a ValueError when pruning options are given with workers.
+        """
+        self.assertRaises(ValueError, find_files, '.c', './fixtures/problem_2', workers=4, max_depth=1)
+        self.assertRaises(ValueError, find_files, '.c', './fixtures/problem_2', workers=4, exclude=['subdir1'])
+
+
+class Test_IterFilesStats(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        os.mkdir(os.path.join(self.root, 'sub'))
+        self.now = time.time()
+        for name, size, age in (('small.c', 10, 0), ('medium.c', 100, 3600), (os.path.join('sub', 'large.c'), 1000, 0),
+                                ('large.h', 1000, 7200)):
+            path = os.path.join(self.root, name)
+            with open(path, 'wb') as file:
+                file.write(b'x' * size)
+            os.utime(path, (self.now - age, self.now - age))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_stats_should_return_the_records_of_the_files(self):
+        """
+        Test iter_files() should yield the FileRecord of each file when stats is set.
+        """
+        records = sorted(iter_files('.c', self.root, stats=True))
+        self.assertListEqual(sorted(iter_files('.c', self.root)), [record.path for record in records])
+        for record in records:
+            self.assertIsInstance(record, FileRecord)
+            stat = os.stat(record.path)
+            self.assertEqual(FileRecord(record.path, stat.st_size, stat.st_mtime, stat.st_ino), record)
+
+        self.assertEqual([10, 100, 1000], sorted(record.size for record in find_files('.c', self.root, stats=True)))
+
+    def test_should_filter_by_size(self):
+        """
+        Test iter_files() should only find the files within the min_size and max_size.
+        """
+        self.assertListEqual([os.path.join(self.root, 'medium.c'), os.path.join(self.root, 'sub', 'large.c')],
+                             sorted(iter_files('.c', self.root, min_size=100)))
+        self.assertListEqual([os.path.join(self.root, 'medium.c'), os.path.join(self.root, 'small.c')],
+                             sorted(iter_files('.c', self.root, max_size=100)))
+        self.assertListEqual([os.path.join(self.root, 'medium.c')],
+                             find_files('.c', self.root, min_size=11, max_size=999))
+        self.assertListEqual([1000, 1000], [record.size for record in iter_files('', self.root, stats=True,
+                                                                                  min_size=1000)])
+
+    def test_should_filter_by_modification_time(self):
+        """
+        Test iter_files() should only find the files modified since the given time.
+        """
+        self.assertListEqual([os.path.join(self.root, 'small.c'), os.path.join(self.root, 'sub', 'large.c')],
+                             sorted(iter_files('.c', self.root, modified_since=self.now - 60)))
+        self.assertListEqual(sorted(find_files('', self.root)),
+                             sorted(find_files('', self.root, modified_since=self.now - 7300)))
+        self.assertListEqual([os.path.join(self.root, 'medium.c')],
+                             find_files('', self.root, max_size=999, modified_since=self.now - 4000, min_size=50))
+
+    def test_should_raise_when_given_stats_with_workers(self):
+        """
+        Test find_files() should raise a ValueError when stats or stat filters are given with workers.
+        """
+        self.assertRaises(ValueError, find_files, '.c', self.root, workers=4, stats=True)
+        self.assertRaises(ValueError, find_files, '.c', self.root, workers=4, min_size=0)
+
+
+class Test_IterFilesParallel(unittest.TestCase):
+
+    def test_should_yield_nothing_when_no_path_given(self):
+        """
+        Test iter_files_parallel() should yield nothing when no path is given.
+        """
+        self.assertListEqual([], list(iter_files_parallel('', '')))
+        self.assertListEqual([], list(iter_files_parallel('.c', None)))
+        self.assertListEqual([], find_files('.c', '', workers=4))
+
+    def test_ordered_should_yield_in_the_serial_order(self):
+        """
+        Test iter_files_parallel() in ordered mode should yield the files in the same order as iter_files().
+        """
+        for workers in (1, 2, 8):
+            for suffix in ('', '.c', '.h'):
+                expected = list(iter_files(suffix, './fixtures/problem_2'))
+                self.assertListEqual(expected, list(iter_files_parallel(suffix, './fixtures/problem_2', workers, True)))
+                self.assertListEqual(expected, find_files(suffix, './fixtures/problem_2', workers=workers))
+
+    def test_unordered_should_yield_all_files(self):
+        """
+        Test iter_files_parallel() in unordered mode should yield every file once.
+        """
+        for workers in (1, 2, 8):
+            for suffix in ('', '.c', 'keep'):
+                expected = sorted(iter_files(suffix, './fixtures/problem_2'))
+                self.assertListEqual(expected, sorted(iter_files_parallel(suffix, './fixtures/problem_2', workers)))
+
+    def test_should_walk_a_wide_and_deep_tree(self):
+        """
+        Test iter_files_parallel() should find the same files as iter_files() on a larger tree.
+        """
+        with tempfile.TemporaryDirectory() as root:
+            for i in range(200):
+                path = os.path.join(root, 'dir{}'.format(i), *['sub'] * (i % 5))
+                os.makedirs(path)
+                for j in range(5):
+                    open(os.path.join(path, 'file{}.{}'.format(j, 'c' if j % 2 else 'h')), 'w').close()
+
+            expected = list(iter_files('.c', root))
+            self.assertEqual(400, len(expected))
+            self.assertListEqual(expected, list(iter_files_parallel('.c', root, 4, ordered=True)))
+            self.assertListEqual(sorted(expected), sorted(iter_files_parallel('.c', root, 4)))
+
+    def test_should_raise_when_the_path_cannot_be_read(self):
+        """
+        Test iter_files_parallel() should raise the error from reading a directory.
+        """
+        for ordered in (True, False):
+            with self.assertRaises(FileNotFoundError):
+                list(iter_files_parallel('.c', './fixtures/problem_2/missing', 4, ordered))
+
+    def test_should_stop_the_threads_when_closed_early(self):
+        """
+        Test iter_files_parallel() should stop its threads when the consumer stops early.
+        """
+        threads = threading.active_count()
+        for ordered in (True, False):
+            files = iter_files_parallel('', './fixtures/problem_2', 4, ordered)
+            next(files)
+            files.close()
+            self.assertEqual(threads, threading.active_count())
+
+
+class Counting_Executor(ThreadPoolExecutor):
+    """Thread pool that counts the directory reads submitted to it."""
+
+    def __init__(self, max_workers):
+        super().__init__(max_workers)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+class Test_AFindFiles(unittest.TestCase):
+
+    def test_should_yield_nothing_when_no_path_given(self):
+        """
+        Test afind_files() should yield nothing when no path is given.
+        """
+        self.assertListEqual([], asyncio.run(self._collect('', '')))
+        self.assertListEqual([], asyncio.run(self._collect('.c', None)))
+
+    def test_should_yield_the_same_files_as_find_files(self):
+        """
+        Test afind_files() should yield the same files as find_files().
+        """
+        for suffix in ('', 'c', '.h', 'keep'):
+            for workers in (1, 4):
+                expected = sorted(find_files(suffix, './fixtures/problem_2'))
+                actual = sorted(asyncio.run(self._collect(suffix, './fixtures/problem_2', workers)))
+                self.assertListEqual(expected, actual)
+
+    def test_should_not_block_the_event_loop(self):
+        """
+        Test afind_files() should let other coroutines run while it walks.
+        """
+        async def walk_and_tick():
+            ticks = []
+
+            async def ticker():
+                while True:
+                    ticks.append(None)
+                    await asyncio.sleep(0)
+
+            task = asyncio.create_task(ticker())
+            files = await self._collect('', './fixtures/problem_2')
+            task.cancel()
+            return files, len(ticks)
+
+        files, ticks = asyncio.run(walk_and_tick())
+        self.assertEqual(10, len(files))
+        self.assertGreater(ticks, 0)
+
+    def test_should_only_read_ahead_while_the_consumer_pulls(self):
+        """
+        Test afind_files() should not keep reading directories while the consumer is not pulling.
+        """
+        async def first_file(root, executor):
+            files = afind_files('.c', root, workers=2, executor=executor)
+            first = await files.__anext__()
+            await asyncio.sleep(0.05)
+            await files.aclose()
+            return first
+
+        with tempfile.TemporaryDirectory() as root:
+            for i in range(100):
+                os.mkdir(os.path.join(root, 'dir{}'.format(i)))
+                open(os.path.join(root, 'dir{}'.format(i), 'file.c'), 'w').close()
+
+            with Counting_Executor(2) as executor:
+                self.assertTrue(asyncio.run(first_file(root, executor)).endswith('file.c'))
+                self.assertLessEqual(executor.submitted, 3)
+
+    def test_should_stop_when_cancelled(self):
+        """
+        Test afind_files() should stop walking when its task is cancelled.
+        """
+        async def cancel_walk():
+            started = asyncio.Event()
+
+            async def consume():
+                async for _ in afind_files('', './fixtures/problem_2', workers=2):
+                    started.set()
+                    await asyncio.sleep(10)
+
+            task = asyncio.create_task(consume())
+            await started.wait()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_walk())
+
+    """
+    Helpers.
+    """
+
+    async def _collect(self, suffix, path, workers=4):
+        """Helper function to collect the files afind_files() yields."""
+        return [file async for file in afind_files(suffix, path, workers)]
+
+
+class Test_FindFilesMulti(unittest.TestCase):
+
+    def test_should_return_empty_lists_when_no_path_given(self):
+        """
+        Test find_files_multi() should return an empty list for each pattern when no path is given.
+        """
+        self.assertDictEqual({'.c': [], '.h': []}, find_files_multi(['.c', '.h'], ''))
+        self.assertDictEqual({'.c': []}, find_files_multi(['.c'], None))
+        self.assertDictEqual({}, find_files_multi([], './fixtures/problem_2'))
+
+    def test_suffixes_should_match_like_find_files(self):
+        """
+        Test find_files_multi() should group the same files find_files() finds for each suffix.
+        """
+        suffixes = ['', 'c', '.c', '.h', 'keep', '1.c', '.py']
+        actual = find_files_multi(suffixes, './fixtures/problem_2')
+        self.assertListEqual(suffixes, list(actual))
+        for suffix in suffixes:
+            self.assertListEqual(find_files(suffix, './fixtures/problem_2'), actual[suffix])
+
+    def test_globs_should_match_the_whole_file_name(self):
+        """
+        Test find_files_multi() should match the glob patterns against the whole file name.
+        """
+        actual = find_files_multi(['*.h', 'a.?', 'b.[ch]', '.git*', 't?'], './fixtures/problem_2')
+        self.assertListEqual(find_files('.h', './fixtures/problem_2'), actual['*.h'])
+        self.assertListEqual([
+            './fixtures/problem_2/testdir/subdir1/a.c',
+            './fixtures/problem_2/testdir/subdir1/a.h',
+            './fixtures/problem_2/testdir/subdir5/a.c',
+            './fixtures/problem_2/testdir/subdir5/a.h',
+        ], sorted(actual['a.?']))
+        self.assertListEqual([
+            './fixtures/problem_2/testdir/subdir3/subsubdir1/b.c',
+            './fixtures/problem_2/testdir/subdir3/subsubdir1/b.h',
+        ], sorted(actual['b.[ch]']))
+        self.assertListEqual(find_files('.gitkeep', './fixtures/problem_2'), actual['.git*'])
+        self.assertListEqual([], actual['t?'])
+
+    def test_matcher_should_return_every_matching_pattern(self):
+        """
+        Test Pattern_Matcher::match() should return every pattern that matches, once.
+        """
+        matcher = Pattern_Matcher(['.c', '*.c', 'c', '.c', 'test_*.py', '*.py', '.h', '[ab].h'])
+        self.assertCountEqual(['.c', '*.c', 'c'], matcher.match('a.c'))
+        self.assertCountEqual(['*.py', 'test_*.py'], matcher.match('test_a.py'))
+        self.assertListEqual(['*.py'], matcher.match('a.py'))
+        self.assertListEqual(['.h', '[ab].h'], matcher.match('a.h'))
+        self.assertListEqual(['.h'], matcher.match('c.h'))
+        self.assertListEqual([], matcher.match('a.cpp'))
+
+
+class Test_File_Index(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.directory.name, 'tree')
+        self.index_path = os.path.join(self.directory.name, 'tree.index')
+        for path in ('a', 'b', os.path.join('b', 'c')):
+            os.makedirs(os.path.join(self.root, path))
+        for path in ('t1.c', 't1.h', os.path.join('a', 'a.c'), os.path.join('b', 'c', 'b.c')):
+            open(os.path.join(self.root, path), 'w').close()
+        self._age_directories()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_should_answer_suffix_queries_like_find_files(self):
+        """
+        Test File_Index::find_files() should return the same files as find_files().
+        """
+        index = File_Index(self.root, self.index_path)
+        self.assertTrue(os.path.isfile(self.index_path))
+        for suffix in ('', None, 'c', '.c', '.h', '1.c', 'b.c', 'missing', os.path.join('c', 'b.c')):
+            self.assertListEqual(sorted(find_files(suffix, self.root)), index.find_files(suffix))
+
+    def test_refresh_should_only_list_changed_directories(self):
+        """
+        Test File_Index::refresh() should only list the directories whose mtime changed.
+        """
+        index = File_Index(self.root, self.index_path)
+        self.assertEqual(0, index.refresh())
+
+        open(os.path.join(self.root, 'b', 'c', 'new.c'), 'w').close()
+        os.remove(os.path.join(self.root, 'a', 'a.c'))
+        self.assertEqual(2, index.refresh())
+        self.assertListEqual(sorted(find_files('.c', self.root)), index.find_files('.c'))
+        self.assertIn(os.path.join(self.root, 'b', 'c', 'new.c'), index.find_files('.c'))
+
+    def test_refresh_should_drop_removed_directories(self):
+        """
+        Test File_Index::refresh() should drop the files of a removed directory.
+        """
+        index = File_Index(self.root, self.index_path)
+        os.remove(os.path.join(self.root, 'b', 'c', 'b.c'))
+        os.rmdir(os.path.join(self.root, 'b', 'c'))
+
+        index.refresh()
+        self.assertListEqual(sorted(find_files('', self.root)), index.find_files(''))
+        self.assertNotIn(os.path.join(self.root, 'b', 'c'), index.directories)
+
+    def test_should_load_a_saved_index(self):
+        """
+        Test File_Index should load the saved index instead of walking the tree again.
+        """
+        File_Index(self.root, self.index_path)
+        open(os.path.join(self.root, 'unseen.c'), 'w').close()
+
+        index = File_Index(self.root, self.index_path)
+        self.assertNotIn(os.path.join(self.root, 'unseen.c'), index.find_files('.c'))
+        self.assertEqual(1, index.refresh())
+        self.assertIn(os.path.join(self.root, 'unseen.c'), index.find_files('.c'))
+
+    def test_should_rebuild_a_corrupt_or_foreign_index(self):
+        """
+        Test File_Index should rebuild the index when it is corrupt or for another root.
+        """
+        expected = sorted(find_files('.c', self.root))
+        for contents in (b'', b'not an index', b'\x80\x05'):
+            with open(self.index_path, 'wb') as index_file:
+                index_file.write(contents)
+            self.assertListEqual(expected, File_Index(self.root, self.index_path).find_files('.c'))
+
+        File_Index(os.path.join(self.root, 'a'), self.index_path)
+        self.assertListEqual(expected, File_Index(self.root, self.index_path).find_files('.c'))
+
+    def test_should_not_run_code_from_the_index_file(self):
+        """
+        Test File_Index should rebuild, without unpickling, an index file holding a pickle or malformed JSON.
+        """
+        marker = os.path.join(self.directory.name, 'ran')
+
+        class Payload:
+            def __reduce__(self):
+                return open, (marker, 'w')
+
+        expected = sorted(find_files('.c', self.root))
+        malformed = [{'version': File_Index.VERSION, 'root': self.root, 'directories': directories}
+                     for directories in ([], {self.root: [0, [1], []]}, {self.root: [0.5, [], []]}, {self.root: [0]})]
+        for contents in [pickle.dumps(Payload())] + [json.dumps(index).encode() for index in malformed]:
+            with open(self.index_path, 'wb') as index_file:
+                index_file.write(contents)
+            self.assertListEqual(expected, File_Index(self.root, self.index_path).find_files('.c'))
+        self.assertFalse(os.path.exists(marker))
+
+    """
+    Helpers.
+    """
+
+    def _age_directories(self):
+        """Helper function to move the directory mtimes out of the racy window, so the index trusts them."""
+        past = time.time() - 60
+        for path, _, _ in os.walk(self.root):
+            os.utime(path, (past, past))
+
+
+class Test_Find_Files_Cache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        for path in ('a', os.path.join('a', 'b')):
+            os.makedirs(os.path.join(self.root, path))
+        for path in ('t1.c', 't1.h', os.path.join('a', 'a.c'), os.path.join('a', 'b', 'b.c')):
+            open(os.path.join(self.root, path), 'w').close()
+        self.past = time.time() - 60
+        for path, _, _ in os.walk(self.root):
+            os.utime(path, (self.past, self.past))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_should_return_the_same_files_as_find_files(self):
+        """
+        Test Find_Files_Cache::find_files() should return what find_files() returns, for any spelling of the path.
+        """
+        cache = Find_Files_Cache()
+        for path in ('./fixtures/problem_2', 'fixtures/problem_2/', self.root, self.root + os.sep):
+            for suffix in ('', None, '.c', '.h', 'missing'):
+                for _ in range(2):
+                    self.assertListEqual(find_files(suffix, path), cache.find_files(suffix, path))
+        self.assertListEqual([], cache.find_files('.c', ''))
+
+    def test_should_relist_the_changed_directories(self):
+        """
+        Test Find_Files_Cache::find_files() should see the files added and removed since the last query.
+        """
+        cache = Find_Files_Cache()
+        self.assertEqual(3, len(cache.find_files('.c', self.root)))
+
+        open(os.path.join(self.root, 'a', 'b', 'new.c'), 'w').close()
+        os.remove(os.path.join(self.root, 't1.c'))
+        self.assertListEqual(sorted(find_files('.c', self.root)), sorted(cache.find_files('.c', self.root)))
+        self.assertIn(os.path.join(self.root, 'a', 'b', 'new.c'), cache.find_files('.c', self.root))
+
+    def test_should_return_a_copy_of_the_cached_result(self):
+        """
+        Test Find_Files_Cache::find_files() should not let the caller change the cached result.
+        """
+        cache = Find_Files_Cache()
+        cache.find_files('.c', self.root).clear()
+        self.assertEqual(3, len(cache.find_files('.c', self.root)))
+
+    def test_invalidate_should_drop_the_cached_listings(self):
+        """
+        Test Find_Files_Cache::invalidate() should make the next query list the directories again.
+        """
+        cache = Find_Files_Cache()
+        cache.find_files('.c', self.root)
+
+        # A change that keeps the directory's mtime is invisible until the listing is invalidated.
+        directory = os.path.join(self.root, 'a', 'b')
+        open(os.path.join(directory, 'hidden.c'), 'w').close()
+        os.utime(directory, (self.past, self.past))
+        self.assertEqual(3, len(cache.find_files('.c', self.root)))
+
+        cache.invalidate(os.path.join(self.root, 'a'))
+        self.assertEqual(4, len(cache.find_files('.c', self.root)))
+
+        open(os.path.join(directory, 'hidden2.c'), 'w').close()
+        os.utime(directory, (self.past, self.past))
+        cache.invalidate()
+        self.assertEqual(0, len(cache.cache))
+        self.assertEqual(5, len(cache.find_files('.c', self.root)))
+
+    def test_invalidate_should_only_touch_the_trees_holding_the_path(self):
+        """
+        Test Find_Files_Cache::invalidate() should keep the other trees' results, and weigh the trimmed tree again.
+        """
+        cache = Find_Files_Cache()
+        other = os.path.join(self.root, 'a')
+        cache.find_files('.c', self.root)
+        cache.find_files('.c', other)
+        with tempfile.TemporaryDirectory() as outside:
+            cache.find_files('.c', outside)
+
+            # The subdirectory b is in both trees; the unrelated tree is left alone.
+            cache.invalidate(os.path.join(other, 'b'))
+            self.assertEqual(1, len(cache.cache.get(outside)[1]))
+            for root in (self.root, other):
+                listings, results = cache.cache.get(root)
+                self.assertDictEqual({}, results)
+                self.assertNotIn(os.path.join(other, 'b'), listings)
+            self.assertEqual(sum(Find_Files_Cache._weigh(root, cache.cache.get(root)) for root in cache.roots),
+                             cache.cache.total_weight)
+
+            # A tree beneath the path loses all of its listings.
+            cache.invalidate(self.root)
+            self.assertDictEqual({}, cache.cache.get(other)[0])
+            self.assertEqual(1, len(cache.cache.get(outside)[1]))
+        self.assertEqual(2, len(cache.find_files('.c', other)))
+
+    def test_should_raise_once_the_root_is_removed(self):
+        """
+        Test Find_Files_Cache::find_files() should drop the tree and raise like find_files() once the root is gone.
+        """
+        cache = Find_Files_Cache()
+        root = os.path.join(self.root, 'a')
+        self.assertEqual(2, len(cache.find_files('.c', root)))
+
+        for path in (os.path.join(root, 'b', 'b.c'), os.path.join(root, 'a.c')):
+            os.remove(path)
+        os.rmdir(os.path.join(root, 'b'))
+        os.rmdir(root)
+        self.assertRaises(FileNotFoundError, find_files, '.c', root)
+        self.assertRaises(FileNotFoundError, cache.find_files, '.c', root)
+        self.assertEqual(0, len(cache.cache))
+        self.assertSetEqual(set(), cache.roots)
+
+    def test_should_stay_within_the_memory_budget(self):
+        """
+        Test Find_Files_Cache should evict the LRU trees to stay within its memory budget and capacity.
+        """
+        cache = Find_Files_Cache(max_bytes=100)
+        self.assertEqual(3, len(cache.find_files('.c', self.root)))
+        self.assertEqual(0, len(cache.cache))
+
+        cache = Find_Files_Cache(capacity=1)
+        cache.find_files('.c', self.root)
+        cache.find_files('.c', './fixtures/problem_2')
+        self.assertEqual(1, len(cache.cache))
+        self.assertEqual(-1, cache.cache.get(self.root))
+
+
+class Test_SymlinkCycles(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        os.makedirs(os.path.join(self.root, 'a'))
+        open(os.path.join(self.root, 'a', 'b.c'), 'w').close()
+        os.symlink('..', os.path.join(self.root, 'a', 'up'))
+        self.expected = [os.path.join(self.root, 'a', 'b.c')]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_find_files_with_workers_should_not_loop(self):
+        """
+        Test find_files() with workers should visit each directory once when a symbolic link points back to an ancestor.
+        """
+        self.assertListEqual(self.expected, find_files('.c', self.root, workers=2))
+
+    def test_iter_files_parallel_should_not_loop(self):
+        """
+        Test iter_files_parallel() should visit each directory once when a symbolic link points back to an ancestor.
+        """
+        self.assertListEqual(self.expected, list(iter_files_parallel('.c', self.root, workers=2)))
+        self.assertListEqual(self.expected, list(iter_files_parallel('.c', self.root, workers=2, ordered=True)))
+
+    def test_afind_files_should_not_loop(self):
+        """
+        Test afind_files() should visit each directory once when a symbolic link points back to an ancestor.
+        """
+        async def collect():
+            return [path async for path in afind_files('.c', self.root, workers=2)]
+
+        self.assertListEqual(self.expected, asyncio.run(collect()))
+
+    def test_find_files_multi_should_not_loop(self):
+        """
+        Test find_files_multi() should visit each directory once when a symbolic link points back to an ancestor.
+        """
+        self.assertDictEqual({'*.c': self.expected}, find_files_multi(['*.c'], self.root))
+
+    def test_file_index_should_not_loop(self):
+        """
+        Test File_Index should index each directory once when a symbolic link points back to an ancestor.
+        """
+        index = File_Index(self.root, os.path.join(self.root, 'tree.index'))
+        self.assertListEqual(self.expected, index.find_files('.c'))
+
+    def test_find_files_cache_should_not_loop(self):
+        """
+        Test Find_Files_Cache should list each directory once when a symbolic link points back to an ancestor.
+        """
+        self.assertListEqual(self.expected, Find_Files_Cache().find_files('.c', self.root))
+
+
+class Test_SearchFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        os.mkdir(os.path.join(self.root, 'sub'))
+        self._write('a.c', b'int main() {\n    return 0;\n}\n// return return\n')
+        self._write(os.path.join('sub', 'b.c'), b'static int x;\nint y;\nreturn')
+        self._write('binary.c', b'return\x00\x01\x02\nreturn\n')
+        self._write('empty.c', b'')
+        self._write('notes.h', b'return\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_should_return_each_matching_line_once(self):
+        """
+        Test search_files() should return the path, line number, and line of each line with a match, once.
+        """
+        actual = sorted(search_files('.c', self.root, b'return', literal=True))
+        self.assertListEqual([
+            (os.path.join(self.root, 'a.c'), 2, b'    return 0;'),
+            (os.path.join(self.root, 'a.c'), 4, b'// return return'),
+            (os.path.join(self.root, 'sub', 'b.c'), 3, b'return'),
+        ], actual)
+
+    def test_should_search_with_a_regex(self):
+        """
+        Test search_files() should match a bytes or str regex.
+        """
+        expected = [
+            (os.path.join(self.root, 'a.c'), 1, b'int main() {'),
+            (os.path.join(self.root, 'sub', 'b.c'), 1, b'static int x;'),
+            (os.path.join(self.root, 'sub', 'b.c'), 2, b'int y;'),
+        ]
+        self.assertListEqual(expected, sorted(search_files('.c', self.root, rb'\bint \w+')))
+        self.assertListEqual(expected, sorted(search_files('.c', self.root, r'\bint \w+', workers=1)))
+
+    def test_should_anchor_the_regex_at_each_line(self):
+        """
+        Test search_files() should match ^ and $ at the start and end of every line, like grep.
+        """
+        self.assertListEqual([
+            (os.path.join(self.root, 'a.c'), 1, b'int main() {'),
+            (os.path.join(self.root, 'sub', 'b.c'), 2, b'int y;'),
+        ], sorted(search_files('.c', self.root, rb'^int')))
+        self.assertListEqual([
+            (os.path.join(self.root, 'a.c'), 2, b'    return 0;'),
+            (os.path.join(self.root, 'sub', 'b.c'), 1, b'static int x;'),
+            (os.path.join(self.root, 'sub', 'b.c'), 2, b'int y;'),
+        ], sorted(search_files('.c', self.root, rb';$')))
+
+    def test_should_not_match_past_the_last_line(self):
+        """
+        Test search_files() should not report an empty line after the newline that ends a file.
+        """
+        path = os.path.join(self.root, 'lines.txt')
+        self._write('lines.txt', b'hello\nworld\n')
+        expected = [(path, 1, b'hello'), (path, 2, b'world')]
+        for pattern in (rb'^', rb'$'):
+            self.assertListEqual(expected, list(search_files('.txt', self.root, pattern)))
+        self.assertListEqual([], list(search_files('.txt', self.root, rb'\Z')))
+        self.assertListEqual(expected, list(search_files('.txt', self.root, b'', literal=True)))
+
+        self._write('lines.txt', b'hello\nworld')
+        self.assertListEqual(expected, list(search_files('.txt', self.root, rb'$')))
+
+    def test_should_skip_binary_and_empty_files(self):
+        """
+        Test search_files() should skip the files with a NUL byte and the empty files.
+        """
+        files = {path for path, _, _ in search_files('', self.root, b'', literal=True)}
+        self.assertSetEqual({
+            os.path.join(self.root, 'a.c'),
+            os.path.join(self.root, 'notes.h'),
+            os.path.join(self.root, 'sub', 'b.c'),
+        }, files)
+
+    def test_should_stream_the_results_in_the_order_the_files_are_found(self):
+        """
+        Test search_files() should return the results in the walk order, whatever order the threads finish in.
+        """
+        for i in range(20):
+            self._write('many{}.h'.format(i), b'return\n')
+        expected = [(path, 1, b'return') for path in iter_files('.h', self.root)]
+        self.assertEqual(21, len(expected))
+        self.assertListEqual(expected, list(search_files('.h', self.root, b'return', workers=3)))
+
+    def test_should_return_nothing_when_no_path_given(self):
+        """
+        Test search_files() should return nothing when no path is given.
+        """
+        self.assertListEqual([], list(search_files('.c', '', b'return')))
+
+    """
+    Helpers.
+    """
+
+    def _write(self, name, contents):
+        """Helper function to write a file beneath the root."""
+        with open(os.path.join(self.root, name), 'wb') as file:
+            file.write(contents)
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'inotify is only available on Linux')
+class Test_File_Watcher(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.directory.name, 'tree')
+        os.makedirs(os.path.join(self.root, 'sub'))
+        self._touch('a.log')
+        self._touch(os.path.join('sub', 'b.log'))
+        self._touch('c.txt')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_should_report_the_existing_files_first(self):
+        """
+        Test File_Watcher::read_events() should first return an add event for each file the initial walk found.
+        """
+        with File_Watcher('.log', self.root) as watcher:
+            self.assertListEqual([
+                ('add', os.path.join(self.root, 'a.log')),
+                ('add', os.path.join(self.root, 'sub', 'b.log')),
+            ], sorted(watcher.read_events(0)))
+            self.assertListEqual([], watcher.read_events(0))
+
+    def test_should_report_added_and_removed_files(self):
+        """
+        Test File_Watcher::read_events() should report the matching files as they are created and deleted.
+        """
+        with File_Watcher('.log', self.root) as watcher:
+            watcher.read_events(0)
+
+            self._touch(os.path.join('sub', 'new.log'))
+            self._touch('new.txt')
+            self.assertListEqual([('add', os.path.join(self.root, 'sub', 'new.log'))], self._drain(watcher))
+
+            os.remove(os.path.join(self.root, 'a.log'))
+            os.rename(os.path.join(self.root, 'sub', 'b.log'), os.path.join(self.root, 'sub', 'b.txt'))
+            self.assertListEqual([
+                ('remove', os.path.join(self.root, 'a.log')),
+                ('remove', os.path.join(self.root, 'sub', 'b.log')),
+            ], self._drain(watcher))
+
+    def test_should_watch_new_subdirectories(self):
+        """
+        Test File_Watcher should watch the subdirectories created after it started, with the files already in them.
+        """
+        with File_Watcher('.log', self.root) as watcher:
+            watcher.read_events(0)
+
+            os.makedirs(os.path.join(self.root, 'new', 'deeper'))
+            self._touch(os.path.join('new', 'deeper', 'd.log'))
+            self.assertListEqual([('add', os.path.join(self.root, 'new', 'deeper', 'd.log'))], self._drain(watcher))
+
+            self._touch(os.path.join('new', 'e.log'))
+            self.assertListEqual([('add', os.path.join(self.root, 'new', 'e.log'))], self._drain(watcher))
+
+    def test_should_report_the_files_of_a_moved_directory(self):
+        """
+        Test File_Watcher should report the files of a directory moved out of or into the tree.
+        """
+        with File_Watcher('.log', self.root) as watcher:
+            watcher.read_events(0)
+
+            outside = os.path.join(self.directory.name, 'outside')
+            os.rename(os.path.join(self.root, 'sub'), outside)
+            self.assertListEqual([('remove', os.path.join(self.root, 'sub', 'b.log'))], self._drain(watcher))
+            self.assertNotIn(os.path.join(self.root, 'sub'), watcher.watches)
+
+            open(os.path.join(outside, 'ignored.log'), 'w').close()
+            os.rename(outside, os.path.join(self.root, 'back'))
+            self.assertListEqual([
+                ('add', os.path.join(self.root, 'back', 'b.log')),
+                ('add', os.path.join(self.root, 'back', 'ignored.log')),
+            ], sorted(self._drain(watcher)))
+
+    def test_watch_files_should_yield_the_events(self):
+        """
+        Test watch_files() should yield the initial files and then the changes.
+        """
+        self.assertListEqual([], list(watch_files('.log', '')))
+
+        events = watch_files('.log', self.root)
+        self.assertListEqual([
+            ('add', os.path.join(self.root, 'a.log')),
+            ('add', os.path.join(self.root, 'sub', 'b.log')),
+        ], sorted([next(events), next(events)]))
+
+        self._touch('later.log')
+        self.assertEqual(('add', os.path.join(self.root, 'later.log')), next(events))
+        events.close()
+
+    def test_should_not_report_links_to_directories(self):
+        """
+        Test File_Watcher should only report regular files, or links to them, like the initial walk.
+        """
+        with File_Watcher('', self.root) as watcher:
+            watcher.read_events(0)
+            os.symlink(os.path.join(self.root, 'sub'), os.path.join(self.root, 'live'))
+            os.symlink(os.path.join(self.root, 'a.log'), os.path.join(self.root, 'link.log'))
+            os.symlink(os.path.join(self.root, 'missing'), os.path.join(self.root, 'dangling'))
+            self.assertListEqual([('add', os.path.join(self.root, 'link.log'))], self._drain(watcher))
+
+    def test_should_raise_when_the_root_cannot_be_watched(self):
+        """
+        Test File_Watcher and watch_files() should raise an OSError rather than block when the root cannot be watched.
+        """
+        missing = os.path.join(self.root, 'missing')
+        self.assertRaises(OSError, File_Watcher, '.log', missing)
+        self.assertRaises(OSError, next, watch_files('.log', missing))
+        self._touch('file.log')
+        self.assertRaises(OSError, File_Watcher, '.log', os.path.join(self.root, 'file.log'))
+
+    """
+    Helpers.
+    """
+
+    def _touch(self, name):
+        """Helper function to create an empty file beneath the root."""
+        open(os.path.join(self.root, name), 'w').close()
+
+    def _drain(self, watcher):
+        """Helper function to collect the events until none arrive for a moment."""
+        events = []
+        while True:
+            batch = watcher.read_events(0.2)
+            if not batch:
+                return events
+            events.extend(batch)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 
+import random
 import unittest
-from problem_3 import HuffmanNode, huffman_encoding, huffman_decoding, map_frequency, build_tree, map_codes
+from problem_3 import HuffmanNode, huffman_encoding, huffman_decoding, map_frequency, build_tree, map_codes, \
+    pack_codes
 
 
 class Test_HuffmanCoding(unittest.TestCase):
@@ -110,6 +112,51 @@ class Test_HuffmanCoding(unittest.TestCase):
             huffman_decoding('11010011', None)
         self.assertTrue("'NoneType' object has no attribute 'right_child'" in str(context.exception))
 
+    def test_huffman_encoding_should_return_empty_packed_when_no_data_given(self):
+        """
+        Test huffman_encoding() should return empty bytes and a 0 bit length when no data is given in packed mode.
+        """
+        expected = ((b'', 0), None)
+        self.assertTupleEqual(expected, huffman_encoding('', packed=True))
+        self.assertTupleEqual(expected, huffman_encoding(None, packed=True))
+
+    def test_huffman_encoding_should_pack_the_encoded_bits(self):
+        """
+        Test huffman_encoding() should pack the encoded bits into bytes, most significant bit first.
+        """
+        for data, test_data in self.test_data.items():
+            (packed, bit_length), tree = huffman_encoding(data, packed=True)
+            encoding = test_data['encoding']
+
+            self.assertEqual(len(encoding), bit_length)
+            self.assertEqual((len(encoding) + 7) // 8, len(packed))
+            self.assertEqual(encoding, ''.join(format(byte, '08b') for byte in packed)[:bit_length])
+
+        (packed, bit_length), tree = huffman_encoding('ab ba', packed=True)
+        self.assertTupleEqual((b'\xd3', 8), (packed, bit_length))
+
+    def test_pack_codes_should_pack_across_the_flushed_words(self):
+        """
+        Test pack_codes() should pack codes that straddle the 64 bit flushes of its accumulator.
+        """
+        code_mappings = {'a': '0', 'b': '10', 'c': '110', 'd': '111'}
+        data = ''.join(random.Random(0).choice('abcd') for _ in range(1000))
+        encoding = ''.join(code_mappings[char] for char in data)
+
+        packed, bit_length = pack_codes(data, code_mappings)
+        self.assertEqual(len(encoding), bit_length)
+        self.assertEqual(int(encoding, 2) << (-bit_length % 8), int.from_bytes(packed, 'big'))
+
+    def test_huffman_decoding_should_decode_packed(self):
+        """
+        Test huffman_decoding() should decode the packed bytes and bit length directly.
+        """
+        for data in list(self.test_data) + [''.join(random.Random(0).choice('abc defgh\n') for _ in range(5000))]:
+            packed, tree = huffman_encoding(data, packed=True)
+            self.assertEqual(data, huffman_decoding(packed, tree))
+
+        self.assertEqual('', huffman_decoding((b'', 0), None))
+
     """
     Helpers.
     """